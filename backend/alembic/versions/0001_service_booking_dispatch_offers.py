@@ -0,0 +1,55 @@
+"""Add dispatch offer columns to service_bookings
+
+Revision ID: 0001_dispatch_offers
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+The schema is otherwise created with Base.metadata.create_all, which
+never alters existing tables. On a fresh database create_all already
+adds these columns, so only the missing ones are added here.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_dispatch_offers'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column('offered_technician_id', sa.Integer(), nullable=True),
+    sa.Column('offered_at', sa.DateTime(), nullable=True),
+    sa.Column('offer_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('dispatch_attempts', sa.JSON(), nullable=True),
+)
+
+INDEXES = (
+    ('ix_service_bookings_offered_technician_id', 'offered_technician_id'),
+    ('ix_service_bookings_offer_expires_at', 'offer_expires_at'),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('service_bookings'):
+        return  # create_all will build the table with these columns
+
+    existing = {column['name'] for column in inspector.get_columns('service_bookings')}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column('service_bookings', column)
+
+    indexed = {index['name'] for index in inspector.get_indexes('service_bookings')}
+    for name, column in INDEXES:
+        if name not in indexed:
+            op.create_index(name, 'service_bookings', [column])
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='service_bookings')
+    for column in reversed(COLUMNS):
+        op.drop_column('service_bookings', column.name)
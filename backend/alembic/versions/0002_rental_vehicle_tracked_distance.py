@@ -0,0 +1,33 @@
+"""Add tracked_distance_km to rental_vehicles
+
+Revision ID: 0002_tracked_distance
+Revises: 0001_dispatch_offers
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_tracked_distance'
+down_revision = '0001_dispatch_offers'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('rental_vehicles'):
+        return  # create_all will build the table with this column
+
+    existing = {column['name'] for column in inspector.get_columns('rental_vehicles')}
+    if 'tracked_distance_km' not in existing:
+        op.add_column(
+            'rental_vehicles',
+            sa.Column('tracked_distance_km', sa.Float(), nullable=False, server_default='0'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('rental_vehicles', 'tracked_distance_km')
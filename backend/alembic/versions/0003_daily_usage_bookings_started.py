@@ -0,0 +1,36 @@
+"""Add bookings_started to rental_vehicle_daily_usage
+
+Revision ID: 0003_bookings_started
+Revises: 0002_tracked_distance
+Create Date: 2026-10-17 00:00:00
+
+Existing rows start at 0; rebuild them once with
+fleet_utilization.refresh(db, full=True) to backfill the counts.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_bookings_started'
+down_revision = '0002_tracked_distance'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('rental_vehicle_daily_usage'):
+        return  # create_all will build the table with this column
+
+    existing = {column['name'] for column in inspector.get_columns('rental_vehicle_daily_usage')}
+    if 'bookings_started' not in existing:
+        op.add_column(
+            'rental_vehicle_daily_usage',
+            sa.Column('bookings_started', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('rental_vehicle_daily_usage', 'bookings_started')
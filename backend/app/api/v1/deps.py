@@ -4,9 +4,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, get_async_db
 from app.models.user import User, UserRole
 from app.schemas.auth import TokenData
 
@@ -141,3 +142,100 @@ async def require_customer_support(
 ) -> User:
     """Require customer support or admin role"""
     return current_user
+
+
+# ==================== ASYNC SESSION DEPENDENCIES ====================
+# Same checks as above, but the user lookup goes through get_async_db so
+# endpoints migrated to the async session never block the event loop.
+
+def _decode_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    """Extract the user id from a bearer token or raise 401"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    try:
+        payload = jwt.decode(
+            credentials.credentials,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM]
+        )
+        token_data = TokenData(user_id=payload.get("sub"))
+        if token_data.user_id is None:
+            raise credentials_exception
+        return int(token_data.user_id)
+    except (JWTError, ValueError):
+        raise credentials_exception
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Get current authenticated user from JWT token (async session)"""
+    user_id = _decode_user_id(credentials)
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+
+    return user
+
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async)
+) -> User:
+    """Get current active user (async session)"""
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user"
+        )
+    return current_user
+
+
+def require_role_async(required_roles: list[UserRole]):
+    """Dependency factory for role-based access control (async session)"""
+    async def role_checker(
+        current_user: User = Depends(get_current_active_user_async)
+    ) -> User:
+        if current_user.role not in required_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Access denied. Required roles: {[role.value for role in required_roles]}"
+            )
+        return current_user
+    return role_checker
+
+
+async def require_admin_async(
+    current_user: User = Depends(require_role_async([UserRole.ADMIN]))
+) -> User:
+    """Require admin role (async session)"""
+    return current_user
+
+
+async def require_vendor_async(
+    current_user: User = Depends(require_role_async([UserRole.VENDOR, UserRole.ADMIN]))
+) -> User:
+    """Require vendor or admin role (async session)"""
+    return current_user
+
+
+async def require_rental_manager_async(
+    current_user: User = Depends(require_role_async([UserRole.RENTAL_MANAGER, UserRole.ADMIN]))
+) -> User:
+    """Require rental manager or admin role (async session)"""
+    return current_user
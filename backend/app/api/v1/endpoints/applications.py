@@ -1,10 +1,11 @@
 """Role application endpoints"""
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.api.v1.deps import get_db, get_current_active_user, require_admin
+from app.core.pagination import paginate, set_next_cursor
 from app.models.user import User, UserRole
 from app.models.application import RoleApplication, ApplicationStatus, ApplicationType
 from app.models.maintenance import Technician
@@ -165,14 +166,20 @@ async def get_my_applications(
 
 @router.get("/admin/applications", response_model=List[RoleApplicationResponse])
 async def list_all_applications(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     status_filter: Optional[ApplicationStatus] = None,
     type_filter: Optional[ApplicationType] = None,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """List all applications (Admin only)"""
+    """
+    List all applications, newest first (Admin only)
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
     query = db.query(RoleApplication)
 
     if status_filter:
@@ -181,7 +188,9 @@ async def list_all_applications(
     if type_filter:
         query = query.filter(RoleApplication.application_type == type_filter)
 
-    applications = query.order_by(RoleApplication.created_at.desc()).offset(skip).limit(limit).all()
+    sort_keys = (RoleApplication.created_at, RoleApplication.id)
+    applications = paginate(query, sort_keys, skip, limit, cursor).all()
+    set_next_cursor(response, applications, sort_keys, limit)
     return applications
 
 
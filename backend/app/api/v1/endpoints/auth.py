@@ -2,9 +2,11 @@
 import uuid
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.api.v1.deps import get_db, get_current_user
+from app.api.v1.deps import get_async_db, get_current_user_async
 from app.core.config import settings
 from app.core.security import (
     verify_password,
@@ -24,7 +26,7 @@ router = APIRouter()
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user
@@ -38,7 +40,7 @@ async def register(
     Returns JWT tokens for automatic login after registration
     """
     # Check if user with email already exists
-    existing_user = db.query(User).filter(User.email == user_in.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user_in.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,7 +48,7 @@ async def register(
         )
 
     # Check if user with phone already exists
-    existing_phone = db.query(User).filter(User.phone == user_in.phone).first()
+    existing_phone = await db.scalar(select(User.id).where(User.phone == user_in.phone))
     if existing_phone:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,14 +57,14 @@ async def register(
 
     # Generate unique referral code
     referral_code = f"ZIP{str(uuid.uuid4())[:8].upper()}"
-    while db.query(User).filter(User.referral_code == referral_code).first():
+    while await db.scalar(select(User.id).where(User.referral_code == referral_code)):
         referral_code = f"ZIP{str(uuid.uuid4())[:8].upper()}"
 
     # Create new user
     db_user = User(
         email=user_in.email,
         phone=user_in.phone,
-        password_hash=get_password_hash(user_in.password),
+        password_hash=await run_in_threadpool(get_password_hash, user_in.password),
         full_name=user_in.full_name,
         user_type=user_in.user_type,
         role=UserRole.CUSTOMER,  # Default role
@@ -73,8 +75,8 @@ async def register(
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # Create access and refresh tokens for automatic login
     access_token = create_access_token(subject=str(db_user.id))
@@ -90,7 +92,7 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login with email and password
@@ -98,9 +100,10 @@ async def login(
     Returns JWT access token and refresh token
     """
     # Find user by email
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
 
-    if not user or not verify_password(credentials.password, user.password_hash):
+    # bcrypt is CPU-bound; keep it off the event loop
+    if not user or not await run_in_threadpool(verify_password, credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -127,7 +130,7 @@ async def login(
 @router.post("/refresh", response_model=Token)
 async def refresh_access_token(
     refresh_data: RefreshToken,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Refresh access token using refresh token
@@ -161,7 +164,7 @@ async def refresh_access_token(
         )
 
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -199,7 +202,7 @@ async def logout():
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get current authenticated user information
@@ -1,10 +1,11 @@
 """Mobile car maintenance endpoints"""
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.v1.deps import get_db, get_current_active_user, require_admin
+from app.api.v1.deps import get_async_db, get_current_active_user_async, require_admin_async
+from app.core.pagination import paginate, set_next_cursor
 from app.models.user import User
 from app.models.maintenance import MaintenanceService, ServiceBooking, Technician, ServiceBookingStatus as BookingStatus
 from app.models.vehicle import Vehicle
@@ -18,7 +19,10 @@ from app.schemas.maintenance import (
     BookingStatusUpdate,
     BookingRating,
     TechnicianResponse,
+    NearbyTechnicianResponse,
 )
+from app.services.technician_locator import technician_locator
+from app.services.dispatch_service import dispatch_engine
 
 
 router = APIRouter()
@@ -28,12 +32,14 @@ router = APIRouter()
 
 @router.get("/services", response_model=List[MaintenanceServiceResponse])
 async def list_maintenance_services(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     service_type: Optional[str] = None,
     search: Optional[str] = None,
     active_only: bool = True,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List all maintenance services
@@ -41,35 +47,38 @@ async def list_maintenance_services(
     - **service_type**: Filter by service type
     - **search**: Search in name and description
     - **active_only**: Show only active services (default: true)
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
-    query = db.query(MaintenanceService)
+    query = select(MaintenanceService)
 
     if active_only:
-        query = query.filter(MaintenanceService.is_active == True)
+        query = query.where(MaintenanceService.is_active == True)
 
     if service_type:
-        query = query.filter(MaintenanceService.service_type == service_type)
+        query = query.where(MaintenanceService.service_type == service_type)
 
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             or_(
                 MaintenanceService.name.ilike(search_term),
                 MaintenanceService.description.ilike(search_term)
             )
         )
 
-    services = query.offset(skip).limit(limit).all()
+    sort_keys = (MaintenanceService.id,)
+    services = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor, descending=False))).all()
+    set_next_cursor(response, services, sort_keys, limit)
     return services
 
 
 @router.get("/services/{service_id}", response_model=MaintenanceServiceResponse)
 async def get_maintenance_service(
-    service_id: str,
-    db: Session = Depends(get_db)
+    service_id: int,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific maintenance service by ID"""
-    service = db.query(MaintenanceService).filter(MaintenanceService.id == service_id).first()
+    service = await db.get(MaintenanceService, service_id)
 
     if not service:
         raise HTTPException(
@@ -83,28 +92,28 @@ async def get_maintenance_service(
 @router.post("/services", response_model=MaintenanceServiceResponse, status_code=status.HTTP_201_CREATED)
 async def create_maintenance_service(
     service_in: MaintenanceServiceCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_admin_async)
 ):
     """Create a new maintenance service (Admin only)"""
     service = MaintenanceService(**service_in.model_dump())
 
     db.add(service)
-    db.commit()
-    db.refresh(service)
+    await db.commit()
+    await db.refresh(service)
 
     return service
 
 
 @router.put("/services/{service_id}", response_model=MaintenanceServiceResponse)
 async def update_maintenance_service(
-    service_id: str,
+    service_id: int,
     service_update: MaintenanceServiceUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_admin_async)
 ):
     """Update a maintenance service (Admin only)"""
-    service = db.query(MaintenanceService).filter(MaintenanceService.id == service_id).first()
+    service = await db.get(MaintenanceService, service_id)
 
     if not service:
         raise HTTPException(
@@ -116,20 +125,20 @@ async def update_maintenance_service(
     for field, value in update_data.items():
         setattr(service, field, value)
 
-    db.commit()
-    db.refresh(service)
+    await db.commit()
+    await db.refresh(service)
 
     return service
 
 
 @router.delete("/services/{service_id}")
 async def delete_maintenance_service(
-    service_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    service_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_admin_async)
 ):
     """Delete (deactivate) a maintenance service (Admin only)"""
-    service = db.query(MaintenanceService).filter(MaintenanceService.id == service_id).first()
+    service = await db.get(MaintenanceService, service_id)
 
     if not service:
         raise HTTPException(
@@ -138,7 +147,7 @@ async def delete_maintenance_service(
         )
 
     service.is_active = False
-    db.commit()
+    await db.commit()
 
     return {"message": "Service deactivated successfully"}
 
@@ -148,15 +157,15 @@ async def delete_maintenance_service(
 @router.post("/bookings", response_model=ServiceBookingResponse, status_code=status.HTTP_201_CREATED)
 async def create_service_booking(
     booking_in: ServiceBookingCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new service booking"""
     # Verify service exists
-    service = db.query(MaintenanceService).filter(
+    service = await db.scalar(select(MaintenanceService).where(
         MaintenanceService.id == booking_in.service_id,
         MaintenanceService.is_active == True
-    ).first()
+    ))
 
     if not service:
         raise HTTPException(
@@ -165,10 +174,10 @@ async def create_service_booking(
         )
 
     # Verify vehicle belongs to user
-    vehicle = db.query(Vehicle).filter(
+    vehicle = await db.scalar(select(Vehicle).where(
         Vehicle.id == booking_in.vehicle_id,
         Vehicle.owner_id == current_user.id
-    ).first()
+    ))
 
     if not vehicle:
         raise HTTPException(
@@ -184,38 +193,49 @@ async def create_service_booking(
     )
 
     db.add(booking)
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    await db.refresh(booking)
+
+    # Offer it to a technician right away instead of waiting for the next round
+    dispatch_engine.notify()
 
     return booking
 
 
 @router.get("/bookings", response_model=List[ServiceBookingResponse])
 async def list_my_bookings(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     status: Optional[BookingStatus] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List current user's service bookings"""
-    query = db.query(ServiceBooking).filter(ServiceBooking.customer_id == current_user.id)
+    """
+    List current user's service bookings, newest first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
+    query = select(ServiceBooking).where(ServiceBooking.customer_id == current_user.id)
 
     if status:
-        query = query.filter(ServiceBooking.status == status)
+        query = query.where(ServiceBooking.status == status)
 
-    bookings = query.order_by(ServiceBooking.created_at.desc()).offset(skip).limit(limit).all()
+    sort_keys = (ServiceBooking.created_at, ServiceBooking.id)
+    bookings = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, bookings, sort_keys, limit)
     return bookings
 
 
 @router.get("/bookings/{booking_id}", response_model=ServiceBookingResponse)
 async def get_service_booking(
-    booking_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    booking_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific service booking"""
-    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -235,13 +255,13 @@ async def get_service_booking(
 
 @router.put("/bookings/{booking_id}", response_model=ServiceBookingResponse)
 async def update_service_booking(
-    booking_id: str,
+    booking_id: int,
     booking_update: ServiceBookingUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a service booking (customer can update before assignment)"""
-    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -265,21 +285,21 @@ async def update_service_booking(
     for field, value in update_data.items():
         setattr(booking, field, value)
 
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    await db.refresh(booking)
 
     return booking
 
 
 @router.post("/bookings/{booking_id}/status", response_model=ServiceBookingResponse)
 async def update_booking_status(
-    booking_id: str,
+    booking_id: int,
     status_update: BookingStatusUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update booking status (for technicians and admins)"""
-    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -302,21 +322,21 @@ async def update_booking_status(
         )
 
     booking.status = status_update.status
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    await db.refresh(booking)
 
     return booking
 
 
 @router.post("/bookings/{booking_id}/rate", response_model=ServiceBookingResponse)
 async def rate_service_booking(
-    booking_id: str,
+    booking_id: int,
     rating: BookingRating,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Rate a completed service booking"""
-    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -341,7 +361,7 @@ async def rate_service_booking(
 
     # Update technician rating if assigned
     if booking.technician_id:
-        technician = db.query(Technician).filter(Technician.user_id == booking.technician_id).first()
+        technician = await db.scalar(select(Technician).where(Technician.user_id == booking.technician_id))
         if technician:
             total_ratings = technician.total_ratings
             avg_rating = technician.average_rating
@@ -351,20 +371,20 @@ async def rate_service_booking(
             technician.average_rating = new_avg
             technician.total_ratings = new_total
 
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    await db.refresh(booking)
 
     return booking
 
 
 @router.delete("/bookings/{booking_id}")
 async def cancel_service_booking(
-    booking_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    booking_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel a service booking"""
-    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -385,7 +405,7 @@ async def cancel_service_booking(
         )
 
     booking.status = BookingStatus.CANCELLED
-    db.commit()
+    await db.commit()
 
     return {"message": "Booking cancelled successfully"}
 
@@ -394,32 +414,79 @@ async def cancel_service_booking(
 
 @router.get("/technicians", response_model=List[TechnicianResponse])
 async def list_technicians(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     available_only: bool = False,
     verified_only: bool = True,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all technicians"""
-    query = db.query(Technician)
+    """
+    List all technicians, best rated first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
+    query = select(Technician)
 
     if available_only:
-        query = query.filter(Technician.is_available == True)
+        query = query.where(Technician.is_available == True)
 
     if verified_only:
-        query = query.filter(Technician.is_verified == True)
+        query = query.where(Technician.is_verified == True)
 
-    technicians = query.order_by(Technician.average_rating.desc()).offset(skip).limit(limit).all()
+    sort_keys = (Technician.average_rating, Technician.id)
+    technicians = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, technicians, sort_keys, limit)
     return technicians
 
 
+@router.get("/technicians/nearby", response_model=List[NearbyTechnicianResponse])
+async def list_nearby_technicians(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=200, description="Only technicians within this distance"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Closest available, verified technicians to a point
+
+    Served from the in-memory spatial index; only the matched technicians
+    are loaded from the database.
+    """
+    await technician_locator.ensure_fresh(db)
+
+    if radius_km is None:
+        matches = technician_locator.nearest(lat, lng, limit)
+    else:
+        matches = technician_locator.within_radius(lat, lng, radius_km)[:limit]
+
+    if not matches:
+        return []
+
+    technicians = {
+        technician.id: technician
+        for technician in await db.scalars(select(Technician).where(Technician.id.in_([tid for tid, _ in matches])))
+    }
+
+    return [
+        NearbyTechnicianResponse(
+            **TechnicianResponse.model_validate(technicians[technician_id]).model_dump(),
+            distance_km=round(distance, 3)
+        )
+        for technician_id, distance in matches
+        if technician_id in technicians
+    ]
+
+
 @router.get("/technicians/{technician_id}", response_model=TechnicianResponse)
 async def get_technician(
-    technician_id: str,
-    db: Session = Depends(get_db)
+    technician_id: int,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific technician by ID"""
-    technician = db.query(Technician).filter(Technician.id == technician_id).first()
+    technician = await db.get(Technician, technician_id)
 
     if not technician:
         raise HTTPException(
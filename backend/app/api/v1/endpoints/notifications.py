@@ -1,12 +1,13 @@
 """Notification endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.api.v1.deps import get_current_user
+from app.core.pagination import set_next_cursor
 from app.models.user import User
-from app.services.notification_service import notification_service
+from app.services.notification_service import notification_service, NOTIFICATION_SORT_KEYS
 from app.schemas.notification import (
     NotificationResponse,
     NotificationCreate,
@@ -20,9 +21,11 @@ router = APIRouter()
 
 @router.get("/", response_model=List[NotificationResponse])
 async def get_notifications(
+    response: Response,
     unread_only: bool = False,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -32,14 +35,17 @@ async def get_notifications(
     - Returns paginated list of notifications
     - Filter by unread status
     - Sorted by most recent first
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
     notifications = notification_service.get_user_notifications(
         db=db,
         user_id=current_user.id,
         unread_only=unread_only,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
+    set_next_cursor(response, notifications, NOTIFICATION_SORT_KEYS, limit)
 
     return notifications
 
@@ -1,11 +1,12 @@
 """Payment endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.core.database import get_db
 from app.api.v1.deps import get_current_user
+from app.core.pagination import paginate, set_next_cursor
 from app.models.user import User
 from app.models.payment import Payment
 from app.services.paystack_service import paystack_service
@@ -278,20 +279,25 @@ async def request_refund(
 
 @router.get("/history", response_model=List[PaymentHistoryResponse])
 async def get_payment_history(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get payment history for current user
 
-    - Returns paginated list of user's payments
+    - Returns paginated list of user's payments, newest first
     - Includes payment status, amount, and metadata
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
-    payments = db.query(Payment).filter(
-        Payment.user_id == current_user.id
-    ).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
+    sort_keys = (Payment.created_at, Payment.id)
+    payments = paginate(
+        db.query(Payment).filter(Payment.user_id == current_user.id), sort_keys, skip, limit, cursor
+    ).all()
+    set_next_cursor(response, payments, sort_keys, limit)
 
     return [
         PaymentHistoryResponse(
@@ -1,16 +1,25 @@
 """Car rental endpoints"""
+import calendar
+import csv
+import hashlib
+import io
+import json
 from typing import List, Optional
+from contextlib import nullcontext
 from datetime import date, datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, exists
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 
-from app.api.v1.deps import get_db, get_current_active_user, require_admin, require_rental_manager
+from app.api.v1.deps import get_async_db, get_current_active_user_async, require_rental_manager_async
+from app.core.pagination import paginate, set_next_cursor
 from app.models.user import User
 from app.models.rental import (
     RentalVehicle,
     RentalBooking,
+    FleetSubscription,
     VehicleInspection,
     RentalBookingStatus as RentalStatus
 )
@@ -18,6 +27,8 @@ from app.schemas.rental import (
     RentalVehicleCreate,
     RentalVehicleUpdate,
     RentalVehicleResponse,
+    RentalQuoteRequest,
+    RentalQuoteResponse,
     RentalBookingCreate,
     RentalBookingUpdate,
     RentalBookingResponse,
@@ -25,7 +36,24 @@ from app.schemas.rental import (
     RentalBookingRating,
     VehicleInspectionCreate,
     VehicleInspectionResponse,
+    FleetUtilizationReport,
+    FleetSubscriptionUsage,
 )
+from app.services.rental_availability import (
+    rental_availability,
+    date_window,
+    day_bounds,
+    utc_naive,
+    to_iso,
+    bitmap_runs,
+    BLOCKING_STATUSES,
+    BookingConflictError
+)
+from app.services.rental_pricing import rental_pricing, booking_columns
+from app.services.rental_scheduler import rental_overdue_scheduler
+from app.services.fleet_utilization import fleet_utilization, REPORT_FIELDS
+from app.services.odometer_service import odometer_service
+from app.services.gps_ingest_service import gps_ingest_service
 
 
 router = APIRouter()
@@ -35,15 +63,19 @@ router = APIRouter()
 
 @router.get("/vehicles", response_model=List[RentalVehicleResponse])
 async def list_rental_vehicles(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     make: Optional[str] = None,
     fuel_type: Optional[str] = None,
     transmission: Optional[str] = None,
     min_seats: Optional[int] = None,
     max_daily_rate: Optional[float] = None,
     available_only: bool = True,
-    db: Session = Depends(get_db)
+    pickup_datetime: Optional[datetime] = None,
+    return_datetime: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List all rental vehicles with filters
@@ -54,38 +86,168 @@ async def list_rental_vehicles(
     - **min_seats**: Minimum number of seats
     - **max_daily_rate**: Maximum daily rental rate
     - **available_only**: Show only available vehicles
+    - **pickup_datetime** / **return_datetime**: Only vehicles free for the whole window, each with a price quote
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
-    query = db.query(RentalVehicle)
+    query = select(RentalVehicle)
+
+    if (pickup_datetime is None) != (return_datetime is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="pickup_datetime and return_datetime must be given together"
+        )
+
+    if pickup_datetime is not None:
+        pickup_datetime, return_datetime = utc_naive(pickup_datetime), utc_naive(return_datetime)
+        if return_datetime <= pickup_datetime:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="return_datetime must be after pickup_datetime"
+            )
+
+        # Anti-join: no holding booking overlaps the window
+        query = query.where(~exists().where(
+            RentalBooking.vehicle_id == RentalVehicle.id,
+            RentalBooking.status.in_(BLOCKING_STATUSES),
+            RentalBooking.pickup_datetime < to_iso(return_datetime),
+            RentalBooking.return_datetime > to_iso(pickup_datetime)
+        ))
 
     if available_only:
-        query = query.filter(RentalVehicle.is_available == True)
+        query = query.where(RentalVehicle.is_available == True)
 
     if make:
-        query = query.filter(RentalVehicle.make.ilike(f"%{make}%"))
+        query = query.where(RentalVehicle.make.ilike(f"%{make}%"))
 
     if fuel_type:
-        query = query.filter(RentalVehicle.fuel_type == fuel_type)
+        query = query.where(RentalVehicle.fuel_type == fuel_type)
 
     if transmission:
-        query = query.filter(RentalVehicle.transmission == transmission)
+        query = query.where(RentalVehicle.transmission == transmission)
 
     if min_seats:
-        query = query.filter(RentalVehicle.seating_capacity >= min_seats)
+        query = query.where(RentalVehicle.seating_capacity >= min_seats)
 
     if max_daily_rate:
-        query = query.filter(RentalVehicle.daily_rate <= max_daily_rate)
+        query = query.where(RentalVehicle.daily_rate <= max_daily_rate)
+
+    sort_keys = (RentalVehicle.average_rating, RentalVehicle.id)
+    vehicles = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, vehicles, sort_keys, limit)
+
+    if pickup_datetime is not None:
+        for vehicle in vehicles:
+            vehicle.quote = rental_pricing.quote(vehicle, pickup_datetime, return_datetime)
 
-    vehicles = query.order_by(RentalVehicle.average_rating.desc()).offset(skip).limit(limit).all()
     return vehicles
 
 
+@router.post("/quotes", response_model=List[RentalQuoteResponse])
+async def quote_rental_vehicles(
+    quote_in: RentalQuoteRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Price one rental window for many vehicles at once
+
+    - Picks the cheapest mix of hourly/daily/weekly/monthly rates per vehicle
+    - Adds driver and delivery fees when requested
+    - Unknown vehicle IDs are left out of the result
+    """
+    # Clients may send one end with an offset and the other without
+    pickup_at, return_at = utc_naive(quote_in.pickup_datetime), utc_naive(quote_in.return_datetime)
+    if return_at <= pickup_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="return_datetime must be after pickup_datetime"
+        )
+
+    vehicles = (await db.scalars(
+        select(RentalVehicle).where(RentalVehicle.id.in_(quote_in.vehicle_ids))
+    )).all()
+    by_id = {vehicle.id: vehicle for vehicle in vehicles}
+
+    return rental_pricing.quote_many(
+        [by_id[vehicle_id] for vehicle_id in dict.fromkeys(quote_in.vehicle_ids) if vehicle_id in by_id],
+        pickup_at,
+        return_at,
+        quote_in.with_driver,
+        quote_in.delivery_requested
+    )
+
+
+def _parse_month(month: str):
+    try:
+        first_day = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="month must be YYYY-MM"
+        )
+    return first_day.year, first_day.month
+
+
+def _calendar_entry(vehicle: RentalVehicle, year: int, month: int, encoding: str) -> dict:
+    days, mask = rental_availability.month_calendar(vehicle.id, year, month)
+    entry = {"vehicle_id": vehicle.id, "is_available": vehicle.is_available}
+    if encoding == "rle":
+        entry["runs"] = bitmap_runs(mask, days)
+    else:
+        entry["booked"] = mask
+    return entry
+
+
+def _conditional_response(request: Request, payload: dict):
+    """JSON response with a content ETag; 304 when the client already has it"""
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True)
+    etag = '"' + hashlib.sha1(body.encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/vehicles/calendar")
+async def get_fleet_calendar(
+    request: Request,
+    month: str,
+    vehicle_ids: List[int] = Query(..., max_length=100),
+    encoding: str = Query("bitmap", pattern="^(bitmap|rle)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Booked days of many vehicles for one month
+
+    - **month**: YYYY-MM (days are UTC calendar days)
+    - **vehicle_ids**: repeat the parameter for each vehicle
+    - **encoding**: `bitmap` gives `booked` as an integer whose bit 0 is day 1;
+      `rle` gives `runs`, alternating free/booked run lengths starting with free
+    - Send the returned ETag as If-None-Match to revalidate (304 when unchanged)
+    """
+    year, month_number = _parse_month(month)
+    await rental_availability.ensure_fresh(db)
+
+    vehicles = (await db.scalars(
+        select(RentalVehicle).where(RentalVehicle.id.in_(vehicle_ids)).order_by(RentalVehicle.id)
+    )).all()
+
+    return _conditional_response(request, {
+        "month": month,
+        "days": calendar.monthrange(year, month_number)[1],
+        "encoding": encoding,
+        "vehicles": [_calendar_entry(vehicle, year, month_number, encoding) for vehicle in vehicles]
+    })
+
+
 @router.get("/vehicles/{vehicle_id}", response_model=RentalVehicleResponse)
 async def get_rental_vehicle(
-    vehicle_id: str,
-    db: Session = Depends(get_db)
+    vehicle_id: int,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific rental vehicle by ID"""
-    vehicle = db.query(RentalVehicle).filter(RentalVehicle.id == vehicle_id).first()
+    vehicle = await db.get(RentalVehicle, vehicle_id)
 
     if not vehicle:
         raise HTTPException(
@@ -96,15 +258,47 @@ async def get_rental_vehicle(
     return vehicle
 
 
+@router.get("/vehicles/{vehicle_id}/calendar")
+async def get_vehicle_calendar(
+    vehicle_id: int,
+    request: Request,
+    month: str,
+    encoding: str = Query("bitmap", pattern="^(bitmap|rle)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Booked days of one vehicle for a month
+
+    Same encodings and ETag revalidation as /vehicles/calendar.
+    """
+    year, month_number = _parse_month(month)
+    vehicle = await db.get(RentalVehicle, vehicle_id)
+
+    if not vehicle:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Vehicle not found"
+        )
+
+    await rental_availability.ensure_fresh(db)
+
+    return _conditional_response(request, {
+        "month": month,
+        "days": calendar.monthrange(year, month_number)[1],
+        "encoding": encoding,
+        **_calendar_entry(vehicle, year, month_number, encoding)
+    })
+
+
 @router.get("/vehicles/{vehicle_id}/availability")
 async def check_vehicle_availability(
-    vehicle_id: str,
+    vehicle_id: int,
     start_date: date,
     end_date: date,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Check if a vehicle is available for specific dates"""
-    vehicle = db.query(RentalVehicle).filter(RentalVehicle.id == vehicle_id).first()
+    vehicle = await db.get(RentalVehicle, vehicle_id)
 
     if not vehicle:
         raise HTTPException(
@@ -113,19 +307,8 @@ async def check_vehicle_availability(
         )
 
     # Check for overlapping bookings
-    overlapping_bookings = db.query(RentalBooking).filter(
-        and_(
-            RentalBooking.vehicle_id == vehicle_id,
-            RentalBooking.status.in_([RentalStatus.CONFIRMED, RentalStatus.ACTIVE]),
-            or_(
-                and_(RentalBooking.start_date <= start_date, RentalBooking.end_date >= start_date),
-                and_(RentalBooking.start_date <= end_date, RentalBooking.end_date >= end_date),
-                and_(RentalBooking.start_date >= start_date, RentalBooking.end_date <= end_date)
-            )
-        )
-    ).count()
-
-    is_available = overlapping_bookings == 0 and vehicle.is_available
+    await rental_availability.ensure_fresh(db)
+    is_available = vehicle.is_available and rental_availability.is_free(vehicle_id, *date_window(start_date, end_date))
 
     return {
         "vehicle_id": str(vehicle_id),
@@ -141,28 +324,28 @@ async def check_vehicle_availability(
 @router.post("/vehicles", response_model=RentalVehicleResponse, status_code=status.HTTP_201_CREATED)
 async def create_rental_vehicle(
     vehicle_in: RentalVehicleCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_rental_manager)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_rental_manager_async)
 ):
     """Create a new rental vehicle (Rental Manager or Admin)"""
     vehicle = RentalVehicle(**vehicle_in.model_dump())
 
     db.add(vehicle)
-    db.commit()
-    db.refresh(vehicle)
+    await db.commit()
+    await db.refresh(vehicle)
 
     return vehicle
 
 
 @router.put("/vehicles/{vehicle_id}", response_model=RentalVehicleResponse)
 async def update_rental_vehicle(
-    vehicle_id: str,
+    vehicle_id: int,
     vehicle_update: RentalVehicleUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_rental_manager)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_rental_manager_async)
 ):
     """Update a rental vehicle (Admin only)"""
-    vehicle = db.query(RentalVehicle).filter(RentalVehicle.id == vehicle_id).first()
+    vehicle = await db.get(RentalVehicle, vehicle_id)
 
     if not vehicle:
         raise HTTPException(
@@ -174,27 +357,33 @@ async def update_rental_vehicle(
     for field, value in update_data.items():
         setattr(vehicle, field, value)
 
-    db.commit()
-    db.refresh(vehicle)
+    await db.commit()
+    await db.refresh(vehicle)
 
     return vehicle
 
 
 # ==================== RENTAL BOOKINGS ====================
 
+def _booked_dates(booking: RentalBooking):
+    """(start_date, end_date) of a booking, end inclusive, as given to day_bounds"""
+    pickup = utc_naive(datetime.fromisoformat(booking.pickup_datetime))
+    dropoff = utc_naive(datetime.fromisoformat(booking.return_datetime))
+    return pickup.date(), (dropoff - timedelta(microseconds=1)).date()
+
+
 @router.post("/bookings", response_model=RentalBookingResponse, status_code=status.HTTP_201_CREATED)
 async def create_rental_booking(
     booking_in: RentalBookingCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new rental booking"""
     # Verify vehicle exists and is available
-    vehicle = db.query(RentalVehicle).filter(
+    vehicle = await db.scalar(select(RentalVehicle).where(
         RentalVehicle.id == booking_in.vehicle_id,
-        RentalVehicle.is_available == True,
-        RentalVehicle.status == "active"
-    ).first()
+        RentalVehicle.is_available == True
+    ))
 
     if not vehicle:
         raise HTTPException(
@@ -209,79 +398,89 @@ async def create_rental_booking(
             detail="End date must be after start date"
         )
 
-    # Check for overlapping bookings
-    overlapping = db.query(RentalBooking).filter(
-        and_(
-            RentalBooking.vehicle_id == booking_in.vehicle_id,
-            RentalBooking.status.in_([RentalStatus.CONFIRMED, RentalStatus.ACTIVE]),
-            or_(
-                and_(RentalBooking.start_date <= booking_in.start_date, RentalBooking.end_date >= booking_in.start_date),
-                and_(RentalBooking.start_date <= booking_in.end_date, RentalBooking.end_date >= booking_in.end_date),
-                and_(RentalBooking.start_date >= booking_in.start_date, RentalBooking.end_date <= booking_in.end_date)
-            )
-        )
-    ).first()
-
-    if overlapping:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Vehicle is not available for these dates"
-        )
-
     # Calculate pricing
-    total_days = (booking_in.end_date - booking_in.start_date).days + 1
-    daily_rate = vehicle.daily_rate
-    total_price = daily_rate * total_days
-    security_deposit = daily_rate * 2  # 2 days worth as deposit
-
-    # Generate booking number
-    booking_number = f"RNT{uuid.uuid4().hex[:8].upper()}"
+    pickup_datetime, return_datetime = day_bounds(booking_in.start_date, booking_in.end_date)
+    quote = rental_pricing.quote(
+        vehicle,
+        pickup_datetime,
+        return_datetime,
+        with_driver=booking_in.with_driver,
+        delivery_requested=booking_in.delivery_requested
+    )
 
-    # Create booking
+    # Create booking; overlaps are checked against the database under the vehicle lock, not the
+    # possibly stale availability index
     booking = RentalBooking(
-        **booking_in.model_dump(),
         customer_id=current_user.id,
-        booking_number=booking_number,
+        vehicle_id=vehicle.id,
+        booking_reference=f"RNT{uuid.uuid4().hex[:8].upper()}",
         status=RentalStatus.PENDING,
-        total_days=total_days,
-        daily_rate=daily_rate,
-        total_price=total_price,
-        security_deposit=security_deposit,
+        pickup_datetime=to_iso(pickup_datetime),
+        return_datetime=to_iso(return_datetime),
+        pickup_location=booking_in.pickup_location,
+        return_location=booking_in.dropoff_location,
+        delivery_requested=booking_in.delivery_requested,
+        with_driver=booking_in.with_driver,
+        drivers_license={
+            "number": booking_in.driver_license_number,
+            "additional_drivers": booking_in.additional_drivers or [],
+            "insurance_option": booking_in.insurance_option
+        },
+        ghana_card=booking_in.ghana_card or {},
+        proof_of_address=booking_in.proof_of_address or {},
+        **booking_columns(quote)
     )
 
-    db.add(booking)
-    db.commit()
-    db.refresh(booking)
+    try:
+        async with rental_availability.hold(db, vehicle.id, pickup_datetime, return_datetime):
+            db.add(booking)
+            await db.commit()
+    except BookingConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Vehicle is not available for these dates"
+        )
+
+    await db.refresh(booking)
+    rental_availability.sync(booking)
 
     return booking
 
 
 @router.get("/bookings", response_model=List[RentalBookingResponse])
 async def list_my_rental_bookings(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     status: Optional[RentalStatus] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List current user's rental bookings"""
-    query = db.query(RentalBooking).filter(RentalBooking.customer_id == current_user.id)
+    """
+    List current user's rental bookings, newest first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
+    query = select(RentalBooking).where(RentalBooking.customer_id == current_user.id)
 
     if status:
-        query = query.filter(RentalBooking.status == status)
+        query = query.where(RentalBooking.status == status)
 
-    bookings = query.order_by(RentalBooking.created_at.desc()).offset(skip).limit(limit).all()
+    sort_keys = (RentalBooking.created_at, RentalBooking.id)
+    bookings = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, bookings, sort_keys, limit)
     return bookings
 
 
 @router.get("/bookings/{booking_id}", response_model=RentalBookingResponse)
 async def get_rental_booking(
-    booking_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    booking_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific rental booking"""
-    booking = db.query(RentalBooking).filter(RentalBooking.id == booking_id).first()
+    booking = await db.get(RentalBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -303,13 +502,13 @@ async def get_rental_booking(
 
 @router.put("/bookings/{booking_id}", response_model=RentalBookingResponse)
 async def update_rental_booking(
-    booking_id: str,
+    booking_id: int,
     booking_update: RentalBookingUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a rental booking"""
-    booking = db.query(RentalBooking).filter(RentalBooking.id == booking_id).first()
+    booking = await db.get(RentalBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -330,21 +529,67 @@ async def update_rental_booking(
         )
 
     update_data = booking_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(booking, field, value)
+    if "dropoff_location" in update_data:
+        update_data["return_location"] = update_data.pop("dropoff_location")
+
+    # Moving the dates must not run into another booking
+    guard = nullcontext()
+    start_date, end_date = update_data.pop("start_date", None), update_data.pop("end_date", None)
+    if start_date or end_date:
+        booked_start, booked_end = _booked_dates(booking)
+        start_date, end_date = start_date or booked_start, end_date or booked_end
+        if end_date <= start_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="End date must be after start date"
+            )
 
-    db.commit()
-    db.refresh(booking)
+        pickup_datetime, return_datetime = day_bounds(start_date, end_date)
+        update_data["pickup_datetime"] = to_iso(pickup_datetime)
+        update_data["return_datetime"] = to_iso(return_datetime)
+
+        # Reprice the new window with the options booked
+        vehicle = await db.get(RentalVehicle, booking.vehicle_id) if booking.vehicle_id else None
+        if vehicle:
+            update_data.update(booking_columns(rental_pricing.quote(
+                vehicle,
+                pickup_datetime,
+                return_datetime,
+                with_driver=booking.with_driver,
+                delivery_requested=booking.delivery_requested
+            )))
+        guard = rental_availability.hold(
+            db,
+            booking.vehicle_id,
+            pickup_datetime,
+            return_datetime,
+            exclude_booking_id=booking.id
+        )
+
+    try:
+        async with guard:
+            for field, value in update_data.items():
+                setattr(booking, field, value)
+            await db.commit()
+    except BookingConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Vehicle is not available for these dates"
+        )
+
+    await db.refresh(booking)
+
+    rental_availability.sync(booking)
 
     return booking
 
 
 @router.post("/bookings/{booking_id}/status", response_model=RentalBookingResponse)
 async def update_rental_booking_status(
-    booking_id: str,
+    booking_id: int,
     status_update: RentalBookingStatusUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update rental booking status (Admin/Rental Manager only)"""
     from app.models.user import UserRole
@@ -355,7 +600,7 @@ async def update_rental_booking_status(
             detail="Not authorized to update booking status"
         )
 
-    booking = db.query(RentalBooking).filter(RentalBooking.id == booking_id).first()
+    booking = await db.get(RentalBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -363,31 +608,64 @@ async def update_rental_booking_status(
             detail="Booking not found"
         )
 
-    booking.status = status_update.status
+    # Reinstating a released booking takes the vehicle back
+    guard = nullcontext()
+    if status_update.status in BLOCKING_STATUSES and booking.status not in BLOCKING_STATUSES:
+        if booking.vehicle_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Booking no longer has a vehicle to hold"
+            )
+        guard = rental_availability.hold(
+            db,
+            booking.vehicle_id,
+            datetime.fromisoformat(booking.pickup_datetime),
+            datetime.fromisoformat(booking.return_datetime),
+            exclude_booking_id=booking.id
+        )
+
+    try:
+        async with guard:
+            booking.status = status_update.status
 
-    # Update timestamps based on status
-    if status_update.status == RentalStatus.ACTIVE and not booking.picked_up_at:
-        booking.picked_up_at = datetime.utcnow()
+            # Update timestamps based on status
+            if status_update.status == RentalStatus.ACTIVE and not booking.actual_pickup_datetime:
+                booking.actual_pickup_datetime = to_iso(datetime.utcnow())
 
-    if status_update.status == RentalStatus.COMPLETED and not booking.returned_at:
-        booking.returned_at = datetime.utcnow()
-        booking.actual_return_date = date.today()
+            if status_update.status == RentalStatus.COMPLETED and not booking.actual_return_datetime:
+                returned_at = datetime.utcnow()
+                booking.actual_return_datetime = to_iso(returned_at)
 
-    db.commit()
-    db.refresh(booking)
+                # Settle the late penalty at the actual return time
+                if booking.vehicle_id:
+                    vehicle = await db.get(RentalVehicle, booking.vehicle_id)
+                    booking.late_return_penalty = rental_overdue_scheduler.penalty_for(booking, vehicle, returned_at)
+
+            await db.commit()
+    except BookingConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Vehicle has been booked by someone else for this period"
+        )
+
+    await db.refresh(booking)
+
+    rental_availability.sync(booking)
+    # Its tracker starts or stops reporting to this booking
+    await gps_ingest_service.invalidate_vehicle(db, booking.vehicle_id)
 
     return booking
 
 
 @router.post("/bookings/{booking_id}/rate", response_model=RentalBookingResponse)
 async def rate_rental_booking(
-    booking_id: str,
+    booking_id: int,
     rating: RentalBookingRating,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Rate a completed rental booking"""
-    booking = db.query(RentalBooking).filter(RentalBooking.id == booking_id).first()
+    booking = await db.get(RentalBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -411,7 +689,7 @@ async def rate_rental_booking(
     booking.customer_feedback = rating.feedback
 
     # Update vehicle rating
-    vehicle = db.query(RentalVehicle).filter(RentalVehicle.id == booking.vehicle_id).first()
+    vehicle = await db.get(RentalVehicle, booking.vehicle_id)
     if vehicle:
         total_ratings = vehicle.total_ratings
         avg_rating = vehicle.average_rating
@@ -421,20 +699,20 @@ async def rate_rental_booking(
         vehicle.average_rating = new_avg
         vehicle.total_ratings = new_total
 
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    await db.refresh(booking)
 
     return booking
 
 
 @router.delete("/bookings/{booking_id}")
 async def cancel_rental_booking(
-    booking_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    booking_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel a rental booking"""
-    booking = db.query(RentalBooking).filter(RentalBooking.id == booking_id).first()
+    booking = await db.get(RentalBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -455,7 +733,10 @@ async def cancel_rental_booking(
         )
 
     booking.status = RentalStatus.CANCELLED
-    db.commit()
+    await db.commit()
+
+    rental_availability.remove(booking.id)
+    await gps_ingest_service.invalidate_vehicle(db, booking.vehicle_id)
 
     return {"message": "Booking cancelled successfully"}
 
@@ -465,8 +746,8 @@ async def cancel_rental_booking(
 @router.post("/inspections", response_model=VehicleInspectionResponse, status_code=status.HTTP_201_CREATED)
 async def create_vehicle_inspection(
     inspection_in: VehicleInspectionCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a vehicle inspection (Admin/Rental Manager only)"""
     from app.models.user import UserRole
@@ -477,26 +758,38 @@ async def create_vehicle_inspection(
             detail="Not authorized to create inspections"
         )
 
+    inspection_data = inspection_in.model_dump()
+
+    if inspection_data["odometer_reading"] is None:
+        booking = await db.get(RentalBooking, inspection_in.booking_id)
+        vehicle = await db.get(RentalVehicle, booking.vehicle_id) if booking and booking.vehicle_id else None
+        if vehicle is None or vehicle.odometer_reading is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No tracked odometer reading for this vehicle; enter it manually"
+            )
+        inspection_data["odometer_reading"] = vehicle.odometer_reading
+
     inspection = VehicleInspection(
-        **inspection_in.model_dump(),
+        **inspection_data,
         inspector_id=current_user.id
     )
 
     db.add(inspection)
-    db.commit()
-    db.refresh(inspection)
+    await db.commit()
+    await db.refresh(inspection)
 
     return inspection
 
 
 @router.get("/bookings/{booking_id}/inspections", response_model=List[VehicleInspectionResponse])
 async def get_booking_inspections(
-    booking_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    booking_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all inspections for a booking"""
-    booking = db.query(RentalBooking).filter(RentalBooking.id == booking_id).first()
+    booking = await db.get(RentalBooking, booking_id)
 
     if not booking:
         raise HTTPException(
@@ -512,8 +805,140 @@ async def get_booking_inspections(
             detail="Not authorized to view these inspections"
         )
 
-    inspections = db.query(VehicleInspection).filter(
+    inspections = await db.scalars(select(VehicleInspection).where(
         VehicleInspection.booking_id == booking_id
-    ).order_by(VehicleInspection.created_at).all()
+    ).order_by(VehicleInspection.created_at))
+
+    return inspections.all()
+
+
+# ==================== FLEET ANALYTICS ====================
+
+def _report_range(start_date: date, end_date: date):
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
+        )
+
+
+@router.get("/fleet/utilization", response_model=FleetUtilizationReport)
+async def get_fleet_utilization(
+    start_date: date,
+    end_date: date,
+    vehicle_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_rental_manager_async)
+):
+    """
+    Fleet utilization over a date range (Rental Manager or Admin)
+
+    - Booked days / available days, revenue and the longest idle streak per vehicle
+    - Served from the periodic utilization rollup; `refreshed_at` tells how fresh it is
+    """
+    _report_range(start_date, end_date)
 
-    return inspections
+    vehicles = [row async for row in fleet_utilization.report(db, start_date, end_date, vehicle_ids)]
+    available = sum(row["available_days"] for row in vehicles)
+    booked = sum(row["booked_days"] for row in vehicles)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "refreshed_at": await fleet_utilization.last_refreshed_at(db),
+        "available_days": available,
+        "booked_days": booked,
+        "utilization_rate": round(booked / available, 4) if available else 0.0,
+        "revenue": round(sum(row["revenue"] for row in vehicles), 2),
+        "vehicles": vehicles
+    }
+
+
+@router.get("/fleet/utilization/export")
+async def export_fleet_utilization(
+    start_date: date,
+    end_date: date,
+    vehicle_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_rental_manager_async)
+):
+    """Fleet utilization as CSV, streamed one vehicle per row (Rental Manager or Admin)"""
+    _report_range(start_date, end_date)
+
+    async def rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        async for row in fleet_utilization.report(db, start_date, end_date, vehicle_ids):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    filename = f"fleet-utilization-{start_date}-{end_date}.csv"
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/fleet/subscriptions/{subscription_id}/usage", response_model=FleetSubscriptionUsage)
+async def get_fleet_subscription_usage(
+    subscription_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Distance driven under a fleet subscription
+
+    - Totals come from GPS tracking, flushed every few seconds; distance this
+      server has measured but not flushed yet is included
+    - Visible to the subscribing company, Rental Managers and Admins
+    """
+    from app.models.user import UserRole
+
+    subscription = await db.get(FleetSubscription, subscription_id)
+
+    if not subscription:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subscription not found"
+        )
+
+    if subscription.company_id != current_user.id and current_user.role not in [UserRole.ADMIN, UserRole.RENTAL_MANAGER]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this subscription"
+        )
+
+    vehicle_ids = subscription.assigned_vehicles or []
+    vehicles = (await db.scalars(
+        select(RentalVehicle).where(RentalVehicle.id.in_(vehicle_ids)).order_by(RentalVehicle.id)
+    )).all() if vehicle_ids else []
+
+    pending = 0.0
+    if vehicle_ids and subscription.is_active:
+        on_road = (await db.scalars(select(RentalBooking.id).where(
+            RentalBooking.vehicle_id.in_(vehicle_ids),
+            RentalBooking.status.in_([RentalStatus.ACTIVE, RentalStatus.OVERDUE])
+        ))).all()
+        pending = odometer_service.pending_km(on_road)
+
+    return {
+        "subscription_id": subscription.id,
+        "subscription_name": subscription.subscription_name,
+        "total_distance_km": round(subscription.total_distance_km + pending, 3),
+        "total_incidents": subscription.total_incidents,
+        "vehicles": [
+            {
+                "vehicle_id": vehicle.id,
+                "license_plate": vehicle.license_plate,
+                "odometer_reading": vehicle.odometer_reading,
+                "tracked_distance_km": round(vehicle.tracked_distance_km, 3)
+            }
+            for vehicle in vehicles
+        ]
+    }
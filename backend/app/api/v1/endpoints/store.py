@@ -1,26 +1,33 @@
 """Online auto store endpoints"""
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-import uuid
-
-from app.api.v1.deps import get_db, get_current_active_user, require_vendor, require_admin
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, delete, func, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.api.v1.deps import get_async_db, get_current_active_user_async, require_vendor_async
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, paginate, set_next_cursor
 from app.models.user import User
+from app.models.vehicle import Vehicle
 from app.models.store import (
     Product,
     Vendor,
     Cart,
     CartItem,
     Order,
-    OrderItem,
     ProductReview,
     OrderStatus
 )
+from app.services.product_search import product_search, tokenize
+from app.services.product_compatibility import product_compatibility, normalize
+from app.services.product_facets import product_facets
+from app.services.checkout_service import checkout_service, CheckoutError
 from app.schemas.store import (
     ProductCreate,
     ProductUpdate,
     ProductResponse,
+    ProductFacets,
     VendorCreate,
     VendorUpdate,
     VendorResponse,
@@ -37,68 +44,245 @@ from app.schemas.store import (
 
 router = APIRouter()
 
+# Ranked search ids checked against the listing filters per query
+SEARCH_FILTER_CHUNK = 1000
+
 
 # ==================== PRODUCTS ====================
 
+def _parse_vehicle(value: str):
+    """(make, model, year) from a make:model:year filter"""
+    parts = [part.strip() for part in value.split(":")]
+    if len(parts) > 3 or not parts[0] or (len(parts) == 3 and parts[2] and not parts[2].isdigit()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fits_vehicle must look like make:model:year"
+        )
+    model = parts[1] if len(parts) > 1 and parts[1] else None
+    year = int(parts[2]) if len(parts) == 3 and parts[2] else None
+    return parts[0], model, year
+
+
+def _product_id_in(db: AsyncSession, product_ids: List[int]):
+    """
+    Product.id IN product_ids; on PostgreSQL as one array parameter, since
+    asyncpg allows at most 32,767 parameters in a statement
+    """
+    if db.bind.dialect.name == "postgresql":
+        return Product.id == any_(literal(product_ids, ARRAY(Integer)))
+    return Product.id.in_(product_ids)
+
+
+def _catalog_conditions(in_stock_only: bool, vehicle) -> list:
+    """Filters shared by the product listing and its facet counts, other than the facets themselves"""
+    conditions = [Product.is_active == True]
+    if in_stock_only:
+        conditions.append(Product.stock_quantity > 0)
+    if vehicle:
+        conditions.append(product_compatibility.fits([vehicle]))
+    return conditions
+
+
 @router.get("/products", response_model=List[ProductResponse])
 async def list_products(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     brand: Optional[str] = None,
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
+    condition: Optional[str] = None,
     in_stock_only: bool = True,
-    db: Session = Depends(get_db)
+    fits_vehicle: Optional[str] = Query(None, description="make:model:year, e.g. Toyota:Corolla:2015"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List all products with filters
 
     - **category**: Filter by product category
     - **brand**: Filter by brand
-    - **search**: Search in name and description
+    - **search**: Ranked search over name, description, brand, part number and tags;
+      the last word matches as a prefix and longer words tolerate one typo
     - **min_price**: Minimum price
     - **max_price**: Maximum price
+    - **condition**: Filter by condition (e.g. new, refurbished)
     - **in_stock_only**: Show only in-stock products
+    - **fits_vehicle**: Only parts compatible with a vehicle, as make:model:year
+      (model and year may be left out)
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
-    query = db.query(Product).filter(Product.is_active == True)
-
-    if in_stock_only:
-        query = query.filter(Product.stock_quantity > 0)
+    vehicle = _parse_vehicle(fits_vehicle) if fits_vehicle else None
+    query = select(Product).where(*_catalog_conditions(in_stock_only, vehicle))
 
     if category:
-        query = query.filter(Product.category == category)
+        query = query.where(Product.category == category)
 
     if brand:
-        query = query.filter(Product.brand.ilike(f"%{brand}%"))
-
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Product.name.ilike(search_term),
-                Product.description.ilike(search_term)
-            )
-        )
+        query = query.where(Product.brand.ilike(f"%{brand}%"))
 
     if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+        query = query.where(Product.price >= min_price)
 
     if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+        query = query.where(Product.price <= max_price)
+
+    if condition:
+        query = query.where(func.lower(Product.condition) == condition.strip().lower())
+
+    if search:
+        after = None
+        if cursor:
+            # Ranked results page on (score desc, id asc), the order search returns
+            after_score, after_id = decode_cursor(cursor, 2)
+            if not isinstance(after_score, (int, float)) or not isinstance(after_id, int):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+            after = (-after_score, after_id)
+
+        await product_search.ensure_fresh(db)
+
+        # Apply the filters to the ranked ids SEARCH_FILTER_CHUNK at a time,
+        # widening the ranked window until the page is filled or every match
+        # has been filtered
+        filtered = []
+        needed = (0 if after else skip) + limit
+        window, checked = product_search.max_results, 0
+        while True:
+            ranked = product_search.search(search, window)
+            batch = ranked[checked:]
+            if after:
+                batch = [item for item in batch if (-item[1], item[0]) > after]
+            for start in range(0, len(batch), SEARCH_FILTER_CHUNK):
+                if len(filtered) >= needed:
+                    break
+                chunk = batch[start:start + SEARCH_FILTER_CHUNK]
+                matching = set((await db.scalars(
+                    query.with_only_columns(Product.id).where(Product.id.in_([product_id for product_id, _ in chunk]))
+                )).all())
+                filtered.extend(item for item in chunk if item[0] in matching)
+            checked = len(ranked)
+            if len(ranked) < window or len(filtered) >= needed:
+                break
+            window *= 4
+
+        page = filtered[:limit] if after else filtered[skip:skip + limit]
+        if not page:
+            return []
+
+        if len(page) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([page[-1][1], page[-1][0]])
+
+        by_id = {product.id: product for product in (await db.scalars(
+            select(Product).where(Product.id.in_([product_id for product_id, _ in page]))
+        )).all()}
+        return [by_id[product_id] for product_id, _ in page if product_id in by_id]
+
+    sort_keys = (Product.average_rating, Product.id)
+    products = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, products, sort_keys, limit)
+    return products
+
+
+@router.get("/products/facets", response_model=ProductFacets)
+async def get_product_facets(
+    category: Optional[str] = None,
+    brand: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    condition: Optional[str] = None,
+    in_stock_only: bool = True,
+    fits_vehicle: Optional[str] = Query(None, description="make:model:year, e.g. Toyota:Corolla:2015"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Category, brand, price-bucket and condition counts for a product listing
+
+    Takes the same filters as the listing. Each facet is counted with every
+    other filter applied but its own, so a selected category still shows
+    how many products the other categories have.
+    """
+    vehicle = _parse_vehicle(fits_vehicle) if fits_vehicle else None
+    conditions = _catalog_conditions(in_stock_only, vehicle)
+
+    search_key = None
+    if search:
+        await product_search.ensure_fresh(db)
+        # Counted over every match, like the pages the listing widens to
+        ranked = [product_id for product_id, _ in product_search.search(search, len(product_search.index))]
+        conditions.append(_product_id_in(db, ranked))
+        search_key = tuple(tokenize(search))
+
+    vehicle_key = (normalize(vehicle[0]), normalize(vehicle[1]), vehicle[2]) if vehicle else None
+    return await product_facets.facets(
+        db,
+        conditions,
+        base_key=(search_key, in_stock_only, vehicle_key),
+        category=category,
+        brand=brand,
+        condition=condition,
+        min_price=min_price,
+        max_price=max_price
+    )
 
-    products = query.order_by(Product.average_rating.desc()).offset(skip).limit(limit).all()
+
+@router.get("/products/for-my-vehicles", response_model=List[ProductResponse])
+async def list_products_for_my_vehicles(
+    response: Response,
+    vehicle_id: Optional[int] = None,
+    category: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Parts compatible with the current user's saved vehicles
+
+    - **vehicle_id**: Only parts for this one of your vehicles
+    - **category**: Filter by product category
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
+    vehicles_query = select(Vehicle.make, Vehicle.model, Vehicle.year).where(Vehicle.owner_id == current_user.id)
+    if vehicle_id is not None:
+        vehicles_query = vehicles_query.where(Vehicle.id == vehicle_id)
+    vehicles = (await db.execute(vehicles_query)).all()
+
+    if not vehicles:
+        if vehicle_id is not None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Vehicle not found"
+            )
+        return []
+
+    query = select(Product).where(
+        Product.is_active == True,
+        Product.stock_quantity > 0,
+        product_compatibility.fits([tuple(vehicle) for vehicle in vehicles])
+    )
+    if category:
+        query = query.where(Product.category == category)
+
+    sort_keys = (Product.average_rating, Product.id)
+    products = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, products, sort_keys, limit)
     return products
 
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
 async def get_product(
-    product_id: str,
-    db: Session = Depends(get_db)
+    product_id: int,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific product by ID"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
 
     if not product:
         raise HTTPException(
@@ -112,12 +296,12 @@ async def get_product(
 @router.post("/products", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_in: ProductCreate,
-    current_user: User = Depends(require_vendor),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_vendor_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new product (Vendor only)"""
     # Get vendor profile
-    vendor = db.query(Vendor).filter(Vendor.user_id == current_user.id).first()
+    vendor = await db.scalar(select(Vendor).where(Vendor.user_id == current_user.id))
 
     if not vendor:
         raise HTTPException(
@@ -132,7 +316,7 @@ async def create_product(
         )
 
     # Check if SKU already exists
-    existing_product = db.query(Product).filter(Product.sku == product_in.sku).first()
+    existing_product = await db.scalar(select(Product.id).where(Product.sku == product_in.sku))
     if existing_product:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -145,21 +329,26 @@ async def create_product(
     )
 
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.flush()
+    await product_compatibility.sync(db, product)
+    await db.commit()
+    await db.refresh(product)
+
+    product_search.sync(product)
+    product_facets.invalidate()
 
     return product
 
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
 async def update_product(
-    product_id: str,
+    product_id: int,
     product_update: ProductUpdate,
-    current_user: User = Depends(require_vendor),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_vendor_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a product (Vendor only, own products)"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
 
     if not product:
         raise HTTPException(
@@ -168,7 +357,7 @@ async def update_product(
         )
 
     # Verify vendor owns this product
-    vendor = db.query(Vendor).filter(Vendor.user_id == current_user.id).first()
+    vendor = await db.scalar(select(Vendor).where(Vendor.user_id == current_user.id))
     if not vendor or product.vendor_id != vendor.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -179,20 +368,26 @@ async def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
 
-    db.commit()
-    db.refresh(product)
+    if update_data.keys() & {"compatible_makes", "compatible_models", "compatible_years"}:
+        await product_compatibility.sync(db, product)
+
+    await db.commit()
+    await db.refresh(product)
+
+    product_search.sync(product)
+    product_facets.invalidate()
 
     return product
 
 
 @router.delete("/products/{product_id}")
 async def delete_product(
-    product_id: str,
-    current_user: User = Depends(require_vendor),
-    db: Session = Depends(get_db)
+    product_id: int,
+    current_user: User = Depends(require_vendor_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Deactivate a product (Vendor only, own products)"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
 
     if not product:
         raise HTTPException(
@@ -200,7 +395,7 @@ async def delete_product(
             detail="Product not found"
         )
 
-    vendor = db.query(Vendor).filter(Vendor.user_id == current_user.id).first()
+    vendor = await db.scalar(select(Vendor).where(Vendor.user_id == current_user.id))
     if not vendor or product.vendor_id != vendor.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -208,7 +403,10 @@ async def delete_product(
         )
 
     product.is_active = False
-    db.commit()
+    await db.commit()
+
+    product_search.remove(product.id)
+    product_facets.invalidate()
 
     return {"message": "Product deactivated successfully"}
 
@@ -217,27 +415,30 @@ async def delete_product(
 
 @router.get("/cart", response_model=CartResponse)
 async def get_cart(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's shopping cart"""
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = await db.scalar(
+        select(Cart).options(selectinload(Cart.items)).where(Cart.user_id == current_user.id)
+    )
 
     if not cart:
         # Create cart if doesn't exist
-        cart = Cart(user_id=current_user.id)
+        cart = Cart(user_id=current_user.id, items=[])
         db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        await db.commit()
+
+    items = cart.items
 
     # Calculate totals
-    total_items = len(cart.items)
-    total_price = sum(item.subtotal for item in cart.items)
+    total_items = len(items)
+    total_price = sum(item.subtotal for item in items)
 
     return {
         "id": str(cart.id),
         "user_id": str(cart.user_id),
-        "items": cart.items,
+        "items": items,
         "total_items": total_items,
         "total_price": total_price,
         "updated_at": cart.updated_at
@@ -247,15 +448,15 @@ async def get_cart(
 @router.post("/cart/items")
 async def add_to_cart(
     item_in: CartItemAdd,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add an item to cart"""
     # Verify product exists and has stock
-    product = db.query(Product).filter(
+    product = await db.scalar(select(Product).where(
         Product.id == item_in.product_id,
         Product.is_active == True
-    ).first()
+    ))
 
     if not product:
         raise HTTPException(
@@ -270,17 +471,17 @@ async def add_to_cart(
         )
 
     # Get or create cart
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = await db.scalar(select(Cart).where(Cart.user_id == current_user.id))
     if not cart:
         cart = Cart(user_id=current_user.id)
         db.add(cart)
-        db.flush()
+        await db.flush()
 
     # Check if item already in cart
-    existing_item = db.query(CartItem).filter(
+    existing_item = await db.scalar(select(CartItem).where(
         CartItem.cart_id == cart.id,
         CartItem.product_id == item_in.product_id
-    ).first()
+    ))
 
     if existing_item:
         # Update quantity
@@ -303,20 +504,20 @@ async def add_to_cart(
         )
         db.add(cart_item)
 
-    db.commit()
+    await db.commit()
 
     return {"message": "Item added to cart successfully"}
 
 
 @router.put("/cart/items/{item_id}")
 async def update_cart_item(
-    item_id: str,
+    item_id: int,
     item_update: CartItemUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update cart item quantity"""
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = await db.scalar(select(Cart).where(Cart.user_id == current_user.id))
 
     if not cart:
         raise HTTPException(
@@ -324,10 +525,10 @@ async def update_cart_item(
             detail="Cart not found"
         )
 
-    item = db.query(CartItem).filter(
+    item = await db.scalar(select(CartItem).where(
         CartItem.id == item_id,
         CartItem.cart_id == cart.id
-    ).first()
+    ))
 
     if not item:
         raise HTTPException(
@@ -336,7 +537,7 @@ async def update_cart_item(
         )
 
     # Check stock
-    product = db.query(Product).filter(Product.id == item.product_id).first()
+    product = await db.get(Product, item.product_id)
     if product.stock_quantity < item_update.quantity:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -346,19 +547,19 @@ async def update_cart_item(
     item.quantity = item_update.quantity
     item.subtotal = item.unit_price * item_update.quantity
 
-    db.commit()
+    await db.commit()
 
     return {"message": "Cart item updated successfully"}
 
 
 @router.delete("/cart/items/{item_id}")
 async def remove_from_cart(
-    item_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    item_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove an item from cart"""
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = await db.scalar(select(Cart).where(Cart.user_id == current_user.id))
 
     if not cart:
         raise HTTPException(
@@ -366,10 +567,10 @@ async def remove_from_cart(
             detail="Cart not found"
         )
 
-    item = db.query(CartItem).filter(
+    item = await db.scalar(select(CartItem).where(
         CartItem.id == item_id,
         CartItem.cart_id == cart.id
-    ).first()
+    ))
 
     if not item:
         raise HTTPException(
@@ -377,23 +578,23 @@ async def remove_from_cart(
             detail="Cart item not found"
         )
 
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
 
     return {"message": "Item removed from cart"}
 
 
 @router.delete("/cart")
 async def clear_cart(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Clear all items from cart"""
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = await db.scalar(select(Cart).where(Cart.user_id == current_user.id))
 
     if cart:
-        db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-        db.commit()
+        await db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
+        await db.commit()
 
     return {"message": "Cart cleared successfully"}
 
@@ -403,96 +604,72 @@ async def clear_cart(
 @router.post("/orders", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_in: OrderCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create an order from cart"""
-    # Get cart with items
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    """
+    Create an order from cart
 
-    if not cart or not cart.items:
+    Stock for every item is reserved atomically with the order: if any item
+    is short, nothing is ordered and the cart is left as it was.
+    """
+    try:
+        order = await checkout_service.place_order(
+            db,
+            customer_id=current_user.id,
+            delivery_address=order_in.delivery_address,
+            delivery_option=order_in.delivery_option,
+            notes=order_in.notes
+        )
+    except CheckoutError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cart is empty"
+            detail=str(e)
         )
 
-    # Calculate totals
-    subtotal = sum(item.subtotal for item in cart.items)
-    delivery_fee = 20.0  # Fixed delivery fee (can be made dynamic)
-    total_amount = subtotal + delivery_fee
-
-    # Generate order number
-    order_number = f"ORD{uuid.uuid4().hex[:8].upper()}"
-
-    # Create order
-    order = Order(
-        customer_id=current_user.id,
-        order_number=order_number,
-        status=OrderStatus.PENDING,
-        subtotal=subtotal,
-        delivery_fee=delivery_fee,
-        total_amount=total_amount,
-        delivery_address=order_in.delivery_address,
-        payment_method=order_in.payment_method,
-        payment_status="pending",
-        notes=order_in.notes
+    order = await db.scalar(
+        select(Order).options(selectinload(Order.items)).where(Order.id == order.id)
     )
 
-    db.add(order)
-    db.flush()
-
-    # Create order items from cart items
-    for cart_item in cart.items:
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=cart_item.product_id,
-            vendor_id=db.query(Product).filter(Product.id == cart_item.product_id).first().vendor_id,
-            quantity=cart_item.quantity,
-            unit_price=cart_item.unit_price,
-            subtotal=cart_item.subtotal
-        )
-        db.add(order_item)
-
-        # Update product stock
-        product = db.query(Product).filter(Product.id == cart_item.product_id).first()
-        product.stock_quantity -= cart_item.quantity
-        product.total_sold += cart_item.quantity
-
-    # Clear cart
-    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-
-    db.commit()
-    db.refresh(order)
-
     return order
 
 
 @router.get("/orders", response_model=List[OrderResponse])
 async def list_my_orders(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     status: Optional[OrderStatus] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List current user's orders"""
-    query = db.query(Order).filter(Order.customer_id == current_user.id)
+    """
+    List current user's orders, newest first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
+    query = select(Order).options(selectinload(Order.items)).where(Order.customer_id == current_user.id)
 
     if status:
-        query = query.filter(Order.status == status)
+        query = query.where(Order.status == status)
 
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    sort_keys = (Order.created_at, Order.id)
+    orders = (await db.scalars(paginate(query, sort_keys, skip, limit, cursor))).all()
+    set_next_cursor(response, orders, sort_keys, limit)
     return orders
 
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
 async def get_order(
-    order_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    order_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific order"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.scalar(
+        select(Order).options(selectinload(Order.items)).where(Order.id == order_id)
+    )
 
     if not order:
         raise HTTPException(
@@ -515,13 +692,13 @@ async def get_order(
 
 @router.post("/products/{product_id}/reviews", response_model=ProductReviewResponse, status_code=status.HTTP_201_CREATED)
 async def create_product_review(
-    product_id: str,
+    product_id: int,
     review_in: ProductReviewCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a product review"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
 
     if not product:
         raise HTTPException(
@@ -530,10 +707,10 @@ async def create_product_review(
         )
 
     # Check if user already reviewed this product
-    existing_review = db.query(ProductReview).filter(
+    existing_review = await db.scalar(select(ProductReview.id).where(
         ProductReview.product_id == product_id,
         ProductReview.customer_id == current_user.id
-    ).first()
+    ))
 
     if existing_review:
         raise HTTPException(
@@ -557,21 +734,27 @@ async def create_product_review(
     product.average_rating = new_avg
     product.total_ratings = new_total
 
-    db.commit()
-    db.refresh(review)
+    await db.commit()
+    await db.refresh(review)
 
     return review
 
 
 @router.get("/products/{product_id}/reviews", response_model=List[ProductReviewResponse])
 async def list_product_reviews(
-    product_id: str,
+    product_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all reviews for a product"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    """
+    List all reviews for a product, newest first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
+    product = await db.get(Product, product_id)
 
     if not product:
         raise HTTPException(
@@ -579,8 +762,10 @@ async def list_product_reviews(
             detail="Product not found"
         )
 
-    reviews = db.query(ProductReview).filter(
-        ProductReview.product_id == product_id
-    ).order_by(ProductReview.created_at.desc()).offset(skip).limit(limit).all()
+    sort_keys = (ProductReview.created_at, ProductReview.id)
+    reviews = (await db.scalars(paginate(
+        select(ProductReview).where(ProductReview.product_id == product_id), sort_keys, skip, limit, cursor
+    ))).all()
+    set_next_cursor(response, reviews, sort_keys, limit)
 
     return reviews
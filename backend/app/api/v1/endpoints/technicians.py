@@ -1,13 +1,14 @@
 """Technician portal endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 from app.core.database import get_db
 from app.api.v1.deps import get_current_user
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_password_hash
 from app.models.user import User, UserRole
 from app.models.maintenance import Technician, ServiceBooking, TechnicianService, MaintenanceService
@@ -17,9 +18,12 @@ from app.schemas.technician import (
     TechnicianProfileUpdate,
     TechnicianResponse,
     TechnicianEarnings,
-    AvailabilityUpdate
+    AvailabilityUpdate,
+    TechnicianLocationUpdate
 )
 from app.schemas.maintenance import ServiceBookingResponse
+from app.services.technician_locator import technician_locator
+from app.services.dispatch_service import dispatch_engine
 
 router = APIRouter()
 
@@ -186,22 +190,65 @@ async def toggle_availability(
     db.commit()
     db.refresh(technician)
 
+    technician_locator.sync(technician)
+
+    return technician
+
+
+@router.put("/me/location", response_model=TechnicianResponse)
+async def update_my_location(
+    location: TechnicianLocationUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Report current position
+
+    - Called periodically by the technician app while on shift
+    - Keeps the technician discoverable by nearby-technician search
+    """
+    if current_user.role != UserRole.TECHNICIAN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only technicians can access this endpoint"
+        )
+
+    technician = db.query(Technician).filter(
+        Technician.user_id == current_user.id
+    ).first()
+
+    if not technician:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Technician profile not found"
+        )
+
+    technician.current_location = {"lat": location.latitude, "lng": location.longitude}
+    technician.last_location_update = datetime.utcnow().isoformat()
+    db.commit()
+    db.refresh(technician)
+
+    technician_locator.sync(technician)
+
     return technician
 
 
 @router.get("/me/bookings", response_model=List[ServiceBookingResponse])
 async def get_my_bookings(
+    response: Response,
     status_filter: str = None,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get my assigned bookings
 
-    - View all jobs assigned to me
+    - View all jobs assigned to me, newest first
     - Filter by status (pending, confirmed, in_progress, completed, cancelled)
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
     if current_user.role != UserRole.TECHNICIAN:
         raise HTTPException(
@@ -226,13 +273,129 @@ async def get_my_bookings(
     if status_filter:
         query = query.filter(ServiceBooking.status == status_filter)
 
-    bookings = query.order_by(
-        ServiceBooking.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    sort_keys = (ServiceBooking.created_at, ServiceBooking.id)
+    bookings = paginate(query, sort_keys, skip, limit, cursor).all()
+    set_next_cursor(response, bookings, sort_keys, limit)
 
     return bookings
 
 
+@router.get("/me/offers", response_model=List[ServiceBookingResponse])
+async def get_my_offers(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get jobs currently offered to me
+
+    - Offers expire after a short timeout and go to the next technician
+    """
+    if current_user.role != UserRole.TECHNICIAN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only technicians can access this endpoint"
+        )
+
+    technician = db.query(Technician).filter(
+        Technician.user_id == current_user.id
+    ).first()
+
+    if not technician:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Technician profile not found"
+        )
+
+    return db.query(ServiceBooking).filter(
+        ServiceBooking.offered_technician_id == technician.id,
+        ServiceBooking.technician_id.is_(None),
+        ServiceBooking.offer_expires_at > datetime.utcnow()
+    ).order_by(ServiceBooking.offer_expires_at.asc()).all()
+
+
+@router.post("/me/offers/{booking_id}/accept", response_model=ServiceBookingResponse)
+async def accept_offer(
+    booking_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Accept a job offer
+
+    - The booking is assigned to me and moves to ASSIGNED
+    - Fails if the offer has expired or was withdrawn
+    """
+    if current_user.role != UserRole.TECHNICIAN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only technicians can access this endpoint"
+        )
+
+    technician = db.query(Technician).filter(
+        Technician.user_id == current_user.id
+    ).first()
+
+    if not technician:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Technician profile not found"
+        )
+
+    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+
+    if not booking or booking.offered_technician_id != technician.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Offer not found"
+        )
+
+    if not dispatch_engine.accept(db, booking, technician):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Offer has expired"
+        )
+
+    return booking
+
+
+@router.post("/me/offers/{booking_id}/decline")
+async def decline_offer(
+    booking_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Decline a job offer
+
+    - The job is offered to the next best technician
+    """
+    if current_user.role != UserRole.TECHNICIAN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only technicians can access this endpoint"
+        )
+
+    technician = db.query(Technician).filter(
+        Technician.user_id == current_user.id
+    ).first()
+
+    if not technician:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Technician profile not found"
+        )
+
+    booking = db.query(ServiceBooking).filter(ServiceBooking.id == booking_id).first()
+
+    if not booking or not dispatch_engine.decline(db, booking, technician):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Offer not found"
+        )
+
+    return {"message": "Offer declined"}
+
+
 @router.put("/me/bookings/{booking_id}/status")
 async def update_booking_status(
     booking_id: int,
@@ -1,16 +1,27 @@
 """Real-time tracking endpoints"""
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Dict
-import json
-import asyncio
-
-from app.core.database import get_db
-from app.api.v1.deps import get_current_user
+import hmac
+import time
+from datetime import datetime
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Request, Header
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.api.v1.deps import get_current_user_async, require_admin_async
 from app.models.user import User, UserRole
 from app.models.maintenance import ServiceBooking, Technician
 from app.models.rental import RentalBooking
 from app.services.tracking_service import tracking_service
+from app.services.tracking_broadcaster import tracking_broadcaster
+from app.services.eta_service import eta_service
+from app.services.technician_locator import technician_locator
+from app.services.geofence_service import geofence_monitor
+from app.services.trip_archive import trip_archive
+from app.services.odometer_service import odometer_service
+from app.services.gps_ingest_service import (
+    gps_ingest_service, parse_ndjson, parse_packed, is_valid_point, GpsBatchError
+)
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -24,48 +35,10 @@ class LocationUpdate(BaseModel):
     speed: float = None
 
 
-class ConnectionManager:
-    """Manages WebSocket connections for tracking"""
-
-    def __init__(self):
-        self.active_connections: Dict[int, list] = {}
-
-    async def connect(self, booking_id: int, websocket: WebSocket):
-        """Connect a client to a booking's tracking session"""
-        await websocket.accept()
-
-        if booking_id not in self.active_connections:
-            self.active_connections[booking_id] = []
-
-        self.active_connections[booking_id].append(websocket)
-
-    def disconnect(self, booking_id: int, websocket: WebSocket):
-        """Disconnect a client"""
-        if booking_id in self.active_connections:
-            if websocket in self.active_connections[booking_id]:
-                self.active_connections[booking_id].remove(websocket)
-
-            if not self.active_connections[booking_id]:
-                del self.active_connections[booking_id]
-
-    async def broadcast_to_booking(self, booking_id: int, message: dict):
-        """Broadcast message to all clients tracking a booking"""
-        if booking_id in self.active_connections:
-            for connection in self.active_connections[booking_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass  # Client disconnected
-
-
-manager = ConnectionManager()
-
-
 @router.websocket("/ws/{booking_id}")
 async def tracking_websocket(
     websocket: WebSocket,
-    booking_id: int,
-    db: Session = Depends(get_db)
+    booking_id: int
 ):
     """
     WebSocket endpoint for real-time tracking
@@ -76,13 +49,14 @@ async def tracking_websocket(
 
     Connect with: ws://localhost:8000/api/v1/tracking/ws/{booking_id}
     """
-    await manager.connect(booking_id, websocket)
+    subscriber = await tracking_broadcaster.connect(booking_id, websocket)
 
     try:
         # Send initial status
-        current_location = tracking_service.get_current_location(booking_id)
+        current_location = await tracking_service.get_current_location(booking_id)
 
-        await websocket.send_json({
+        # Replies go through the subscriber queue so they stay ordered with broadcasts
+        tracking_broadcaster.send(subscriber, {
             "type": "connected",
             "booking_id": booking_id,
             "message": "Tracking session started",
@@ -97,8 +71,8 @@ async def tracking_websocket(
 
                 # Handle client requests
                 if data == "get_location":
-                    location = tracking_service.get_current_location(booking_id)
-                    await websocket.send_json({
+                    location = await tracking_service.get_current_location(booking_id)
+                    tracking_broadcaster.send(subscriber, {
                         "type": "location_update",
                         "location": location
                     })
@@ -107,15 +81,15 @@ async def tracking_websocket(
                 break
 
     finally:
-        manager.disconnect(booking_id, websocket)
+        tracking_broadcaster.disconnect(booking_id, subscriber)
 
 
 @router.post("/technicians/location")
 async def update_technician_location(
     booking_id: int,
     location: LocationUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update technician's current location
@@ -131,9 +105,9 @@ async def update_technician_location(
         )
 
     # Verify booking belongs to this technician
-    technician = db.query(Technician).filter(
+    technician = await db.scalar(select(Technician).where(
         Technician.user_id == current_user.id
-    ).first()
+    ))
 
     if not technician:
         raise HTTPException(
@@ -141,10 +115,10 @@ async def update_technician_location(
             detail="Technician profile not found"
         )
 
-    booking = db.query(ServiceBooking).filter(
+    booking = await db.scalar(select(ServiceBooking).where(
         ServiceBooking.id == booking_id,
         ServiceBooking.technician_id == technician.id
-    ).first()
+    ))
 
     if not booking:
         raise HTTPException(
@@ -152,8 +126,14 @@ async def update_technician_location(
             detail="Booking not found or not assigned to you"
         )
 
+    # Keep the technician's last known position for nearby search
+    technician.current_location = {"lat": location.latitude, "lng": location.longitude}
+    technician.last_location_update = datetime.utcnow().isoformat()
+    await db.commit()
+    technician_locator.sync(technician)
+
     # Update location in tracking service
-    location_data = tracking_service.update_location(
+    location_data = await tracking_service.update_location(
         booking_id=booking_id,
         latitude=location.latitude,
         longitude=location.longitude,
@@ -163,19 +143,20 @@ async def update_technician_location(
     )
 
     # Calculate ETA if service location is available
-    if booking.service_latitude and booking.service_longitude:
+    service_location = booking.service_location or {}
+    if service_location.get("lat") is not None and service_location.get("lng") is not None:
         eta_info = tracking_service.calculate_eta(
             current_lat=location.latitude,
             current_lng=location.longitude,
-            destination_lat=booking.service_latitude,
-            destination_lng=booking.service_longitude,
-            average_speed_kmh=location.speed if location.speed else 40.0
+            destination_lat=service_location["lat"],
+            destination_lng=service_location["lng"],
+            average_speed_kmh=await tracking_service.estimate_speed(booking_id, "technician")
         )
 
-        tracking_service.update_eta(booking_id, eta_info["eta_minutes"])
+        await tracking_service.update_eta(booking_id, eta_info["eta_minutes"])
 
         # Broadcast to all connected clients
-        await manager.broadcast_to_booking(booking_id, {
+        await tracking_broadcaster.publish(booking_id, {
             "type": "location_update",
             "location": location_data,
             "eta": eta_info
@@ -191,8 +172,8 @@ async def update_technician_location(
 async def update_vehicle_location(
     booking_id: int,
     location: LocationUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update rental vehicle's current location
@@ -209,9 +190,7 @@ async def update_vehicle_location(
         )
 
     # Verify rental booking exists
-    rental = db.query(RentalBooking).filter(
-        RentalBooking.id == booking_id
-    ).first()
+    rental = await db.get(RentalBooking, booking_id)
 
     if not rental:
         raise HTTPException(
@@ -220,7 +199,7 @@ async def update_vehicle_location(
         )
 
     # Update location
-    location_data = tracking_service.update_location(
+    location_data = await tracking_service.update_location(
         booking_id=booking_id,
         latitude=location.latitude,
         longitude=location.longitude,
@@ -230,22 +209,180 @@ async def update_vehicle_location(
     )
 
     # Broadcast to connected clients
-    await manager.broadcast_to_booking(booking_id, {
+    await tracking_broadcaster.publish(booking_id, {
         "type": "location_update",
         "location": location_data
     })
 
+    point = (location.latitude, location.longitude, location.heading, location.speed, time.time())
+    await odometer_service.record({booking_id: [point]})
+    alerts = await geofence_monitor.process(db, {booking_id: [point]})
+    await _publish_geofence_alerts(alerts)
+
     return {
         "message": "Vehicle location updated successfully",
-        "location": location_data
+        "location": location_data,
+        "geofence_alerts": alerts.get(booking_id, [])
+    }
+
+
+@router.post("/vehicles/locations/batch")
+async def ingest_vehicle_locations(
+    request: Request,
+    x_tracker_key: str = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Bulk location upload from vehicle GPS trackers
+
+    - Points are keyed by RentalVehicle.gps_device_id, many devices per request
+    - Body is NDJSON (`application/x-ndjson`) or the packed binary format
+      (`application/octet-stream`), see gps_ingest_service
+    - Authenticated with the shared X-Tracker-Key header
+    - Each booking's subscribers get one broadcast per batch
+    """
+    if not settings.TRACKER_INGEST_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="GPS ingestion is not configured"
+        )
+
+    if not x_tracker_key or not hmac.compare_digest(x_tracker_key, settings.TRACKER_INGEST_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid tracker key"
+        )
+
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+
+    try:
+        if content_type.startswith("application/octet-stream"):
+            points_by_device = parse_packed(body)
+        else:
+            points_by_device = parse_ndjson(body)
+    except GpsBatchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    total_points = sum(len(points) for points in points_by_device.values())
+    if total_points > settings.TRACKING_BATCH_MAX_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.TRACKING_BATCH_MAX_POINTS} points"
+        )
+
+    bookings = await gps_ingest_service.resolve_bookings(db, points_by_device.keys())
+
+    points_by_booking = {}
+    rejected = 0
+    for device_id, points in points_by_device.items():
+        booking_id = bookings.get(device_id)
+        if booking_id is None:
+            continue
+
+        valid = [point for point in points if is_valid_point(point)]
+        rejected += len(points) - len(valid)
+        if valid:
+            points_by_booking.setdefault(booking_id, []).extend(valid)
+
+    # Devices buffer and may report out of order; keep one timeline per booking
+    for points in points_by_booking.values():
+        points.sort(key=lambda point: point[4])
+
+    recorded = await tracking_service.record_points(points_by_booking, tracker_type="vehicle")
+
+    for booking_id, path in recorded.items():
+        await tracking_broadcaster.publish(booking_id, {
+            "type": "location_update",
+            "location": path[-1],
+            "path": path
+        })
+
+    await odometer_service.record(points_by_booking)
+    alerts = await geofence_monitor.process(db, points_by_booking)
+    await _publish_geofence_alerts(alerts)
+
+    unknown_devices = [device_id for device_id, booking_id in bookings.items() if booking_id is None]
+
+    return {
+        "accepted": sum(len(points) for points in points_by_booking.values()),
+        "rejected": rejected,
+        "bookings_updated": len(recorded),
+        "geofence_alerts": sum(len(events) for events in alerts.values()),
+        "unknown_devices": unknown_devices
+    }
+
+
+async def _publish_geofence_alerts(alerts_by_booking):
+    for booking_id, events in alerts_by_booking.items():
+        await tracking_broadcaster.publish(booking_id, {
+            "type": "geofence_alert",
+            "alerts": events
+        })
+
+
+@router.get("/admin/live")
+async def get_live_map(
+    current_user: User = Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Live map of every active tracking session (Admin only)
+
+    ETAs for all technicians en route are computed in one vectorized call.
+    """
+    sessions = await tracking_service.get_active_sessions()
+
+    trackers = []
+    for session in sessions.values():
+        location = session.get("current_location")
+        trackers.append({
+            "booking_id": session["booking_id"],
+            "tracker_type": session["tracker_type"],
+            "location": location,
+            "started_at": session.get("started_at"),
+            "distance_km": None,
+            "eta_minutes": None
+        })
+
+    en_route = [
+        tracker for tracker in trackers
+        if tracker["tracker_type"] == "technician" and tracker["location"]
+    ]
+
+    if en_route:
+        destinations = {}
+        for booking_id, service_location in (await db.execute(
+            select(ServiceBooking.id, ServiceBooking.service_location)
+            .where(ServiceBooking.id.in_([tracker["booking_id"] for tracker in en_route]))
+        )).all():
+            if service_location and service_location.get("lat") is not None and service_location.get("lng") is not None:
+                destinations[booking_id] = (service_location["lat"], service_location["lng"])
+
+        en_route = [tracker for tracker in en_route if tracker["booking_id"] in destinations]
+
+        if en_route:
+            result = eta_service.calculate_etas(
+                [tracker["location"]["latitude"] for tracker in en_route],
+                [tracker["location"]["longitude"] for tracker in en_route],
+                [destinations[tracker["booking_id"]][0] for tracker in en_route],
+                [destinations[tracker["booking_id"]][1] for tracker in en_route],
+                [await tracking_service.estimate_speed(tracker["booking_id"]) for tracker in en_route]
+            )
+            for tracker, row in zip(en_route, eta_service.to_rows(result)):
+                tracker.update(row)
+
+    return {
+        "count": len(trackers),
+        "trackers": trackers
     }
 
 
 @router.get("/{booking_id}")
 async def get_tracking_info(
     booking_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get current tracking information
@@ -254,17 +391,17 @@ async def get_tracking_info(
     - Non-WebSocket alternative for simple polling
     """
     # Verify user has access to this booking
-    booking = db.query(ServiceBooking).filter(
+    booking = await db.scalar(select(ServiceBooking).where(
         ServiceBooking.id == booking_id,
         ServiceBooking.customer_id == current_user.id
-    ).first()
+    ))
 
     rental = None
     if not booking:
-        rental = db.query(RentalBooking).filter(
+        rental = await db.scalar(select(RentalBooking).where(
             RentalBooking.id == booking_id,
             RentalBooking.customer_id == current_user.id
-        ).first()
+        ))
 
     if not booking and not rental:
         raise HTTPException(
@@ -275,16 +412,15 @@ async def get_tracking_info(
     tracker_type = "technician" if booking else "vehicle"
 
     # Get current location
-    current_location = tracking_service.get_current_location(booking_id, tracker_type)
+    current_location = await tracking_service.get_current_location(booking_id, tracker_type)
 
     # Get tracking session info
-    session_key = f"{tracker_type}_{booking_id}"
-    session_info = tracking_service.active_sessions.get(session_key, {})
+    session_info = await tracking_service.get_session(booking_id, tracker_type)
 
     return {
         "booking_id": booking_id,
         "tracker_type": tracker_type,
-        "is_active": tracking_service.is_tracking_active(booking_id, tracker_type),
+        "is_active": await tracking_service.is_tracking_active(booking_id, tracker_type),
         "current_location": current_location,
         "eta_minutes": session_info.get("eta_minutes"),
         "started_at": session_info.get("started_at")
@@ -295,25 +431,23 @@ async def get_tracking_info(
 async def get_location_history(
     booking_id: int,
     limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get location history for a booking
 
     - Returns trail of locations
     - Useful for displaying route on map
+    - Once tracking has stopped, served from the archived (simplified) trips,
+      which are also returned as encoded polylines
     """
     # Verify access
-    booking = db.query(ServiceBooking).filter(
-        ServiceBooking.id == booking_id
-    ).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     rental = None
     if not booking:
-        rental = db.query(RentalBooking).filter(
-            RentalBooking.id == booking_id
-        ).first()
+        rental = await db.get(RentalBooking, booking_id)
 
     if not booking and not rental:
         raise HTTPException(
@@ -323,11 +457,25 @@ async def get_location_history(
 
     tracker_type = "technician" if booking else "vehicle"
 
-    history = tracking_service.get_location_history(booking_id, tracker_type, limit)
+    if not await tracking_service.is_tracking_active(booking_id, tracker_type):
+        trips = await trip_archive.get_trips(db, booking_id, tracker_type)
+        if trips:
+            history = trip_archive.history(trips, limit)
+            return {
+                "booking_id": booking_id,
+                "tracker_type": tracker_type,
+                "source": "archive",
+                "history": history,
+                "count": len(history),
+                "trips": [trip_archive.summary(trip) for trip in trips]
+            }
+
+    history = await tracking_service.get_location_history(booking_id, tracker_type, limit)
 
     return {
         "booking_id": booking_id,
         "tracker_type": tracker_type,
+        "source": "live",
         "history": history,
         "count": len(history)
     }
@@ -336,8 +484,8 @@ async def get_location_history(
 @router.post("/{booking_id}/start")
 async def start_tracking(
     booking_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Start tracking session manually
@@ -352,15 +500,11 @@ async def start_tracking(
         )
 
     # Verify booking
-    booking = db.query(ServiceBooking).filter(
-        ServiceBooking.id == booking_id
-    ).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     rental = None
     if not booking:
-        rental = db.query(RentalBooking).filter(
-            RentalBooking.id == booking_id
-        ).first()
+        rental = await db.get(RentalBooking, booking_id)
 
     if not booking and not rental:
         raise HTTPException(
@@ -370,7 +514,7 @@ async def start_tracking(
 
     tracker_type = "technician" if booking else "vehicle"
 
-    result = tracking_service.start_tracking(booking_id, tracker_type)
+    result = await tracking_service.start_tracking(booking_id, tracker_type)
 
     return result
 
@@ -378,8 +522,8 @@ async def start_tracking(
 @router.post("/{booking_id}/stop")
 async def stop_tracking(
     booking_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Stop tracking session"""
     if current_user.role not in [UserRole.TECHNICIAN, UserRole.ADMIN]:
@@ -388,15 +532,11 @@ async def stop_tracking(
             detail="Not authorized"
         )
 
-    booking = db.query(ServiceBooking).filter(
-        ServiceBooking.id == booking_id
-    ).first()
+    booking = await db.get(ServiceBooking, booking_id)
 
     rental = None
     if not booking:
-        rental = db.query(RentalBooking).filter(
-            RentalBooking.id == booking_id
-        ).first()
+        rental = await db.get(RentalBooking, booking_id)
 
     if not booking and not rental:
         raise HTTPException(
@@ -406,6 +546,13 @@ async def stop_tracking(
 
     tracker_type = "technician" if booking else "vehicle"
 
-    tracking_service.stop_tracking(booking_id, tracker_type)
+    trip = await trip_archive.archive(db, booking_id, tracker_type, complete=True)
+    await tracking_service.stop_tracking(booking_id, tracker_type)
+    if rental:
+        await odometer_service.forget(booking_id)
+        await geofence_monitor.forget(booking_id)
 
-    return {"message": "Tracking stopped"}
+    return {
+        "message": "Tracking stopped",
+        "trip": trip_archive.summary(trip) if trip else None
+    }
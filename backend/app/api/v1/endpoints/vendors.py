@@ -1,13 +1,14 @@
 """Vendor portal endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
 from app.core.database import get_db
 from app.api.v1.deps import get_current_user
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_password_hash
 from app.models.user import User, UserRole
 from app.models.store import Vendor, Product, Order, OrderItem
@@ -136,12 +137,18 @@ async def update_my_profile(
 
 @router.get("/me/products", response_model=List[ProductResponse])
 async def get_my_products(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all my products"""
+    """
+    Get all my products, newest first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
     if current_user.role != UserRole.VENDOR:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -158,26 +165,31 @@ async def get_my_products(
             detail="Vendor profile not found"
         )
 
-    products = db.query(Product).filter(
-        Product.vendor_id == vendor.id
-    ).offset(skip).limit(limit).all()
+    sort_keys = (Product.created_at, Product.id)
+    products = paginate(
+        db.query(Product).filter(Product.vendor_id == vendor.id), sort_keys, skip, limit, cursor
+    ).all()
+    set_next_cursor(response, products, sort_keys, limit)
 
     return products
 
 
 @router.get("/me/orders", response_model=List[OrderResponse])
 async def get_my_orders(
+    response: Response,
     status_filter: str = None,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get orders containing my products
 
-    - View all orders with my products
+    - View all orders with my products, newest first
     - Filter by status
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
     """
     if current_user.role != UserRole.VENDOR:
         raise HTTPException(
@@ -203,9 +215,9 @@ async def get_my_orders(
     if status_filter:
         query = query.filter(Order.status == status_filter)
 
-    orders = query.order_by(
-        Order.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    sort_keys = (Order.created_at, Order.id)
+    orders = paginate(query, sort_keys, skip, limit, cursor).all()
+    set_next_cursor(response, orders, sort_keys, limit)
 
     return orders
 
@@ -457,12 +469,18 @@ async def request_payout(
 
 @router.get("/me/payout-history")
 async def get_payout_history(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get payout history"""
+    """
+    Get payout history, newest first
+
+    - **cursor**: Value of the X-Next-Cursor header from the previous page (replaces skip)
+    """
     if current_user.role != UserRole.VENDOR:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -481,9 +499,11 @@ async def get_payout_history(
 
     # Get payout transactions (payments with negative amounts)
     from app.models.payment import Payment
-    payouts = db.query(Payment).filter(
+    sort_keys = (Payment.created_at, Payment.id)
+    payouts = paginate(db.query(Payment).filter(
         Payment.user_id == current_user.id,
         Payment.payment_method == "paystack_transfer"
-    ).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
+    ), sort_keys, skip, limit, cursor).all()
+    set_next_cursor(response, payouts, sort_keys, limit)
 
     return payouts
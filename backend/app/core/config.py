@@ -19,6 +19,12 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: PostgresDsn
 
+    # Async database (asyncpg) - set USE_ASYNC_DB=false to fall back to the sync engine
+    USE_ASYNC_DB: bool = True
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL when unset
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 40
+
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -91,6 +97,61 @@ class Settings(BaseSettings):
     SMILE_ID_CALLBACK_URL: Optional[str] = None
     SMILE_ID_ENVIRONMENT: str = "sandbox"  # sandbox or production
 
+    # Real-time tracking
+    TRACKING_BACKEND: str = "memory"  # memory (single worker) or redis (shared across workers)
+    REDIS_URL: Optional[str] = None
+    TRACKING_HISTORY_LIMIT: int = 100  # points kept per tracking session
+    TRACKING_HISTORY_TTL: int = 86400  # seconds history outlives its last update
+    TRIP_ARCHIVE_INTERVAL: float = 120.0  # seconds between folding ingested points into stored trips
+    TRIP_SIMPLIFY_TOLERANCE_M: float = 10.0  # Douglas-Peucker tolerance for stored trips
+    ODOMETER_FLUSH_INTERVAL: float = 30.0  # seconds between writing measured distance
+    ODOMETER_STAY_RADIUS_M: float = 30.0  # fixes within this of the last stay point are treated as GPS noise
+    ODOMETER_MAX_SPEED_KMH: float = 200.0  # faster jumps are dropped as spikes
+    ODOMETER_STATIONARY_SPEED_KMH: float = 1.0  # pings reporting a lower speed are not moving
+    ODOMETER_MAX_GAP_SECONDS: float = 600.0  # longer tracker silences are not bridged
+    TRACKING_WS_QUEUE_SIZE: int = 32  # pending updates per socket before the oldest is dropped
+    TRACKING_WS_SEND_TIMEOUT: float = 5.0  # seconds before a stalled socket is evicted
+    TRACKER_INGEST_KEY: Optional[str] = None  # Shared key GPS devices send as X-Tracker-Key
+    TRACKING_DEVICE_CACHE_TTL: int = 60  # seconds a device -> booking lookup is reused
+    TRACKING_BATCH_MAX_POINTS: int = 10000
+
+    # Technician matching
+    TECHNICIAN_INDEX_CELL_DEG: float = 0.01  # grid cell size (~1.1km)
+    TECHNICIAN_INDEX_REFRESH: int = 30  # seconds between rebuilds from the database
+
+    # Technician dispatch
+    DISPATCH_INTERVAL: float = 2.0  # seconds between dispatch rounds
+    DISPATCH_OFFER_TIMEOUT: int = 45  # seconds a technician has to accept an offer
+    DISPATCH_RETRY_DELAY: int = 30  # seconds before retrying a booking with no free technician
+    DISPATCH_MAX_ATTEMPTS: int = 5  # offers per booking before it is left for manual assignment
+    DISPATCH_CANDIDATES: int = 10  # nearest technicians scored per booking
+    DISPATCH_MAX_RADIUS_KM: float = 25.0
+    DISPATCH_MAX_ACTIVE_JOBS: int = 2  # jobs a technician can hold before dropping out of dispatch
+    DISPATCH_BATCH_SIZE: int = 200  # bookings scored together per round
+
+    # Rental availability & pricing
+    RENTAL_INDEX_REFRESH: int = 30  # seconds between booking calendar rebuilds from the database
+    RENTAL_QUOTE_CACHE_SIZE: int = 10000  # memoized (vehicle, window) price quotes per worker
+    RENTAL_QUOTE_CACHE_TTL: int = 300
+    RENTAL_OVERDUE_INTERVAL: float = 60.0  # seconds between overdue sweeps
+    RENTAL_OVERDUE_GRACE_MINUTES: int = 60  # lateness tolerated before a booking goes overdue
+    RENTAL_LATE_FEE_MULTIPLIER: float = 1.5  # late window priced at this multiple of the normal rate
+    RENTAL_OVERDUE_BATCH_SIZE: int = 500
+    GEOFENCE_CACHE_TTL: int = 60  # seconds a booking's compiled fence is reused
+    GEOFENCE_MAX_ALERTS: int = 100  # alerts kept on a booking, oldest dropped first
+    FLEET_UTILIZATION_INTERVAL: float = 300.0  # seconds between utilization rollups
+    FLEET_UTILIZATION_BATCH_SIZE: int = 100  # vehicles rebuilt per transaction
+
+    # Store search
+    PRODUCT_SEARCH_REFRESH: int = 10  # seconds between catching up the search index with product changes
+    PRODUCT_SEARCH_MAX_RESULTS: int = 1000  # ranked matches filtered at a time; widened until a page fills
+    PRODUCT_FACET_PRICE_BUCKETS: str = "50,100,250,500,1000"  # comma-separated bucket edges (GHS)
+    PRODUCT_FACET_CACHE_SIZE: int = 1000  # memoized facet results (one per filter set) per worker
+    PRODUCT_FACET_CACHE_TTL: int = 60
+
+    # Admin dashboard
+    ADMIN_STATS_CACHE_TTL: int = 30  # seconds the overview snapshot is reused
+
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
@@ -2,7 +2,8 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from starlette.concurrency import run_in_threadpool
+from typing import Any, AsyncGenerator, Generator
 from app.core.config import settings
 
 # Create engine
@@ -38,3 +39,122 @@ def get_db() -> Generator[Session, None, None]:
 def init_db():
     """Initialize database - create all tables"""
     Base.metadata.create_all(bind=engine)
+
+
+# ==================== ASYNC SESSIONS ====================
+
+def get_async_database_url() -> str:
+    """Build the asyncpg URL from DATABASE_URL unless one is configured explicitly"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    url = str(settings.DATABASE_URL)
+    # asyncpg takes ?ssl=... rather than libpq's ?sslmode=...
+    url = url.replace("sslmode=", "ssl=")
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+if settings.USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        get_async_database_url(),
+        pool_pre_ping=True,
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        echo=settings.DEBUG
+    )
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+
+# Sync sessions handed out through the async interface when USE_ASYNC_DB is off.
+# Objects stay loaded after commit, matching the AsyncSession behaviour above.
+FallbackSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine
+)
+
+
+class SyncSessionAdapter:
+    """
+    Awaitable wrapper around a synchronous Session
+
+    Exposes the subset of the AsyncSession API used by the endpoints and runs
+    every database round-trip in the threadpool, so switching USE_ASYNC_DB off
+    falls back to psycopg2 without blocking the event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None) -> None:
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance: Any, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+async def get_async_db() -> AsyncGenerator[Any, None]:
+    """
+    Get async database session
+
+    Yields an AsyncSession bound to the asyncpg engine, or a SyncSessionAdapter
+    over the psycopg2 engine when USE_ASYNC_DB is disabled.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = SyncSessionAdapter(FallbackSessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -3,6 +3,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.services.tracking_broadcaster import tracking_broadcaster
+from app.services.dispatch_service import dispatch_engine
+from app.services.rental_scheduler import rental_overdue_scheduler
+from app.services.fleet_utilization import fleet_utilization
+from app.services.trip_archive import trip_archive
+from app.services.odometer_service import odometer_service
 
 # Import all models to ensure they are registered with SQLAlchemy
 from app.models import (
@@ -42,12 +48,24 @@ async def startup_event():
         print("[OK] Database tables created")
     except Exception as e:
         print(f"[WARNING] Database tables may already exist: {str(e)}")
+    await tracking_broadcaster.start()
+    await dispatch_engine.start()
+    await rental_overdue_scheduler.start()
+    await fleet_utilization.start()
+    await trip_archive.start()
+    await odometer_service.start()
     print(f"[OK] {settings.APP_NAME} API started")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown"""
+    await odometer_service.stop()
+    await trip_archive.stop()
+    await fleet_utilization.stop()
+    await rental_overdue_scheduler.stop()
+    await dispatch_engine.stop()
+    await tracking_broadcaster.stop()
     print(f"[BYE] {settings.APP_NAME} API shutting down")
 
 
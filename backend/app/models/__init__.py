@@ -13,12 +13,14 @@ from app.models.rental import (
     RentalVehicle,
     RentalBooking,
     RentalBookingStatus,
+    RentalVehicleDailyUsage,
     VehicleInspection,
     FleetSubscription
 )
 from app.models.store import (
     Product,
     ProductCategory,
+    ProductCompatibility,
     Vendor,
     Order,
     OrderItem,
@@ -31,7 +33,8 @@ from app.models.payment import Payment, PaymentStatus, PaymentMethod
 from app.models.notification import Notification, NotificationType
 from app.models.application import RoleApplication, ApplicationStatus, ApplicationType
 from app.models.fraud import FraudAlert, FraudType, FraudStatus
-from app.models.analytics import AnalyticsEvent, DailyStats, EventType, VisitorType
+from app.models.analytics import AnalyticsEvent, DailyStats, RollupCheckpoint, EventType, VisitorType
+from app.models.tracking import TrackingTrip
 
 __all__ = [
     "User",
@@ -48,10 +51,12 @@ __all__ = [
     "RentalVehicle",
     "RentalBooking",
     "RentalBookingStatus",
+    "RentalVehicleDailyUsage",
     "VehicleInspection",
     "FleetSubscription",
     "Product",
     "ProductCategory",
+    "ProductCompatibility",
     "Vendor",
     "Order",
     "OrderItem",
@@ -72,6 +77,8 @@ __all__ = [
     "FraudStatus",
     "AnalyticsEvent",
     "DailyStats",
+    "RollupCheckpoint",
     "EventType",
     "VisitorType",
+    "TrackingTrip",
 ]
@@ -1,6 +1,6 @@
 """Analytics and visitor tracking models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -165,3 +165,22 @@ class DailyStats(BaseModel):
 
     def __repr__(self):
         return f"<DailyStats {self.date}>"
+
+
+class RollupCheckpoint(BaseModel):
+    """High-water mark for incremental aggregation jobs (e.g. DailyStats rollup)"""
+
+    __tablename__ = "rollup_checkpoints"
+
+    job_name = Column(String(100), nullable=False, unique=True, index=True)
+
+    # Source rows updated after this instant still need to be rolled up
+    high_water_mark = Column(DateTime, nullable=True)
+
+    # Last run bookkeeping
+    last_run_at = Column(DateTime, nullable=True)
+    last_run_days = Column(Integer, default=0, nullable=False)
+    last_run_ms = Column(Float, nullable=True)
+
+    def __repr__(self):
+        return f"<RollupCheckpoint {self.job_name} @ {self.high_water_mark}>"
@@ -1,6 +1,6 @@
 """User role application models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -25,6 +25,10 @@ class RoleApplication(BaseModel):
     """User application to become technician, vendor, or rental manager"""
 
     __tablename__ = "role_applications"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_role_applications_created_id", "created_at", "id"),
+    )
 
     # Applicant
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
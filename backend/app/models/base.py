@@ -16,7 +16,8 @@ class BaseModel(Base):
         DateTime,
         default=datetime.utcnow,
         onupdate=datetime.utcnow,
-        nullable=False
+        nullable=False,
+        index=True  # Incremental jobs (DailyStats rollup, search refresh) read rows changed since a watermark
     )
 
     @declared_attr
@@ -1,6 +1,6 @@
 """Mobile Car Maintenance models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -54,6 +54,10 @@ class Technician(BaseModel):
     """Technician profile"""
 
     __tablename__ = "technicians"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_technicians_rating_id", "average_rating", "id"),
+    )
 
     # Link to user account
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
@@ -117,6 +121,12 @@ class ServiceBooking(BaseModel):
     """Service booking"""
 
     __tablename__ = "service_bookings"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_service_bookings_created_id", "created_at", "id"),
+        Index("ix_service_bookings_customer_created_id", "customer_id", "created_at", "id"),
+        Index("ix_service_bookings_technician_created_id", "technician_id", "created_at", "id"),
+    )
 
     # Customer & Vehicle
     customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -158,6 +168,12 @@ class ServiceBooking(BaseModel):
     technician_response_time = Column(Integer, nullable=True)  # seconds
     eta_minutes = Column(Integer, nullable=True)
 
+    # Dispatch: the open offer (one technician at a time) and every attempt made
+    offered_technician_id = Column(Integer, nullable=True, index=True)
+    offered_at = Column(DateTime, nullable=True)
+    offer_expires_at = Column(DateTime, nullable=True, index=True)
+    dispatch_attempts = Column(JSON, nullable=True)  # [{technician_id, score, distance_km, offered_at, outcome}]
+
     # Cancellation
     cancellation_reason = Column(Text, nullable=True)
     cancelled_by = Column(String(50), nullable=True)  # customer/technician/system
@@ -1,6 +1,6 @@
 """Notification models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -30,6 +30,10 @@ class Notification(BaseModel):
     """User notification"""
 
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_notifications_user_created_id", "user_id", "created_at", "id"),
+    )
 
     # Recipient
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
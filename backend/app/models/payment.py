@@ -1,6 +1,6 @@
 """Payment models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -31,6 +31,10 @@ class Payment(BaseModel):
     """Payment transaction"""
 
     __tablename__ = "payments"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_payments_user_created_id", "user_id", "created_at", "id"),
+    )
 
     # User
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
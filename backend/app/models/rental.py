@@ -1,6 +1,6 @@
 """Car Rental models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -19,6 +19,10 @@ class RentalVehicle(BaseModel):
     """Rental fleet vehicles"""
 
     __tablename__ = "rental_vehicles"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_rental_vehicles_rating_id", "average_rating", "id"),
+    )
 
     # Vehicle Details
     make = Column(String(100), nullable=False)
@@ -57,6 +61,7 @@ class RentalVehicle(BaseModel):
 
     # Maintenance
     odometer_reading = Column(Integer, nullable=True)
+    tracked_distance_km = Column(Float, default=0.0, nullable=False)  # Driven distance measured from GPS tracking
     last_service_date = Column(String(50), nullable=True)
     next_service_due = Column(String(50), nullable=True)
     condition_notes = Column(Text, nullable=True)
@@ -81,12 +86,19 @@ class RentalBooking(BaseModel):
     """Rental bookings"""
 
     __tablename__ = "rental_bookings"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_rental_bookings_created_id", "created_at", "id"),
+        Index("ix_rental_bookings_customer_created_id", "customer_id", "created_at", "id"),
+        # Overdue sweeps: status = ACTIVE AND return_datetime < now
+        Index("ix_rental_bookings_status_return", "status", "return_datetime"),
+    )
 
     # Customer
     customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     # Vehicle
-    vehicle_id = Column(Integer, ForeignKey("rental_vehicles.id", ondelete="SET NULL"), nullable=True)
+    vehicle_id = Column(Integer, ForeignKey("rental_vehicles.id", ondelete="SET NULL"), nullable=True, index=True)
 
     # Booking Details
     booking_reference = Column(String(50), unique=True, nullable=False, index=True)
@@ -161,6 +173,26 @@ class RentalBooking(BaseModel):
         return f"<RentalBooking {self.booking_reference}>"
 
 
+class RentalVehicleDailyUsage(BaseModel):
+    """Per-vehicle, per-day booking aggregate behind the fleet utilization report"""
+
+    __tablename__ = "rental_vehicle_daily_usage"
+    __table_args__ = (
+        UniqueConstraint("vehicle_id", "date", name="uq_rental_vehicle_daily_usage"),
+    )
+
+    vehicle_id = Column(Integer, ForeignKey("rental_vehicles.id", ondelete="CASCADE"), nullable=False)
+    date = Column(String(20), nullable=False)  # YYYY-MM-DD; only days with a booking have a row
+
+    booked_hours = Column(Float, default=0.0, nullable=False)
+    bookings = Column(Integer, default=0, nullable=False)  # Bookings overlapping this day
+    bookings_started = Column(Integer, default=0, nullable=False)  # Bookings picked up on this day
+    revenue = Column(Float, default=0.0, nullable=False)  # Booking revenue prorated by hours on this day
+
+    def __repr__(self):
+        return f"<RentalVehicleDailyUsage {self.vehicle_id} {self.date}>"
+
+
 class VehicleInspection(BaseModel):
     """Vehicle inspection records"""
 
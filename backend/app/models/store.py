@@ -1,6 +1,6 @@
 """Online Auto Store models"""
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Text, JSON, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -93,6 +93,11 @@ class Product(BaseModel):
     """Product listing"""
 
     __tablename__ = "products"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_products_rating_id", "average_rating", "id"),
+        Index("ix_products_vendor_created_id", "vendor_id", "created_at", "id"),
+    )
 
     # Vendor
     vendor_id = Column(Integer, ForeignKey("vendors.id", ondelete="CASCADE"), nullable=False)
@@ -152,6 +157,30 @@ class Product(BaseModel):
         return f"<Product {self.name}>"
 
 
+class ProductCompatibility(BaseModel):
+    """
+    Normalized vehicle fitment of a product, derived from its compatible_* arrays
+
+    One row per (make, model, contiguous year range). A NULL make or model
+    means the product declared none (fits any); NULL years mean any year.
+    """
+
+    __tablename__ = "product_compatibility"
+    __table_args__ = (
+        Index("ix_product_compatibility_lookup", "make", "model", "year_from"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    make = Column(String(100), nullable=True)  # Normalized: lowercase, single spaces
+    model = Column(String(100), nullable=True)
+    year_from = Column(Integer, nullable=True)
+    year_to = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<ProductCompatibility {self.product_id} {self.make} {self.model} {self.year_from}-{self.year_to}>"
+
+
 class Cart(BaseModel):
     """Shopping cart"""
 
@@ -188,6 +217,11 @@ class Order(BaseModel):
     """Customer order"""
 
     __tablename__ = "orders"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_orders_created_id", "created_at", "id"),
+        Index("ix_orders_customer_created_id", "customer_id", "created_at", "id"),
+    )
 
     # Customer & Vendor
     customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -289,6 +323,10 @@ class ProductReview(BaseModel):
     """Product review"""
 
     __tablename__ = "product_reviews"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_product_reviews_product_created_id", "product_id", "created_at", "id"),
+    )
 
     product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
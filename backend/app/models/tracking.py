@@ -0,0 +1,33 @@
+"""Archived tracking trips"""
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, Float, Boolean, DateTime
+from app.models.base import BaseModel
+
+
+class TrackingTrip(BaseModel):
+    """A finished (or in-progress) tracking session, simplified and encoded"""
+
+    __tablename__ = "tracking_trips"
+
+    tracker_type = Column(String(20), nullable=False)  # technician/vehicle
+
+    # Related Entity (one of these will be set)
+    service_booking_id = Column(Integer, ForeignKey("service_bookings.id", ondelete="CASCADE"), nullable=True, index=True)
+    rental_booking_id = Column(Integer, ForeignKey("rental_bookings.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    # Simplified path: Google encoded polyline (1e-5 degrees) plus the
+    # recorded_at of each vertex as delta-encoded seconds in the same format
+    polyline = Column(Text, nullable=False, default="")
+    timestamps = Column(Text, nullable=False, default="")
+    point_count = Column(Integer, default=0, nullable=False)
+    raw_point_count = Column(Integer, default=0, nullable=False)
+
+    # Totals over the raw points
+    distance_km = Column(Float, default=0.0, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    ended_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Integer, default=0, nullable=False)
+
+    is_complete = Column(Boolean, default=False, nullable=False)  # tracking stopped
+
+    def __repr__(self):
+        return f"<TrackingTrip {self.tracker_type} {self.service_booking_id or self.rental_booking_id}>"
@@ -1,6 +1,6 @@
 """User models"""
 import enum
-from sqlalchemy import Column, String, Boolean, Enum, Text, JSON, Float, Integer
+from sqlalchemy import Column, String, Boolean, Enum, Text, JSON, Float, Integer, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -27,6 +27,10 @@ class User(BaseModel):
     """User model"""
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Listing sort orders, for keyset pagination (id breaks ties)
+        Index("ix_users_created_id", "created_at", "id"),
+    )
 
     # Basic Information
     email = Column(String(255), unique=True, index=True, nullable=False)
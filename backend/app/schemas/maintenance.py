@@ -80,6 +80,11 @@ class TechnicianResponse(TechnicianBase):
         from_attributes = True
 
 
+class NearbyTechnicianResponse(TechnicianResponse):
+    """Technician with distance from the searched point"""
+    distance_km: float
+
+
 # Service Booking Schemas
 class ServiceBookingBase(BaseModel):
     """Base service booking schema"""
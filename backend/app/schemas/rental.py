@@ -47,6 +47,76 @@ class RentalVehicleUpdate(BaseModel):
     is_available: Optional[bool] = None
 
 
+class RentalQuoteRequest(BaseModel):
+    """Bulk price quote request"""
+    vehicle_ids: List[int] = Field(min_length=1, max_length=100)
+    pickup_datetime: datetime
+    return_datetime: datetime
+    with_driver: bool = False
+    delivery_requested: bool = False
+
+
+class RentalQuoteResponse(BaseModel):
+    """Price quote for one vehicle and rental window"""
+    vehicle_id: int
+    pickup_datetime: datetime
+    return_datetime: datetime
+    duration_hours: int
+    duration_days: int
+    breakdown: Dict[str, int]  # months, weeks, days, hours charged
+    base_cost: float
+    driver_cost: float
+    delivery_cost: float
+    total_cost: float
+    security_deposit: float
+
+
+class FleetUtilizationRow(BaseModel):
+    """Utilization of one vehicle over the report range"""
+    vehicle_id: int
+    license_plate: str
+    make: str
+    model: str
+    available_days: int
+    booked_days: int
+    booked_hours: float
+    utilization_rate: float  # booked_days / available_days
+    bookings: int  # bookings picked up within the range
+    revenue: float  # prorated to the days inside the range
+    revenue_per_available_day: float
+    longest_idle_days: int
+    longest_idle_start: Optional[date] = None
+
+
+class FleetUtilizationReport(BaseModel):
+    """Fleet utilization report"""
+    start_date: date
+    end_date: date
+    refreshed_at: Optional[datetime] = None  # last rollup; bookings changed since then are not reflected yet
+    available_days: int
+    booked_days: int
+    utilization_rate: float
+    revenue: float
+    vehicles: List[FleetUtilizationRow]
+
+
+class FleetVehicleDistance(BaseModel):
+    """Tracked distance of one subscription vehicle"""
+    vehicle_id: int
+    license_plate: str
+    odometer_reading: Optional[int] = None
+    tracked_distance_km: float
+
+
+class FleetSubscriptionUsage(BaseModel):
+    """Near-real-time distance driven under a fleet subscription"""
+    subscription_id: int
+    subscription_name: str
+    total_distance_km: float  # flushed total plus distance not flushed yet
+    total_incidents: int
+    vehicles: List[FleetVehicleDistance]
+
+
 class RentalVehicleResponse(BaseModel):
     """Rental vehicle response schema"""
     id: int
@@ -67,6 +137,7 @@ class RentalVehicleResponse(BaseModel):
     is_available: bool
     average_rating: float = 0.0
     total_rentals: int = 0
+    quote: Optional[RentalQuoteResponse] = None  # Set when searching with a rental window
     created_at: datetime
     updated_at: datetime
 
@@ -89,6 +160,10 @@ class RentalBookingCreate(RentalBookingBase):
     driver_license_number: str
     additional_drivers: Optional[List[Dict[str, str]]] = None
     insurance_option: Optional[str] = None
+    with_driver: bool = False
+    delivery_requested: bool = False
+    ghana_card: Optional[Dict[str, Any]] = None  # Document upload info; may follow after booking
+    proof_of_address: Optional[Dict[str, Any]] = None
 
 
 class RentalBookingUpdate(BaseModel):
@@ -100,26 +175,32 @@ class RentalBookingUpdate(BaseModel):
     status: Optional[RentalStatus] = None
 
 
-class RentalBookingResponse(RentalBookingBase):
+class RentalBookingResponse(BaseModel):
     """Rental booking response schema"""
     id: int
     customer_id: int
-    booking_number: str
+    vehicle_id: Optional[int] = None
+    booking_reference: str
     status: RentalStatus
-    total_days: int
-    daily_rate: float
-    total_price: float
-    security_deposit: float
-    insurance_cost: Optional[float]
-    driver_license_number: str
-    additional_drivers: Optional[List[Dict[str, str]]]
-    picked_up_at: Optional[datetime]
-    returned_at: Optional[datetime]
-    actual_return_date: Optional[date]
-    late_fee: Optional[float]
-    damage_fee: Optional[float]
-    customer_rating: Optional[int]
-    customer_feedback: Optional[str]
+    pickup_datetime: str
+    return_datetime: str
+    actual_pickup_datetime: Optional[str] = None
+    actual_return_datetime: Optional[str] = None
+    duration_hours: int
+    duration_days: int
+    pickup_location: Dict[str, Any]
+    return_location: Dict[str, Any]
+    delivery_requested: bool
+    with_driver: bool
+    base_cost: float
+    driver_cost: float
+    delivery_cost: float
+    extension_cost: float
+    damage_charges: float
+    late_return_penalty: float
+    total_cost: float
+    customer_rating: Optional[int] = None
+    customer_review: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -143,7 +224,7 @@ class VehicleInspectionCreate(BaseModel):
     """Create vehicle inspection schema"""
     booking_id: int
     inspection_type: str  # pickup or return
-    odometer_reading: int = Field(ge=0)
+    odometer_reading: Optional[int] = Field(None, ge=0)  # Defaults to the tracked odometer
     fuel_level: int = Field(ge=0, le=100)
     exterior_condition: str
     interior_condition: str
@@ -1,5 +1,5 @@
 """Online auto store schemas"""
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 from app.models.store import OrderStatus
@@ -23,6 +23,7 @@ class ProductCreate(ProductBase):
     specifications: Optional[Dict[str, Any]] = None
     compatible_makes: Optional[List[str]] = None
     compatible_models: Optional[List[str]] = None
+    compatible_years: Optional[List[Union[int, str]]] = None
 
 
 class ProductUpdate(BaseModel):
@@ -37,6 +38,7 @@ class ProductUpdate(BaseModel):
     specifications: Optional[Dict[str, Any]] = None
     compatible_makes: Optional[List[str]] = None
     compatible_models: Optional[List[str]] = None
+    compatible_years: Optional[List[Union[int, str]]] = None
     is_active: Optional[bool] = None
 
 
@@ -49,6 +51,7 @@ class ProductResponse(ProductBase):
     specifications: Optional[Dict[str, Any]]
     compatible_makes: Optional[List[str]]
     compatible_models: Optional[List[str]]
+    compatible_years: Optional[List[Union[int, str]]] = None
     is_active: bool
     average_rating: float
     total_ratings: int
@@ -60,6 +63,28 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
+class FacetValueCount(BaseModel):
+    """Products with one facet value"""
+    value: str
+    count: int
+
+
+class PriceBucketCount(BaseModel):
+    """Products in a price bucket; min is inclusive, max exclusive, None is open-ended"""
+    min: Optional[float]
+    max: Optional[float]
+    count: int
+
+
+class ProductFacets(BaseModel):
+    """Facet counts next to a product listing"""
+    total: int
+    category: List[FacetValueCount]
+    brand: List[FacetValueCount]
+    price: List[PriceBucketCount]
+    condition: List[FacetValueCount]
+
+
 # Vendor Schemas
 class VendorBase(BaseModel):
     """Base vendor schema"""
@@ -145,6 +170,7 @@ class CartResponse(BaseModel):
 class OrderCreate(BaseModel):
     """Create order schema"""
     delivery_address: Dict[str, Any]
+    delivery_option: str = "standard"
     payment_method: str
     notes: Optional[str] = None
 
@@ -105,3 +105,17 @@ class AvailabilityUpdate(BaseModel):
                 "is_available": True
             }
         }
+
+
+class TechnicianLocationUpdate(BaseModel):
+    """Current position reported by the technician app"""
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "latitude": 5.6037,
+                "longitude": -0.1870
+            }
+        }
@@ -0,0 +1,350 @@
+"""Platform overview statistics for the admin dashboard"""
+import asyncio
+import time
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, distinct, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User, UserRole
+from app.models.maintenance import ServiceBooking, MaintenanceService, Technician
+from app.models.rental import RentalBooking, RentalVehicle
+from app.models.store import Order, Product, Vendor
+from app.models.application import RoleApplication, ApplicationStatus
+from app.models.payment import Payment, PaymentStatus
+from app.models.fraud import FraudAlert, FraudStatus
+from app.models.analytics import AnalyticsEvent, DailyStats, EventType
+
+
+class AdminStatsService:
+    """
+    Builds the admin overview with a handful of aggregate queries and keeps
+    the result as a short-lived snapshot shared by every admin request
+    """
+
+    def __init__(self, ttl_seconds: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._built_at: Optional[datetime] = None
+        self._built_monotonic: float = 0.0
+        self._build_ms: float = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and time.monotonic() - self._built_monotonic < self.ttl_seconds
+        )
+
+    async def get_overview(self, db: AsyncSession, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Return the cached overview, rebuilding it when stale
+
+        Concurrent callers wait on a single rebuild instead of each running
+        the aggregate queries.
+        """
+        cached = not force_refresh and self._is_fresh()
+
+        if not cached:
+            async with self._lock:
+                # Another request may have rebuilt it while we waited
+                if force_refresh or not self._is_fresh():
+                    started = time.perf_counter()
+                    snapshot = await self.build_overview(db)
+                    self._build_ms = (time.perf_counter() - started) * 1000
+                    self._snapshot = snapshot
+                    self._built_at = datetime.utcnow()
+                    self._built_monotonic = time.monotonic()
+                else:
+                    cached = True
+
+        return {
+            **self._snapshot,
+            "snapshot": {
+                "generated_at": self._built_at.isoformat(),
+                "age_seconds": round(time.monotonic() - self._built_monotonic, 2),
+                "build_ms": round(self._build_ms, 2),
+                "ttl_seconds": self.ttl_seconds,
+                "cached": cached
+            }
+        }
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next request rebuilds it"""
+        self._snapshot = None
+
+    async def build_overview(self, db: AsyncSession) -> Dict[str, Any]:
+        """Run the aggregate queries and assemble the overview payload"""
+        today = datetime.now().date()
+        last_7_days = today - timedelta(days=7)
+        today_start = datetime.combine(today, datetime.min.time())
+        tomorrow_start = today_start + timedelta(days=1)
+
+        def created_today(model):
+            return model.created_at >= today_start
+
+        # ==================== USERS ====================
+        users = (await db.execute(select(
+            func.count(User.id),
+            func.count(User.id).filter(User.is_active == True),
+            func.count(User.id).filter(User.is_verified == True),
+            func.count(User.id).filter(created_today(User)),
+        ))).one()
+
+        role_counts = dict((await db.execute(
+            select(User.role, func.count(User.id)).group_by(User.role)
+        )).all())
+        users_by_role = {role.value: role_counts.get(role, 0) for role in UserRole}
+
+        # ==================== VISITORS & ANALYTICS ====================
+        visitors = (await db.execute(select(
+            func.count(distinct(AnalyticsEvent.session_id)),
+            func.count(distinct(AnalyticsEvent.session_id)).filter(created_today(AnalyticsEvent)),
+            func.count(AnalyticsEvent.id).filter(AnalyticsEvent.event_type == EventType.PAGE_VIEW),
+            func.count(AnalyticsEvent.id).filter(
+                AnalyticsEvent.event_type == EventType.PAGE_VIEW,
+                created_today(AnalyticsEvent)
+            ),
+        ))).one()
+
+        # ==================== BOOKINGS & ORDERS ====================
+        async def total_and_today(model):
+            return (await db.execute(select(
+                func.count(model.id),
+                func.count(model.id).filter(created_today(model)),
+            ))).one()
+
+        service_bookings = await total_and_today(ServiceBooking)
+        rental_bookings = await total_and_today(RentalBooking)
+        orders = await total_and_today(Order)
+
+        # ==================== REVENUE & PAYMENTS ====================
+        # completed_at is an ISO string, so a lexicographic range selects today
+        completed = Payment.status == PaymentStatus.COMPLETED
+        payments = (await db.execute(select(
+            func.coalesce(func.sum(Payment.amount).filter(completed), 0.0),
+            func.coalesce(func.sum(Payment.amount).filter(
+                completed,
+                Payment.completed_at >= today.isoformat(),
+                Payment.completed_at < tomorrow_start.date().isoformat()
+            ), 0.0),
+            func.coalesce(func.sum(Payment.platform_fee).filter(completed), 0.0),
+            func.count(Payment.id),
+            func.count(Payment.id).filter(completed),
+            func.count(Payment.id).filter(
+                Payment.status == PaymentStatus.FAILED,
+                created_today(Payment)
+            ),
+        ))).one()
+        total_payments, successful_payments = payments[3], payments[4]
+        payment_success_rate = (successful_payments / total_payments * 100) if total_payments > 0 else 0
+
+        # ==================== CATALOG ====================
+        products = (await db.execute(select(
+            func.count(Product.id),
+            func.count(Product.id).filter(Product.is_active == True),
+        ))).one()
+        vehicles = (await db.execute(select(
+            func.count(RentalVehicle.id),
+            func.count(RentalVehicle.id).filter(RentalVehicle.is_available == True),
+        ))).one()
+        total_services = await db.scalar(select(func.count(MaintenanceService.id)))
+
+        # ==================== PROVIDERS ====================
+        technicians = (await db.execute(select(
+            func.count(Technician.id),
+            func.count(Technician.id).filter(Technician.is_verified == True),
+            func.count(Technician.id).filter(
+                Technician.is_verified == True,
+                Technician.is_available == True
+            ),
+        ))).one()
+        vendors = (await db.execute(select(
+            func.count(Vendor.id),
+            func.count(Vendor.id).filter(Vendor.is_verified == True),
+        ))).one()
+
+        # ==================== APPLICATIONS ====================
+        applications = (await db.execute(select(
+            func.count(RoleApplication.id),
+            func.count(RoleApplication.id).filter(RoleApplication.status == ApplicationStatus.PENDING),
+            func.count(RoleApplication.id).filter(RoleApplication.status == ApplicationStatus.UNDER_REVIEW),
+            func.count(RoleApplication.id).filter(RoleApplication.status == ApplicationStatus.APPROVED),
+            func.count(RoleApplication.id).filter(RoleApplication.status == ApplicationStatus.REJECTED),
+            func.count(RoleApplication.id).filter(created_today(RoleApplication)),
+        ))).one()
+
+        # ==================== FRAUD DETECTION ====================
+        confirmed = FraudAlert.status == FraudStatus.CONFIRMED
+        fraud = (await db.execute(select(
+            func.count(FraudAlert.id),
+            func.count(FraudAlert.id).filter(or_(
+                FraudAlert.status == FraudStatus.DETECTED,
+                FraudAlert.status == FraudStatus.UNDER_REVIEW
+            )),
+            func.count(FraudAlert.id).filter(confirmed),
+            func.count(FraudAlert.id).filter(created_today(FraudAlert)),
+            func.coalesce(func.sum(FraudAlert.amount_involved).filter(confirmed), 0.0),
+            func.coalesce(func.sum(FraudAlert.amount_involved).filter(FraudAlert.auto_blocked == True), 0.0),
+        ))).one()
+
+        fraud_by_type = {
+            fraud_type.value: count
+            for fraud_type, count in (await db.execute(
+                select(FraudAlert.fraud_type, func.count(FraudAlert.id)).group_by(FraudAlert.fraud_type)
+            )).all()
+        }
+
+        # ==================== RECENT ACTIVITY ====================
+        recent_payments = (await db.scalars(
+            select(Payment).order_by(Payment.created_at.desc()).limit(5)
+        )).all()
+        recent_applications = (await db.scalars(
+            select(RoleApplication).order_by(RoleApplication.created_at.desc()).limit(5)
+        )).all()
+        recent_fraud_alerts = (await db.scalars(
+            select(FraudAlert).order_by(FraudAlert.created_at.desc()).limit(5)
+        )).all()
+
+        # ==================== TRENDS (Last 7 Days) ====================
+        daily_stats = (await db.scalars(
+            select(DailyStats).where(DailyStats.date >= str(last_7_days)).order_by(DailyStats.date.asc())
+        )).all()
+
+        trends = {
+            "dates": [stat.date for stat in daily_stats],
+            "revenue": [stat.total_revenue for stat in daily_stats],
+            "users": [stat.active_users for stat in daily_stats],
+            "visitors": [stat.total_visitors for stat in daily_stats],
+            "bookings": [stat.service_bookings + stat.rental_bookings + stat.store_orders for stat in daily_stats],
+            "fraud_alerts": [stat.fraud_alerts for stat in daily_stats],
+        }
+
+        # ==================== SYSTEM HEALTH ====================
+        system_health = {
+            "status": "healthy",
+            "total_records": users[0] + products[0] + vehicles[0] + total_services,
+            "database_size_mb": 0,  # Would need to query database size
+            "active_sessions": visitors[0],
+            "error_rate": 0.0,  # Would track from error logs
+        }
+
+        return {
+            "users": {
+                "total": users[0],
+                "active": users[1],
+                "verified": users[2],
+                "new_today": users[3],
+                "by_role": users_by_role
+            },
+            "visitors": {
+                "total": visitors[0],
+                "today": visitors[1],
+                "total_page_views": visitors[2],
+                "today_page_views": visitors[3]
+            },
+            "bookings": {
+                "service_bookings": {
+                    "total": service_bookings[0],
+                    "today": service_bookings[1]
+                },
+                "rental_bookings": {
+                    "total": rental_bookings[0],
+                    "today": rental_bookings[1]
+                },
+                "store_orders": {
+                    "total": orders[0],
+                    "today": orders[1]
+                },
+                "total": service_bookings[0] + rental_bookings[0] + orders[0],
+                "today_total": service_bookings[1] + rental_bookings[1] + orders[1]
+            },
+            "revenue": {
+                "total": float(payments[0]),
+                "today": float(payments[1]),
+                "platform_commission": float(payments[2]),
+                "currency": "GHS"
+            },
+            "payments": {
+                "total": total_payments,
+                "successful": successful_payments,
+                "success_rate": round(payment_success_rate, 2),
+                "failed_today": payments[5]
+            },
+            "catalog": {
+                "products": {
+                    "total": products[0],
+                    "active": products[1]
+                },
+                "rental_vehicles": {
+                    "total": vehicles[0],
+                    "available": vehicles[1]
+                },
+                "maintenance_services": total_services
+            },
+            "providers": {
+                "technicians": {
+                    "total": technicians[0],
+                    "verified": technicians[1],
+                    "active_today": technicians[2]
+                },
+                "vendors": {
+                    "total": vendors[0],
+                    "verified": vendors[1]
+                }
+            },
+            "applications": {
+                "total": applications[0],
+                "pending": applications[1],
+                "under_review": applications[2],
+                "approved": applications[3],
+                "rejected": applications[4],
+                "new_today": applications[5]
+            },
+            "fraud": {
+                "total_alerts": fraud[0],
+                "active_alerts": fraud[1],
+                "confirmed_cases": fraud[2],
+                "alerts_today": fraud[3],
+                "total_amount_involved": float(fraud[4]),
+                "blocked_amount": float(fraud[5]),
+                "by_type": fraud_by_type
+            },
+            "recent_activity": {
+                "payments": [
+                    {
+                        "id": p.id,
+                        "amount": p.amount,
+                        "status": p.status.value,
+                        "method": p.payment_method.value,
+                        "created_at": p.created_at
+                    } for p in recent_payments
+                ],
+                "applications": [
+                    {
+                        "id": a.id,
+                        "user_id": a.user_id,
+                        "role": a.desired_role.value,
+                        "status": a.status.value,
+                        "created_at": a.created_at
+                    } for a in recent_applications
+                ],
+                "fraud_alerts": [
+                    {
+                        "id": f.id,
+                        "type": f.fraud_type.value,
+                        "severity": f.severity,
+                        "amount": f.amount_involved,
+                        "status": f.status.value,
+                        "created_at": f.created_at
+                    } for f in recent_fraud_alerts
+                ]
+            },
+            "system_health": system_health,
+            "trends": trends
+        }
+
+
+# Singleton instance
+admin_stats_service = AdminStatsService(ttl_seconds=settings.ADMIN_STATS_CACHE_TTL)
@@ -0,0 +1,176 @@
+"""Turning a shopping cart into an order with atomic stock reservation"""
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, delete, insert, case
+
+from app.core.config import settings
+from app.models.store import Cart, CartItem, Order, OrderItem, OrderStatus, Product, Vendor
+from app.services.product_facets import product_facets
+
+DELIVERY_FEE = 20.0  # Fixed delivery fee (can be made dynamic)
+
+
+class CheckoutError(Exception):
+    """Raised when a cart can't be turned into an order"""
+
+
+class InsufficientStockError(CheckoutError):
+    """Raised when some cart items are no longer in stock in the requested quantity"""
+
+    def __init__(self, shortages: Dict[int, int]):
+        self.shortages = shortages  # product_id -> quantity still available
+        super().__init__(
+            "Insufficient stock for product(s) " + ", ".join(str(product_id) for product_id in sorted(shortages))
+        )
+
+
+class CheckoutService:
+    """
+    Places orders with a fixed number of statements regardless of cart size
+
+    The cart is read with its products and vendors in one query, order
+    items are inserted in one executemany, and stock is reserved with one
+    guarded UPDATE (stock_quantity >= quantity per row). If that UPDATE
+    doesn't match every product some item ran out, and the whole
+    transaction is rolled back, so an order is either placed in full or not
+    at all. Product rows are only locked by the UPDATE, right before commit,
+    and concurrent checkouts of the same product re-check the guard after
+    waiting, so stock never goes negative.
+
+    The customer's cart row is locked (SELECT ... FOR UPDATE) before it is
+    read, so a double submit places one order, and only the cart items that
+    were read are deleted: an item added mid-checkout stays in the cart.
+    """
+
+    async def place_order(
+        self,
+        db,
+        customer_id: int,
+        delivery_address: Dict,
+        delivery_option: str = "standard",
+        notes: Optional[str] = None
+    ) -> Order:
+        try:
+            # One checkout per cart at a time: a double submit waits here,
+            # then finds the items already gone
+            cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == customer_id).with_for_update())
+
+            lines = (await db.execute(
+                select(
+                    CartItem.id,
+                    CartItem.product_id,
+                    CartItem.quantity,
+                    Product.name,
+                    Product.images,
+                    Product.price,
+                    Product.is_active,
+                    Product.brand,
+                    Product.part_number,
+                    Product.vendor_id,
+                    Vendor.commission_rate
+                )
+                .join(Product, Product.id == CartItem.product_id)
+                .join(Vendor, Vendor.id == Product.vendor_id)
+                .where(CartItem.cart_id == cart_id)
+                .order_by(CartItem.product_id)
+            )).all() if cart_id is not None else []
+
+            if not lines:
+                raise CheckoutError("Cart is empty")
+
+            inactive = [line.product_id for line in lines if not line.is_active]
+            if inactive:
+                raise CheckoutError(
+                    "Product(s) no longer available: " + ", ".join(str(product_id) for product_id in inactive)
+                )
+
+            quantities: Dict[int, int] = {}
+            for line in lines:
+                quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+            subtotal = sum(line.price * line.quantity for line in lines)
+            commission = sum(
+                line.price * line.quantity * (
+                    line.commission_rate if line.commission_rate is not None else settings.VENDOR_COMMISSION_RATE
+                )
+                for line in lines
+            )
+            vendor_ids = {line.vendor_id for line in lines}
+
+            order = Order(
+                customer_id=customer_id,
+                vendor_id=next(iter(vendor_ids)) if len(vendor_ids) == 1 else None,
+                order_number=f"ORD{uuid.uuid4().hex[:8].upper()}",
+                status=OrderStatus.PENDING,
+                delivery_option=delivery_option,
+                delivery_address=delivery_address,
+                delivery_fee=DELIVERY_FEE,
+                subtotal=round(subtotal, 2),
+                total_amount=round(subtotal + DELIVERY_FEE, 2),
+                platform_commission=round(commission, 2),
+                vendor_payout=round(subtotal - commission, 2),
+                customer_notes=notes
+            )
+
+            db.add(order)
+            await db.flush()
+
+            await db.execute(insert(OrderItem), [self._item(order.id, line) for line in lines])
+
+            # Only the items priced above; one added meanwhile stays in the cart
+            removed = await db.execute(delete(CartItem).where(CartItem.id.in_([line.id for line in lines])))
+            if removed.rowcount != len(lines):
+                raise CheckoutError("Cart changed during checkout, please try again")
+
+            reserved = await self._reserve(db, quantities)
+            if len(reserved) != len(quantities):
+                shortages = dict((await db.execute(
+                    select(Product.id, Product.stock_quantity).where(Product.id.in_(list(quantities.keys() - reserved.keys())))
+                )).all())
+                raise InsufficientStockError(shortages)
+
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        # Sold-out products drop out of in-stock facet counts
+        if any(stock <= 0 for stock in reserved.values()):
+            product_facets.invalidate()
+
+        return order
+
+    @staticmethod
+    def _item(order_id: int, line) -> Dict:
+        return {
+            "order_id": order_id,
+            "product_id": line.product_id,
+            "product_name": line.name,
+            "product_image": line.images[0] if line.images else None,
+            "product_price": line.price,
+            "quantity": line.quantity,
+            "subtotal": round(line.price * line.quantity, 2),
+            "product_details": {
+                "vendor_id": line.vendor_id,
+                "brand": line.brand,
+                "part_number": line.part_number,
+            },
+        }
+
+    @staticmethod
+    async def _reserve(db, quantities: Dict[int, int]) -> Dict[int, int]:
+        """Take stock for every product that has enough; returns {product_id: stock left}"""
+        quantity = case(quantities, value=Product.id)
+        rows = (await db.execute(
+            update(Product)
+            .where(Product.id.in_(list(quantities)), Product.stock_quantity >= quantity)
+            .values(stock_quantity=Product.stock_quantity - quantity, total_sold=Product.total_sold + quantity)
+            .returning(Product.id, Product.stock_quantity)
+            .execution_options(synchronize_session=False)
+        )).all()
+        return dict(rows)
+
+
+# Singleton instance
+checkout_service = CheckoutService()
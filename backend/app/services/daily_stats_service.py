@@ -0,0 +1,403 @@
+"""Incremental DailyStats rollup from the platform's source tables"""
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, distinct, select, and_
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.analytics import AnalyticsEvent, DailyStats, RollupCheckpoint, EventType, VisitorType
+from app.models.payment import Payment, PaymentStatus
+from app.models.maintenance import ServiceBooking
+from app.models.rental import RentalBooking
+from app.models.store import Order, OrderItem
+from app.models.application import RoleApplication, ApplicationStatus
+from app.models.fraud import FraudAlert
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "daily_stats"
+
+# Re-scan a little behind the high-water mark so rows committed late by a
+# concurrent transaction are not missed. Recomputing a day is idempotent.
+HIGH_WATER_OVERLAP = timedelta(minutes=5)
+
+# Counters/sums written to DailyStats; anything not produced for a day is zero
+COUNTER_FIELDS = [
+    "total_visitors", "new_visitors", "returning_visitors", "unique_sessions",
+    "new_signups", "active_users",
+    "total_revenue", "maintenance_revenue", "rental_revenue", "store_revenue", "platform_commission",
+    "service_bookings", "rental_bookings", "store_orders",
+    "successful_payments", "failed_payments", "total_payment_amount",
+    "total_conversions",
+    "new_applications", "approved_applications", "rejected_applications",
+    "fraud_alerts", "fraud_blocked_amount",
+]
+
+
+def _day_of(column):
+    """SQL expression giving the YYYY-MM-DD day of a DateTime column"""
+    return func.date(column)
+
+
+def _day_of_iso(column):
+    """SQL expression giving the YYYY-MM-DD day of an ISO-8601 string column"""
+    return func.substr(column, 1, 10)
+
+
+def _day_key(value) -> str:
+    """Normalise a day returned by the database (date or string) to YYYY-MM-DD"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def _contiguous_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Group sorted days into inclusive (start, end) runs of consecutive dates"""
+    ranges = []
+    for day in sorted(days):
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class DailyStatsService:
+    """
+    Builds DailyStats rows from AnalyticsEvent, Payment, bookings, orders,
+    applications and fraud alerts
+
+    Every metric is computed with one grouped query per source table over a
+    date range, so recomputing a week costs the same number of round-trips
+    as recomputing a day.
+    """
+
+    # (model, day expressions) scanned to find days touched by changed rows
+    TOUCH_SOURCES = [
+        (AnalyticsEvent, [_day_of(AnalyticsEvent.created_at)]),
+        (User, [_day_of(User.created_at)]),
+        (Payment, [_day_of(Payment.created_at)]),
+        (ServiceBooking, [_day_of(ServiceBooking.created_at)]),
+        (RentalBooking, [_day_of(RentalBooking.created_at)]),
+        (Order, [_day_of(Order.created_at)]),
+        (RoleApplication, [_day_of(RoleApplication.created_at), _day_of_iso(RoleApplication.reviewed_at)]),
+        (FraudAlert, [_day_of(FraudAlert.created_at)]),
+    ]
+
+    def run_incremental(self, db: Session) -> Dict:
+        """
+        Recompute only the days touched since the last run
+
+        Reads the high-water mark, finds the days of rows created or updated
+        after it, rebuilds those days and advances the mark.
+        """
+        started = time.perf_counter()
+        run_started_at = datetime.utcnow()
+
+        checkpoint = self._get_checkpoint(db)
+        since = checkpoint.high_water_mark - HIGH_WATER_OVERLAP if checkpoint.high_water_mark else None
+
+        touched = self.find_touched_days(db, since)
+        for start, end in _contiguous_ranges(touched):
+            self._rollup_range(db, start, end)
+
+        checkpoint.high_water_mark = run_started_at
+        checkpoint.last_run_at = run_started_at
+        checkpoint.last_run_days = len(touched)
+        checkpoint.last_run_ms = (time.perf_counter() - started) * 1000
+        db.commit()
+
+        logger.info(f"DailyStats rollup recomputed {len(touched)} day(s) in {checkpoint.last_run_ms:.0f}ms")
+
+        return {
+            "job": JOB_NAME,
+            "mode": "incremental",
+            "since": since.isoformat() if since else None,
+            "high_water_mark": run_started_at.isoformat(),
+            "days_recomputed": [str(day) for day in touched],
+            "duration_ms": round(checkpoint.last_run_ms, 2)
+        }
+
+    def backfill(self, db: Session, start_date: date, end_date: date) -> Dict:
+        """
+        Recompute every day in [start_date, end_date]
+
+        Days without activity get zeroed rows so trend charts have no gaps.
+        Does not move the high-water mark.
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+
+        started = time.perf_counter()
+        days = self._rollup_range(db, start_date, end_date, include_empty_days=True)
+        db.commit()
+
+        return {
+            "job": JOB_NAME,
+            "mode": "backfill",
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "days_recomputed": len(days),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def find_touched_days(self, db: Session, since: Optional[datetime]) -> List[date]:
+        """Days referenced by source rows created/updated after `since` (all days if None)"""
+        touched: Set[date] = set()
+
+        for model, day_expressions in self.TOUCH_SOURCES:
+            for day_expr in day_expressions:
+                query = select(day_expr.label("day")).distinct().where(day_expr.isnot(None))
+                if since is not None:
+                    query = query.where(model.updated_at > since)
+
+                for (day,) in db.execute(query):
+                    touched.add(date.fromisoformat(_day_key(day)))
+
+        return sorted(touched)
+
+    # ==================== INTERNALS ====================
+
+    def _get_checkpoint(self, db: Session) -> RollupCheckpoint:
+        checkpoint = db.scalar(
+            select(RollupCheckpoint).where(RollupCheckpoint.job_name == JOB_NAME).with_for_update()
+        )
+        if not checkpoint:
+            checkpoint = RollupCheckpoint(job_name=JOB_NAME)
+            db.add(checkpoint)
+            db.flush()
+        return checkpoint
+
+    def _rollup_range(
+        self,
+        db: Session,
+        start_date: date,
+        end_date: date,
+        include_empty_days: bool = False
+    ) -> List[str]:
+        """Compute metrics for [start_date, end_date] and upsert the DailyStats rows"""
+        metrics = self._compute_range(db, start_date, end_date)
+
+        if include_empty_days:
+            day = start_date
+            while day <= end_date:
+                metrics.setdefault(str(day), {})
+                day += timedelta(days=1)
+
+        if not metrics:
+            return []
+
+        existing = {
+            row.date: row
+            for row in db.scalars(select(DailyStats).where(DailyStats.date.in_(list(metrics.keys()))))
+        }
+
+        for day_key, values in metrics.items():
+            row = existing.get(day_key)
+            if row is None:
+                row = DailyStats(date=day_key)
+                db.add(row)
+
+            for field in COUNTER_FIELDS:
+                setattr(row, field, values.get(field, 0))
+
+            row.avg_session_duration = values.get("avg_session_duration")
+            row.pages_per_session = values.get("pages_per_session")
+            row.bounce_rate = values.get("bounce_rate")
+            row.conversion_rate = values.get("conversion_rate")
+            row.top_products = values.get("top_products")
+            row.top_vehicles = values.get("top_vehicles")
+
+        db.flush()
+        return list(metrics.keys())
+
+    def _compute_range(self, db: Session, start_date: date, end_date: date) -> Dict[str, Dict]:
+        """Run the grouped aggregate queries for [start_date, end_date]"""
+        window_start = datetime.combine(start_date, datetime.min.time())
+        window_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        iso_start, iso_end = str(start_date), str(end_date + timedelta(days=1))
+
+        metrics: Dict[str, Dict] = {}
+
+        def put(day, **values):
+            metrics.setdefault(_day_key(day), {}).update(values)
+
+        def in_window(column):
+            return and_(column >= window_start, column < window_end)
+
+        # ---------- Visitors & engagement ----------
+        event_day = _day_of(AnalyticsEvent.created_at)
+        for row in db.execute(
+            select(
+                event_day,
+                func.count(distinct(func.coalesce(AnalyticsEvent.ip_address, AnalyticsEvent.session_id))),
+                func.count(distinct(AnalyticsEvent.session_id)).filter(
+                    AnalyticsEvent.visitor_type == VisitorType.NEW_VISITOR
+                ),
+                func.count(distinct(AnalyticsEvent.session_id)).filter(
+                    AnalyticsEvent.visitor_type == VisitorType.RETURNING_VISITOR
+                ),
+                func.count(distinct(AnalyticsEvent.session_id)),
+                func.count(distinct(AnalyticsEvent.user_id)),
+                func.count(AnalyticsEvent.id).filter(AnalyticsEvent.event_type == EventType.PAGE_VIEW),
+                func.count(AnalyticsEvent.id).filter(AnalyticsEvent.is_conversion == True),
+                func.count(distinct(AnalyticsEvent.session_id)).filter(AnalyticsEvent.is_conversion == True),
+            )
+            .where(in_window(AnalyticsEvent.created_at))
+            .group_by(event_day)
+        ):
+            day, visitors, new, returning, sessions, active, page_views, conversions, converting = row
+            put(
+                day,
+                total_visitors=visitors,
+                new_visitors=new,
+                returning_visitors=returning,
+                unique_sessions=sessions,
+                active_users=active,
+                total_conversions=conversions,
+                pages_per_session=round(page_views / sessions, 2) if sessions else None,
+                conversion_rate=round(converting / sessions * 100, 2) if sessions else None,
+            )
+
+        per_session = (
+            select(
+                event_day.label("day"),
+                func.coalesce(func.sum(AnalyticsEvent.time_on_page), 0).label("duration"),
+                func.count(AnalyticsEvent.id).filter(
+                    AnalyticsEvent.event_type == EventType.PAGE_VIEW
+                ).label("page_views"),
+            )
+            .where(in_window(AnalyticsEvent.created_at))
+            .group_by(event_day, AnalyticsEvent.session_id)
+            .subquery()
+        )
+        for day, avg_duration, bounced, sessions in db.execute(
+            select(
+                per_session.c.day,
+                func.avg(per_session.c.duration),
+                func.count().filter(per_session.c.page_views <= 1),
+                func.count(),
+            ).group_by(per_session.c.day)
+        ):
+            put(
+                day,
+                avg_session_duration=int(avg_duration) if avg_duration is not None else None,
+                bounce_rate=round(bounced / sessions * 100, 2) if sessions else None,
+            )
+
+        # ---------- Signups ----------
+        user_day = _day_of(User.created_at)
+        for day, signups in db.execute(
+            select(user_day, func.count(User.id)).where(in_window(User.created_at)).group_by(user_day)
+        ):
+            put(day, new_signups=signups)
+
+        # ---------- Revenue & payments ----------
+        completed = Payment.status == PaymentStatus.COMPLETED
+        payment_day = _day_of(Payment.created_at)
+        for row in db.execute(
+            select(
+                payment_day,
+                func.coalesce(func.sum(Payment.amount).filter(completed), 0.0),
+                func.coalesce(func.sum(Payment.amount).filter(completed, Payment.service_booking_id.isnot(None)), 0.0),
+                func.coalesce(func.sum(Payment.amount).filter(completed, Payment.rental_booking_id.isnot(None)), 0.0),
+                func.coalesce(func.sum(Payment.amount).filter(completed, Payment.order_id.isnot(None)), 0.0),
+                func.coalesce(func.sum(Payment.platform_fee).filter(completed), 0.0),
+                func.count(Payment.id).filter(completed),
+                func.count(Payment.id).filter(Payment.status == PaymentStatus.FAILED),
+                func.coalesce(func.sum(Payment.amount), 0.0),
+            )
+            .where(in_window(Payment.created_at))
+            .group_by(payment_day)
+        ):
+            day, revenue, maintenance, rental, store, commission, succeeded, failed, attempted = row
+            put(
+                day,
+                total_revenue=float(revenue),
+                maintenance_revenue=float(maintenance),
+                rental_revenue=float(rental),
+                store_revenue=float(store),
+                platform_commission=float(commission),
+                successful_payments=succeeded,
+                failed_payments=failed,
+                total_payment_amount=float(attempted),
+            )
+
+        # ---------- Bookings & orders ----------
+        for model, field in (
+            (ServiceBooking, "service_bookings"),
+            (RentalBooking, "rental_bookings"),
+            (Order, "store_orders"),
+        ):
+            model_day = _day_of(model.created_at)
+            for day, count in db.execute(
+                select(model_day, func.count(model.id)).where(in_window(model.created_at)).group_by(model_day)
+            ):
+                put(day, **{field: count})
+
+        # ---------- Applications ----------
+        application_day = _day_of(RoleApplication.created_at)
+        for day, count in db.execute(
+            select(application_day, func.count(RoleApplication.id))
+            .where(in_window(RoleApplication.created_at))
+            .group_by(application_day)
+        ):
+            put(day, new_applications=count)
+
+        reviewed_day = _day_of_iso(RoleApplication.reviewed_at)
+        for day, approved, rejected in db.execute(
+            select(
+                reviewed_day,
+                func.count(RoleApplication.id).filter(RoleApplication.status == ApplicationStatus.APPROVED),
+                func.count(RoleApplication.id).filter(RoleApplication.status == ApplicationStatus.REJECTED),
+            )
+            .where(RoleApplication.reviewed_at >= iso_start, RoleApplication.reviewed_at < iso_end)
+            .group_by(reviewed_day)
+        ):
+            put(day, approved_applications=approved, rejected_applications=rejected)
+
+        # ---------- Fraud ----------
+        fraud_day = _day_of(FraudAlert.created_at)
+        for day, alerts, blocked in db.execute(
+            select(
+                fraud_day,
+                func.count(FraudAlert.id),
+                func.coalesce(func.sum(FraudAlert.amount_involved).filter(FraudAlert.auto_blocked == True), 0.0),
+            )
+            .where(in_window(FraudAlert.created_at))
+            .group_by(fraud_day)
+        ):
+            put(day, fraud_alerts=alerts, fraud_blocked_amount=float(blocked))
+
+        # ---------- Top performers ----------
+        top_products: Dict[str, List[Dict]] = {}
+        order_day = _day_of(Order.created_at)
+        for day, product_id, name, sold in db.execute(
+            select(order_day, OrderItem.product_id, OrderItem.product_name, func.sum(OrderItem.quantity))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(in_window(Order.created_at))
+            .group_by(order_day, OrderItem.product_id, OrderItem.product_name)
+        ):
+            top_products.setdefault(_day_key(day), []).append({"id": product_id, "name": name, "sales": int(sold)})
+
+        top_vehicles: Dict[str, List[Dict]] = {}
+        rental_day = _day_of(RentalBooking.created_at)
+        for day, vehicle_id, bookings in db.execute(
+            select(rental_day, RentalBooking.vehicle_id, func.count(RentalBooking.id))
+            .where(in_window(RentalBooking.created_at), RentalBooking.vehicle_id.isnot(None))
+            .group_by(rental_day, RentalBooking.vehicle_id)
+        ):
+            top_vehicles.setdefault(_day_key(day), []).append({"id": vehicle_id, "bookings": bookings})
+
+        for day_key, items in top_products.items():
+            put(day_key, top_products=sorted(items, key=lambda item: item["sales"], reverse=True)[:5])
+        for day_key, items in top_vehicles.items():
+            put(day_key, top_vehicles=sorted(items, key=lambda item: item["bookings"], reverse=True)[:5])
+
+        return metrics
+
+
+# Singleton instance
+daily_stats_service = DailyStatsService()
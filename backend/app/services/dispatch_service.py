@@ -0,0 +1,494 @@
+"""Automatic technician dispatch for service bookings"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.models.maintenance import (
+    ServiceBooking,
+    ServiceBookingStatus,
+    Technician,
+    TechnicianService,
+    MaintenanceService,
+)
+from app.services.technician_locator import technician_locator
+from app.services.eta_service import eta_service
+
+logger = logging.getLogger(__name__)
+
+# Statuses during which a technician is busy with a job
+ACTIVE_JOB_STATUSES = (
+    ServiceBookingStatus.ASSIGNED,
+    ServiceBookingStatus.EN_ROUTE,
+    ServiceBookingStatus.ARRIVED,
+    ServiceBookingStatus.IN_PROGRESS,
+)
+
+
+def _unchanged(column, value):
+    """Column still holds the value read earlier (NULL-safe)"""
+    return column.is_(None) if value is None else column == value
+
+
+def booking_location(booking: ServiceBooking) -> Optional[Tuple[float, float]]:
+    location = booking.service_location or {}
+    try:
+        return float(location["lat"]), float(location["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class DispatchEngine:
+    """
+    Offers pending bookings to the best nearby technician, one at a time
+
+    Every tick the engine picks up due bookings (pending, unassigned, no
+    live offer) in batches, scores all of their candidates in one pass and
+    offers each booking to its best free candidate. An offer that is
+    declined or times out is logged in dispatch_attempts and the booking
+    falls through to the next candidate on the following tick.
+
+    Offers are claimed with a guarded UPDATE, so several workers can run
+    the engine against the same database without double-offering.
+    """
+
+    def __init__(
+        self,
+        offer_timeout_seconds: int = 45,
+        retry_seconds: int = 30,
+        max_attempts: int = 5,
+        candidates_per_booking: int = 10,
+        max_radius_km: float = 25.0,
+        max_active_jobs: int = 2,
+        batch_size: int = 200,
+        interval_seconds: float = 2.0,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.offer_timeout = timedelta(seconds=offer_timeout_seconds)
+        self.retry_delay = timedelta(seconds=retry_seconds)
+        self.max_attempts = max_attempts
+        self.candidates_per_booking = candidates_per_booking
+        self.max_radius_km = max_radius_km
+        self.max_active_jobs = max_active_jobs
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.weights = weights or {"distance": 0.45, "specialization": 0.25, "rating": 0.15, "load": 0.15}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def notify(self):
+        """Wake the engine early, e.g. right after a booking is created"""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                async for db in get_async_db():
+                    # Keep going while a burst fills whole batches with offers
+                    while await self.dispatch_due(db) >= self.batch_size:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Dispatch tick failed: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    # ==================== DISPATCH ====================
+
+    async def dispatch_due(self, db) -> int:
+        """Offer due bookings (up to batch_size) to technicians; returns the number of offers made"""
+        now = datetime.utcnow()
+
+        bookings = (await db.scalars(
+            select(ServiceBooking)
+            .where(
+                ServiceBooking.status == ServiceBookingStatus.PENDING,
+                ServiceBooking.technician_id.is_(None),
+                ServiceBooking.assignment_attempts < self.max_attempts,
+                or_(ServiceBooking.offer_expires_at.is_(None), ServiceBooking.offer_expires_at <= now)
+            )
+            .order_by(ServiceBooking.created_at.asc())
+            .limit(self.batch_size)
+        )).all()
+
+        if not bookings:
+            return 0
+
+        await technician_locator.ensure_fresh(db)
+
+        # Candidate technicians per booking from the spatial index
+        candidates: Dict[int, List[Tuple[int, float]]] = {}
+        for booking in bookings:
+            location = booking_location(booking)
+            if location is None:
+                continue
+            excluded = {attempt["technician_id"] for attempt in booking.dispatch_attempts or []}
+            candidates[booking.id] = [
+                (technician_id, distance)
+                for technician_id, distance in technician_locator.nearest(
+                    *location,
+                    k=self.candidates_per_booking + len(excluded),
+                    max_radius_km=self.max_radius_km
+                )
+                if technician_id not in excluded
+            ][:self.candidates_per_booking]
+
+        technician_ids = {technician_id for pairs in candidates.values() for technician_id, _ in pairs}
+        if not technician_ids:
+            await self._finish_round(db, bookings, {}, now)
+            await db.commit()
+            return 0
+
+        ratings, offered_types, busy = await self._load_technicians(db, technician_ids, now)
+        required_types = await self._load_required_types(db, bookings)
+
+        # Score every (booking, candidate) pair in one vectorized pass
+        pairs = [
+            (booking_id, technician_id, distance)
+            for booking_id, booking_pairs in candidates.items()
+            for technician_id, distance in booking_pairs
+            if technician_id not in busy
+        ]
+        scores = self.score(
+            distances=np.array([distance for _, _, distance in pairs], dtype=np.float64),
+            ratings=np.array([ratings[technician_id][0] for _, technician_id, _ in pairs], dtype=np.float64),
+            loads=np.array([ratings[technician_id][1] for _, technician_id, _ in pairs], dtype=np.float64),
+            matches=np.array([
+                self._match(required_types.get(booking_id, set()), offered_types.get(technician_id, set()))
+                for booking_id, technician_id, _ in pairs
+            ], dtype=np.float64)
+        ) if pairs else np.array([])
+
+        # Greedy matching across the batch: best scores first, one open offer per technician
+        offers: Dict[int, Tuple[int, float, float]] = {}
+        taken: Set[int] = set()
+        for i in np.argsort(-scores, kind="stable"):
+            booking_id, technician_id, distance = pairs[i]
+            if booking_id in offers or technician_id in taken:
+                continue
+            offers[booking_id] = (technician_id, float(scores[i]), distance)
+            taken.add(technician_id)
+
+        held = await self._finish_round(db, bookings, offers, now)
+
+        made = 0
+        for booking in bookings:
+            if booking.id in offers and booking.id in held:
+                made += await self._offer(db, booking, *offers[booking.id], now=now)
+
+        await db.commit()
+        return made
+
+    def score(self, distances: np.ndarray, ratings: np.ndarray, loads: np.ndarray, matches: np.ndarray) -> np.ndarray:
+        """Weighted score in [0, 1]; closer, better matched, better rated and less busy wins"""
+        w = self.weights
+        return (
+            w["distance"] * (1.0 - np.clip(distances / self.max_radius_km, 0.0, 1.0))
+            + w["specialization"] * matches
+            + w["rating"] * np.clip(ratings / 5.0, 0.0, 1.0)
+            + w["load"] * (1.0 - np.clip(loads / self.max_active_jobs, 0.0, 1.0))
+        )
+
+    @staticmethod
+    def _match(required: Set[str], offered: Set[str]) -> float:
+        if not required:
+            return 1.0
+        return len(required & offered) / len(required)
+
+    async def _load_technicians(self, db, technician_ids: Set[int], now: datetime):
+        """Ratings/loads, offered service types and busy technicians in three grouped queries"""
+        loads = dict((await db.execute(
+            select(ServiceBooking.technician_id, func.count(ServiceBooking.id))
+            .where(
+                ServiceBooking.technician_id.in_(technician_ids),
+                ServiceBooking.status.in_(ACTIVE_JOB_STATUSES)
+            )
+            .group_by(ServiceBooking.technician_id)
+        )).all())
+
+        # Technicians already holding a live offer can't take another one
+        busy = {
+            technician_id
+            for (technician_id,) in (await db.execute(
+                select(ServiceBooking.offered_technician_id).where(
+                    ServiceBooking.offered_technician_id.in_(technician_ids),
+                    ServiceBooking.offer_expires_at > now,
+                    ServiceBooking.technician_id.is_(None)
+                )
+            )).all()
+        }
+
+        ratings = {}
+        offered_types: Dict[int, Set[str]] = {}
+        for technician_id, rating, specializations in (await db.execute(
+            select(Technician.id, Technician.average_rating, Technician.specializations)
+            .where(Technician.id.in_(technician_ids))
+        )).all():
+            load = loads.get(technician_id, 0)
+            ratings[technician_id] = (rating or 0.0, load)
+            offered_types[technician_id] = set(specializations or [])
+            if load >= self.max_active_jobs:
+                busy.add(technician_id)
+
+        for technician_id, service_type in (await db.execute(
+            select(TechnicianService.technician_id, TechnicianService.service_type).where(
+                TechnicianService.technician_id.in_(technician_ids),
+                TechnicianService.is_active == True
+            )
+        )).all():
+            offered_types.setdefault(technician_id, set()).add(service_type.value)
+
+        # Candidates from a stale index may have been deleted
+        busy.update(technician_ids - ratings.keys())
+
+        return ratings, offered_types, busy
+
+    async def _load_required_types(self, db, bookings: List[ServiceBooking]) -> Dict[int, Set[str]]:
+        service_ids = {
+            service_id
+            for booking in bookings
+            for service_id in (booking.selected_services or [])
+            if isinstance(service_id, int)
+        }
+        if not service_ids:
+            return {}
+
+        service_types = dict((await db.execute(
+            select(MaintenanceService.id, MaintenanceService.service_type)
+            .where(MaintenanceService.id.in_(service_ids))
+        )).all())
+
+        return {
+            booking.id: {
+                service_types[service_id].value
+                for service_id in (booking.selected_services or [])
+                if service_id in service_types
+            }
+            for booking in bookings
+        }
+
+    async def _finish_round(self, db, bookings: List[ServiceBooking], offers: Dict, now: datetime) -> Set[int]:
+        """
+        Record offers that lapsed without an answer and park bookings
+        that found no free candidate until retry_seconds from now
+
+        Each booking is written with an UPDATE guarded on the offer state
+        this round loaded, so a booking another worker re-offered in the
+        meantime is left alone and dropped from the round. Returns the ids
+        of the bookings this round still holds.
+        """
+        held: Set[int] = set()
+        for booking in bookings:
+            values = {"offer_expires_at": None if booking.id in offers else now + self.retry_delay}
+            if booking.offered_technician_id is not None:
+                values.update(
+                    offered_technician_id=None,
+                    offered_at=None,
+                    dispatch_attempts=self._with_outcome(booking.dispatch_attempts, booking.offered_technician_id, "timeout")
+                )
+
+            result = await db.execute(
+                update(ServiceBooking)
+                .where(
+                    ServiceBooking.id == booking.id,
+                    ServiceBooking.technician_id.is_(None),
+                    ServiceBooking.assignment_attempts == booking.assignment_attempts,
+                    _unchanged(ServiceBooking.offered_technician_id, booking.offered_technician_id),
+                    _unchanged(ServiceBooking.offer_expires_at, booking.offer_expires_at)
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+
+            if result.rowcount:
+                # Already written; keep the instance in step without a second flush
+                for key, value in values.items():
+                    set_committed_value(booking, key, value)
+                held.add(booking.id)
+
+        return held
+
+    async def _offer(self, db, booking: ServiceBooking, technician_id: int, score: float, distance_km: float, now: datetime) -> bool:
+        """Claim the booking for an offer; loses quietly if another worker got there first"""
+        expires_at = now + self.offer_timeout
+        attempts = list(booking.dispatch_attempts or []) + [{
+            "technician_id": technician_id,
+            "score": round(score, 4),
+            "distance_km": round(distance_km, 3),
+            "offered_at": now.isoformat(),
+            "outcome": "offered"
+        }]
+
+        result = await db.execute(
+            update(ServiceBooking)
+            .where(
+                ServiceBooking.id == booking.id,
+                ServiceBooking.technician_id.is_(None),
+                ServiceBooking.assignment_attempts == booking.assignment_attempts,
+                or_(ServiceBooking.offer_expires_at.is_(None), ServiceBooking.offer_expires_at <= now)
+            )
+            .values(
+                offered_technician_id=technician_id,
+                offered_at=now,
+                offer_expires_at=expires_at,
+                assignment_attempts=ServiceBooking.assignment_attempts + 1,
+                dispatch_attempts=attempts
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        if not result.rowcount:
+            return False
+
+        booking.offered_technician_id = technician_id
+        booking.offered_at = now
+        booking.offer_expires_at = expires_at
+        booking.assignment_attempts += 1
+        booking.dispatch_attempts = attempts
+        return True
+
+    @staticmethod
+    def _with_outcome(dispatch_attempts: Optional[List[Dict]], technician_id: int, outcome: str) -> List[Dict]:
+        """Copy of the attempt log with the technician's open offer marked with `outcome`"""
+        attempts = [dict(attempt) for attempt in dispatch_attempts or []]
+        for attempt in reversed(attempts):
+            if attempt["technician_id"] == technician_id and attempt["outcome"] == "offered":
+                attempt["outcome"] = outcome
+                break
+        return attempts
+
+    # ==================== TECHNICIAN RESPONSES ====================
+
+    def accept(self, db, booking: ServiceBooking, technician: Technician) -> bool:
+        """
+        Assign the booking to the technician holding its live offer
+
+        Uses a guarded UPDATE so a late acceptance can't override a reassignment.
+        Works with the sync Session used by the technician portal.
+        """
+        now = datetime.utcnow()
+        if (
+            booking.offered_technician_id != technician.id
+            or booking.offer_expires_at is None
+            or booking.offer_expires_at <= now
+        ):
+            return False
+
+        attempts = self._with_outcome(booking.dispatch_attempts, technician.id, "accepted")
+
+        eta_minutes = None
+        location = booking_location(booking)
+        technician_location = technician.current_location or {}
+        if location and technician_location.get("lat") is not None:
+            eta_minutes = eta_service.calculate_eta(
+                technician_location["lat"], technician_location["lng"], *location
+            )["eta_minutes"]
+
+        result = db.execute(
+            update(ServiceBooking)
+            .where(
+                ServiceBooking.id == booking.id,
+                ServiceBooking.technician_id.is_(None),
+                ServiceBooking.offered_technician_id == technician.id,
+                ServiceBooking.offer_expires_at > now,
+                # The offer that was read, so its attempt log is current
+                ServiceBooking.offer_expires_at == booking.offer_expires_at
+            )
+            .values(
+                technician_id=technician.id,
+                status=ServiceBookingStatus.ASSIGNED,
+                technician_response_time=int((now - booking.offered_at).total_seconds()),
+                eta_minutes=eta_minutes,
+                offered_technician_id=None,
+                offer_expires_at=None,
+                dispatch_attempts=attempts
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        if not result.rowcount:
+            db.rollback()
+            return False
+
+        db.commit()
+        db.refresh(booking)
+        return True
+
+    def decline(self, db, booking: ServiceBooking, technician: Technician) -> bool:
+        """
+        Release the offer so the engine moves on to the next candidate
+
+        Guarded like accept(): if the offer lapsed and was re-offered since
+        it was read, nothing is written and False is returned.
+        """
+        now = datetime.utcnow()
+        if (
+            booking.offered_technician_id != technician.id
+            or booking.technician_id is not None
+            or booking.offer_expires_at is None
+            or booking.offer_expires_at <= now
+        ):
+            return False
+
+        result = db.execute(
+            update(ServiceBooking)
+            .where(
+                ServiceBooking.id == booking.id,
+                ServiceBooking.technician_id.is_(None),
+                ServiceBooking.offered_technician_id == technician.id,
+                ServiceBooking.offer_expires_at > now,
+                ServiceBooking.offer_expires_at == booking.offer_expires_at
+            )
+            .values(
+                offered_technician_id=None,
+                offered_at=None,
+                offer_expires_at=None,
+                dispatch_attempts=self._with_outcome(booking.dispatch_attempts, technician.id, "declined")
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        if not result.rowcount:
+            db.rollback()
+            return False
+
+        db.commit()
+        db.refresh(booking)
+
+        self.notify()
+        return True
+
+
+# Singleton instance
+dispatch_engine = DispatchEngine(
+    offer_timeout_seconds=settings.DISPATCH_OFFER_TIMEOUT,
+    retry_seconds=settings.DISPATCH_RETRY_DELAY,
+    max_attempts=settings.DISPATCH_MAX_ATTEMPTS,
+    candidates_per_booking=settings.DISPATCH_CANDIDATES,
+    max_radius_km=settings.DISPATCH_MAX_RADIUS_KM,
+    max_active_jobs=settings.DISPATCH_MAX_ACTIVE_JOBS,
+    batch_size=settings.DISPATCH_BATCH_SIZE,
+    interval_seconds=settings.DISPATCH_INTERVAL
+)
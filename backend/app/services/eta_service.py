@@ -0,0 +1,151 @@
+"""Vectorized distance and ETA calculations"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.location_buffer import Point
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """
+    Great-circle distance in km between paired points
+
+    Arguments are scalars or equal-length arrays (broadcasting applies), so
+    one call handles any number of origin/destination pairs.
+    """
+    lat1, lng1, lat2, lng2 = (
+        np.radians(np.asarray(value, dtype=np.float64))
+        for value in (lat1, lng1, lat2, lng2)
+    )
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_matrix_km(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """
+    Distances between every origin and every destination
+
+    origins is (N, 2) and destinations is (M, 2), both as (lat, lng);
+    returns an (N, M) array.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+
+    return haversine_km(
+        origins[:, 0:1], origins[:, 1:2],
+        destinations[None, :, 0], destinations[None, :, 1]
+    )
+
+
+class EtaService:
+    """
+    Distance/ETA engine shared by live tracking, the admin map and matching
+
+    Speeds come from the recorded trail rather than the device's
+    instantaneous speed reading, which jumps around at junctions and
+    traffic lights.
+    """
+
+    def __init__(
+        self,
+        default_speed_kmh: float = 40.0,
+        min_speed_kmh: float = 5.0,
+        max_speed_kmh: float = 120.0,
+        window_seconds: float = 600.0,
+        min_window_seconds: float = 30.0
+    ):
+        self.default_speed_kmh = default_speed_kmh
+        self.min_speed_kmh = min_speed_kmh
+        self.max_speed_kmh = max_speed_kmh
+        self.window_seconds = window_seconds
+        self.min_window_seconds = min_window_seconds
+
+    def estimate_speed_kmh(self, history: Sequence[Point]) -> float:
+        """
+        Average speed over the last window_seconds of recorded points
+
+        Distance travelled divided by elapsed time, ignoring segments that
+        imply impossible speeds (GPS jumps). Falls back to the default
+        speed when the trail is too short to be meaningful.
+        """
+        if len(history) < 2:
+            return self.default_speed_kmh
+
+        points = np.asarray(history, dtype=np.float64)
+        recorded_at = points[:, 4]
+        points = points[recorded_at >= recorded_at[-1] - self.window_seconds]
+        if len(points) < 2:
+            return self.default_speed_kmh
+
+        segment_km = haversine_km(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+        segment_hours = np.diff(points[:, 4]) / 3600.0
+
+        valid = segment_hours > 0
+        valid[valid] &= segment_km[valid] / segment_hours[valid] <= self.max_speed_kmh * 1.5
+
+        elapsed_hours = segment_hours[valid].sum()
+        if elapsed_hours * 3600.0 < self.min_window_seconds:
+            return self.default_speed_kmh
+
+        speed = segment_km[valid].sum() / elapsed_hours
+        return float(np.clip(speed, self.min_speed_kmh, self.max_speed_kmh))
+
+    def calculate_etas(
+        self,
+        origin_lats,
+        origin_lngs,
+        destination_lats,
+        destination_lngs,
+        speeds_kmh=None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Distances (km) and ETAs (minutes) for many pairs in one call
+
+        speeds_kmh may be a scalar or per-pair array; non-positive speeds
+        give an ETA of -1 (unknown).
+        """
+        distance_km = haversine_km(origin_lats, origin_lngs, destination_lats, destination_lngs)
+
+        speeds = np.asarray(self.default_speed_kmh if speeds_kmh is None else speeds_kmh, dtype=np.float64)
+        speeds = np.broadcast_to(speeds, distance_km.shape)
+
+        eta_minutes = np.full(distance_km.shape, -1, dtype=np.int64)
+        moving = speeds > 0
+        eta_minutes[moving] = (distance_km[moving] / speeds[moving] * 60).astype(np.int64)
+
+        return {"distance_km": distance_km, "eta_minutes": eta_minutes}
+
+    def calculate_eta(
+        self,
+        current_lat: float,
+        current_lng: float,
+        destination_lat: float,
+        destination_lng: float,
+        average_speed_kmh: Optional[float] = None
+    ) -> Dict:
+        """Single-pair ETA in the shape the tracking endpoints return"""
+        speed = self.default_speed_kmh if average_speed_kmh is None else average_speed_kmh
+        result = self.calculate_etas(current_lat, current_lng, destination_lat, destination_lng, speed)
+        eta_minutes = int(result["eta_minutes"])
+
+        return {
+            "distance_km": round(float(result["distance_km"]), 2),
+            "eta_minutes": eta_minutes if eta_minutes >= 0 else None,
+            "speed_kmh": round(speed, 1),
+            "calculated_at": datetime.utcnow().isoformat()
+        }
+
+    def to_rows(self, result: Dict[str, np.ndarray]) -> List[Dict]:
+        """Convert calculate_etas output into JSON-friendly rows"""
+        return [
+            {"distance_km": round(float(distance), 2), "eta_minutes": int(eta) if eta >= 0 else None}
+            for distance, eta in zip(result["distance_km"].ravel(), result["eta_minutes"].ravel())
+        ]
+
+
+# Singleton instance
+eta_service = EtaService()
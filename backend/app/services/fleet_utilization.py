@@ -0,0 +1,300 @@
+"""Fleet utilization rollup and reporting for rental vehicles"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, delete, update, func, and_
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.models.analytics import RollupCheckpoint
+from app.models.rental import RentalBooking, RentalBookingStatus, RentalVehicle, RentalVehicleDailyUsage
+from app.services.rental_availability import utc_naive
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "fleet_utilization"
+
+# Same safety margin as the DailyStats rollup for rows committed late
+HIGH_WATER_OVERLAP = timedelta(minutes=5)
+
+# Bookings that occupy the vehicle and earn revenue
+USAGE_STATUSES = (
+    RentalBookingStatus.CONFIRMED,
+    RentalBookingStatus.ACTIVE,
+    RentalBookingStatus.OVERDUE,
+    RentalBookingStatus.COMPLETED,
+)
+
+REPORT_FIELDS = [
+    "vehicle_id", "license_plate", "make", "model",
+    "available_days", "booked_days", "booked_hours", "utilization_rate",
+    "bookings", "revenue", "revenue_per_available_day",
+    "longest_idle_days", "longest_idle_start",
+]
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return utc_naive(datetime.fromisoformat(value)) if value else None
+    except ValueError:
+        return None
+
+
+def booking_span(booking: RentalBooking, now: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """When the vehicle was (or will be) out: actual return if known, still out while overdue"""
+    start = _parse(booking.pickup_datetime)
+    end = _parse(booking.actual_return_datetime) or _parse(booking.return_datetime)
+    if booking.status == RentalBookingStatus.OVERDUE and end is not None:
+        end = max(end, now)
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def daily_usage(bookings: Sequence[RentalBooking], now: datetime) -> Dict[str, Dict]:
+    """Split bookings into per-day hours, booking counts, starts and prorated revenue"""
+    days: Dict[str, Dict] = {}
+
+    for booking in bookings:
+        span = booking_span(booking, now)
+        if span is None:
+            continue
+        start, end = span
+        total_hours = (end - start).total_seconds() / 3600
+        revenue = (booking.total_cost or 0.0) + (booking.late_return_penalty or 0.0) + (booking.damage_charges or 0.0)
+
+        day = start.date()
+        while datetime.combine(day, datetime.min.time()) < end:
+            day_start = datetime.combine(day, datetime.min.time())
+            overlap = (min(end, day_start + timedelta(days=1)) - max(start, day_start)).total_seconds() / 3600
+
+            usage = days.setdefault(
+                day.isoformat(), {"booked_hours": 0.0, "bookings": 0, "bookings_started": 0, "revenue": 0.0}
+            )
+            usage["booked_hours"] = min(24.0, usage["booked_hours"] + overlap)
+            usage["bookings"] += 1
+            usage["bookings_started"] += day == start.date()
+            usage["revenue"] += revenue * overlap / total_hours
+            day += timedelta(days=1)
+
+    return days
+
+
+def _longest_gap(booked: List[date], first_day: date, last_day: date) -> Tuple[int, Optional[date]]:
+    """Longest run of days in [first_day, last_day] missing from the sorted `booked` days"""
+    longest, longest_start = 0, None
+    cursor = first_day
+    for day in booked + [last_day + timedelta(days=1)]:
+        gap = (day - cursor).days
+        if gap > longest:
+            longest, longest_start = gap, cursor
+        cursor = max(cursor, day + timedelta(days=1))
+    return longest, longest_start
+
+
+class FleetUtilizationService:
+    """
+    Maintains RentalVehicleDailyUsage and serves the utilization report
+
+    Every interval_seconds the rollup finds vehicles with bookings changed
+    since the last run and rebuilds their daily rows from scratch (which
+    also handles rescheduled and cancelled bookings), batch_size vehicles
+    at a time. The report then reads the vehicles plus their daily rows
+    inside the requested range, so its cost depends on the fleet size and
+    the range, not on how much booking history exists.
+    """
+
+    def __init__(self, interval_seconds: float = 300.0, batch_size: int = 100):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async for db in get_async_db():
+                    await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fleet utilization rollup failed: {str(e)}")
+
+            await asyncio.sleep(self.interval_seconds)
+
+    # ==================== ROLLUP ====================
+
+    async def refresh(self, db, full: bool = False) -> Dict:
+        """Rebuild the daily rows of vehicles whose bookings changed (every vehicle when full)"""
+        started = time.perf_counter()
+        run_started_at = datetime.utcnow()
+
+        checkpoint = await db.scalar(
+            select(RollupCheckpoint).where(RollupCheckpoint.job_name == JOB_NAME).with_for_update()
+        )
+        if not checkpoint:
+            checkpoint = RollupCheckpoint(job_name=JOB_NAME)
+            db.add(checkpoint)
+            await db.flush()
+
+        since = None if full or not checkpoint.high_water_mark else checkpoint.high_water_mark - HIGH_WATER_OVERLAP
+        if since is None:
+            query = select(RentalVehicle.id)
+        else:
+            query = select(RentalBooking.vehicle_id).distinct().where(
+                RentalBooking.updated_at > since,
+                RentalBooking.vehicle_id.isnot(None)
+            )
+        vehicle_ids = sorted((await db.scalars(query)).all())
+
+        days_written = 0
+        for i in range(0, len(vehicle_ids), self.batch_size):
+            days_written += await self._rebuild(db, vehicle_ids[i:i + self.batch_size], run_started_at)
+
+        checkpoint.high_water_mark = run_started_at
+        checkpoint.last_run_at = run_started_at
+        checkpoint.last_run_days = days_written
+        checkpoint.last_run_ms = (time.perf_counter() - started) * 1000
+        await db.commit()
+
+        if vehicle_ids:
+            logger.info(f"Fleet utilization rebuilt {len(vehicle_ids)} vehicle(s) in {checkpoint.last_run_ms:.0f}ms")
+
+        return {
+            "job": JOB_NAME,
+            "vehicles_recomputed": len(vehicle_ids),
+            "days_written": days_written,
+            "duration_ms": round(checkpoint.last_run_ms, 2)
+        }
+
+    async def _rebuild(self, db, vehicle_ids: List[int], now: datetime) -> int:
+        bookings = (await db.scalars(
+            select(RentalBooking).where(
+                RentalBooking.vehicle_id.in_(vehicle_ids),
+                RentalBooking.status.in_(USAGE_STATUSES)
+            )
+        )).all()
+
+        by_vehicle: Dict[int, List[RentalBooking]] = {}
+        for booking in bookings:
+            by_vehicle.setdefault(booking.vehicle_id, []).append(booking)
+
+        await db.execute(delete(RentalVehicleDailyUsage).where(RentalVehicleDailyUsage.vehicle_id.in_(vehicle_ids)))
+
+        rows = [
+            RentalVehicleDailyUsage(
+                vehicle_id=vehicle_id,
+                date=day,
+                booked_hours=round(usage["booked_hours"], 2),
+                bookings=usage["bookings"],
+                bookings_started=usage["bookings_started"],
+                revenue=round(usage["revenue"], 2)
+            )
+            for vehicle_id, vehicle_bookings in by_vehicle.items()
+            for day, usage in daily_usage(vehicle_bookings, now).items()
+        ]
+        db.add_all(rows)
+
+        # The only writer of the lifetime counter: a recount of completed bookings, so reverted completions drop out too
+        await db.execute(
+            update(RentalVehicle)
+            .where(RentalVehicle.id.in_(vehicle_ids))
+            .values(total_rentals=select(func.count(RentalBooking.id)).where(
+                RentalBooking.vehicle_id == RentalVehicle.id,
+                RentalBooking.status == RentalBookingStatus.COMPLETED
+            ).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        await db.flush()
+        return len(rows)
+
+    # ==================== REPORT ====================
+
+    async def last_refreshed_at(self, db) -> Optional[datetime]:
+        return await db.scalar(select(RollupCheckpoint.last_run_at).where(RollupCheckpoint.job_name == JOB_NAME))
+
+    async def report(
+        self,
+        db,
+        start_date: date,
+        end_date: date,
+        vehicle_ids: Optional[List[int]] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield one utilization row per vehicle, in vehicle id order"""
+        start_key, end_key = start_date.isoformat(), end_date.isoformat()
+        in_range = and_(
+            RentalVehicleDailyUsage.vehicle_id == RentalVehicle.id,
+            RentalVehicleDailyUsage.date >= start_key,
+            RentalVehicleDailyUsage.date <= end_key
+        )
+
+        vehicles_query = (
+            select(RentalVehicle.id, RentalVehicle.license_plate, RentalVehicle.make,
+                   RentalVehicle.model, RentalVehicle.created_at)
+            .order_by(RentalVehicle.id)
+        )
+        days_query = (
+            select(
+                RentalVehicleDailyUsage.vehicle_id,
+                RentalVehicleDailyUsage.date,
+                RentalVehicleDailyUsage.booked_hours,
+                RentalVehicleDailyUsage.bookings_started,
+                RentalVehicleDailyUsage.revenue,
+            )
+            .join(RentalVehicle, in_range)
+            .order_by(RentalVehicleDailyUsage.vehicle_id, RentalVehicleDailyUsage.date)
+        )
+        if vehicle_ids:
+            vehicles_query = vehicles_query.where(RentalVehicle.id.in_(vehicle_ids))
+            days_query = days_query.where(RentalVehicleDailyUsage.vehicle_id.in_(vehicle_ids))
+
+        usage_days: Dict[int, List[Tuple]] = {}
+        for vehicle_id, day, hours, started, revenue in (await db.execute(days_query)).all():
+            usage_days.setdefault(vehicle_id, []).append((date.fromisoformat(day), hours, started, revenue))
+
+        for vehicle_id, plate, make, model, created_at in (await db.execute(vehicles_query)).all():
+            # Days before the vehicle was listed count for nothing, including stale rows
+            first_day = max(start_date, created_at.date()) if created_at else start_date
+            available = max(0, (end_date - first_day).days + 1)
+            days = [usage for usage in usage_days.get(vehicle_id, []) if usage[0] >= first_day]
+            booked = [day for day, _, _, _ in days]
+            hours = sum(usage[1] for usage in days)
+            bookings = sum(usage[2] for usage in days)  # Counted once each, on the day they start
+            revenue = sum(usage[3] for usage in days)
+            idle_days, idle_start = _longest_gap(booked, first_day, end_date) if available else (0, None)
+
+            yield {
+                "vehicle_id": vehicle_id,
+                "license_plate": plate,
+                "make": make,
+                "model": model,
+                "available_days": available,
+                "booked_days": len(booked),
+                "booked_hours": round(float(hours), 2),
+                "utilization_rate": round(len(booked) / available, 4) if available else 0.0,
+                "bookings": bookings,
+                "revenue": round(float(revenue), 2),
+                "revenue_per_available_day": round(float(revenue) / available, 2) if available else 0.0,
+                "longest_idle_days": idle_days,
+                "longest_idle_start": idle_start,
+            }
+
+
+# Singleton instance
+fleet_utilization = FleetUtilizationService(
+    interval_seconds=settings.FLEET_UTILIZATION_INTERVAL,
+    batch_size=settings.FLEET_UTILIZATION_BATCH_SIZE
+)
@@ -0,0 +1,321 @@
+"""Geofence checks for rental vehicle locations"""
+import hashlib
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.rental import RentalBooking, RentalVehicle
+from app.services.eta_service import haversine_km, EARTH_RADIUS_KM
+from app.services.location_buffer import Point
+from app.services.tracking_service import tracking_service
+from app.services.tracking_store import TrackingStore
+
+logger = logging.getLogger(__name__)
+
+# Tracking store state holding {"outside": bool, "last_seen": recorded_at}
+STATE_NAME = "geofence"
+
+# Attempts to advance a booking's fence state before the batch is given up
+STATE_RETRIES = 5
+
+
+class CircleFence:
+    """Allowed area within radius_km of a center point"""
+
+    def __init__(self, lat: float, lng: float, radius_km: float):
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = radius_km
+        self._cos_lat = math.cos(math.radians(lat))
+
+    def contains(self, lat: float, lng: float) -> bool:
+        dlat = math.radians(lat - self.lat)
+        dlng = math.radians(lng - self.lng)
+        a = math.sin(dlat / 2) ** 2 + self._cos_lat * math.cos(math.radians(lat)) * math.sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))) <= self.radius_km
+
+    def contains_many(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        return haversine_km(self.lat, self.lng, lats, lngs) <= self.radius_km
+
+
+class PolygonFence:
+    """
+    Point-in-polygon over a polygon prepared once
+
+    The edges are bucketed into horizontal latitude slabs, so a ray cast
+    only looks at the few edges crossing the point's slab, after a
+    bounding-box rejection. contains_many() does the same for a whole batch
+    of points with numpy, one vectorized ray cast per slab.
+    """
+
+    def __init__(self, vertices: Sequence[Tuple[float, float]]):
+        if len(vertices) < 3:
+            raise ValueError("A polygon fence needs at least 3 vertices")
+
+        lats = np.array([lat for lat, _ in vertices], dtype=np.float64)
+        lngs = np.array([lng for _, lng in vertices], dtype=np.float64)
+
+        # Edge i runs from vertex i to vertex i + 1 (wrapping around)
+        self.y1, self.x1 = lats, lngs
+        self.y2, self.x2 = np.roll(lats, -1), np.roll(lngs, -1)
+
+        self.min_lat, self.max_lat = float(lats.min()), float(lats.max())
+        self.min_lng, self.max_lng = float(lngs.min()), float(lngs.max())
+
+        self.slab_count = max(1, min(64, len(vertices) // 2))
+        self.slab_height = (self.max_lat - self.min_lat) / self.slab_count or 1.0
+        self.slabs: List[List[Tuple[float, float, float, float]]] = [[] for _ in range(self.slab_count)]
+        for y1, x1, y2, x2 in zip(self.y1.tolist(), self.x1.tolist(), self.y2.tolist(), self.x2.tolist()):
+            if y1 == y2:
+                continue  # Horizontal edges never cross a horizontal ray
+            for slab in range(self._slab(min(y1, y2)), self._slab(max(y1, y2)) + 1):
+                self.slabs[slab].append((y1, x1, y2, x2))
+
+        # The same slabs as (4, n) arrays for contains_many()
+        self.slab_arrays = [np.array(edges, dtype=np.float64).reshape(-1, 4).T for edges in self.slabs]
+
+    def _slab(self, lat: float) -> int:
+        return min(self.slab_count - 1, max(0, int((lat - self.min_lat) / self.slab_height)))
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if not (self.min_lat <= lat <= self.max_lat and self.min_lng <= lng <= self.max_lng):
+            return False
+
+        inside = False
+        for y1, x1, y2, x2 in self.slabs[self._slab(lat)]:
+            if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+    def contains_many(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        inside = (
+            (lats >= self.min_lat) & (lats <= self.max_lat)
+            & (lngs >= self.min_lng) & (lngs <= self.max_lng)
+        )
+        candidates = np.flatnonzero(inside)
+        if len(candidates) == 0:
+            return inside
+
+        slabs = np.minimum(
+            ((lats[candidates] - self.min_lat) / self.slab_height).astype(np.intp), self.slab_count - 1
+        )
+        for slab in np.unique(slabs).tolist():
+            points = candidates[slabs == slab]
+            y1, x1, y2, x2 = self.slab_arrays[slab]
+            lat = lats[points, None]
+            lng = lngs[points, None]
+            crosses = (y1 > lat) != (y2 > lat)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_at_lat = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+            inside[points] = np.count_nonzero(crosses & (lng < x_at_lat), axis=1) % 2 == 1
+        return inside
+
+
+def _vertex(value) -> Tuple[float, float]:
+    if isinstance(value, dict):
+        return float(value["lat"]), float(value["lng"])
+    return float(value[0]), float(value[1])
+
+
+def compile_fence(area: Optional[Dict]):
+    """
+    Build a fence from RentalVehicle.geo_fence_area; None when unset
+
+    Accepted shapes:
+        {"type": "circle", "center": {"lat", "lng"}, "radius_km": 25}
+        {"type": "polygon", "points": [{"lat", "lng"}, ...]}   (or [lat, lng] pairs)
+        {"type": "Polygon", "coordinates": [[[lng, lat], ...]]}  (GeoJSON, outer ring)
+    """
+    if not area:
+        return None
+
+    if area.get("type") == "Polygon" and "coordinates" in area:
+        ring = area["coordinates"][0]
+        if len(ring) > 1 and ring[0] == ring[-1]:
+            ring = ring[:-1]
+        return PolygonFence([(float(lat), float(lng)) for lng, lat in ring])
+
+    if "radius_km" in area:
+        center = area.get("center", area)
+        return CircleFence(float(center["lat"]), float(center["lng"]), float(area["radius_km"]))
+
+    points = area.get("points") or area.get("coordinates")
+    if points:
+        return PolygonFence([_vertex(point) for point in points])
+
+    raise ValueError("Unrecognised geofence definition")
+
+
+class GeofenceMonitor:
+    """
+    Checks rental vehicle location batches against the vehicle's fence
+
+    Fences are compiled once per distinct geo_fence_area and the booking ->
+    fence lookup is cached for cache_ttl seconds. Alerts are edge-triggered:
+    leaving the fence raises an "exit" alert and counts one violation,
+    coming back raises an "enter" alert. Which side of the fence the vehicle
+    was last seen on lives in the shared tracking store and is advanced with
+    a compare-and-set, so each crossing is reported by exactly one worker
+    however the batches are spread; a session without that state resumes
+    from the booking's last recorded alert. All events from one batch are
+    appended in a single transaction to the booking rows locked FOR UPDATE.
+    """
+
+    def __init__(self, cache_ttl: int = 60, max_alerts: int = 100, store: Optional[TrackingStore] = None):
+        self.store = store or tracking_service.store
+        self.cache_ttl = cache_ttl
+        self.max_alerts = max_alerts
+        self._compiled: Dict[str, object] = {}
+        self._bookings: Dict[int, Tuple[Optional[object], float]] = {}
+
+    def invalidate(self, booking_id: Optional[int] = None):
+        """Drop cached fences (all bookings when booking_id is None)"""
+        if booking_id is None:
+            self._bookings.clear()
+        else:
+            self._bookings.pop(booking_id, None)
+
+    def _compile(self, area: Dict):
+        key = hashlib.sha1(json.dumps(area, sort_keys=True).encode()).hexdigest()
+        if key not in self._compiled:
+            self._compiled[key] = compile_fence(area)
+        return self._compiled[key]
+
+    async def _load_fences(self, db, booking_ids: Iterable[int]) -> Dict[int, object]:
+        now = time.monotonic()
+        fences = {}
+        missing = []
+
+        for booking_id in booking_ids:
+            cached = self._bookings.get(booking_id)
+            if cached and cached[1] > now:
+                fences[booking_id] = cached[0]
+            else:
+                missing.append(booking_id)
+
+        if missing:
+            rows = (await db.execute(
+                select(RentalBooking.id, RentalVehicle.geo_fence_area)
+                .join(RentalVehicle, RentalVehicle.id == RentalBooking.vehicle_id)
+                .where(RentalBooking.id.in_(missing))
+            )).all()
+
+            found = {}
+            for booking_id, area in rows:
+                try:
+                    found[booking_id] = self._compile(area) if area else None
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning(f"Ignoring invalid geofence for booking {booking_id}: {str(e)}")
+                    found[booking_id] = None
+
+            expires = now + self.cache_ttl
+            for booking_id in missing:
+                self._bookings[booking_id] = (found.get(booking_id), expires)
+                fences[booking_id] = found.get(booking_id)
+
+        return fences
+
+    async def _recorded_outside(self, db, booking_id: int) -> bool:
+        """Side of the fence according to the booking's last recorded alert"""
+        alerts = await db.scalar(select(RentalBooking.geo_fence_alerts).where(RentalBooking.id == booking_id))
+        return bool(alerts) and alerts[-1].get("type") == "exit"
+
+    def detect(self, fence, points: List[Point], previous: bool) -> Tuple[List[Dict], bool]:
+        """Exit/enter events in a chronological run of points, and whether the last one is outside"""
+        coords = np.asarray([point[:2] for point in points], dtype=np.float64)
+        if len(points) == 1:
+            outside = np.array([not fence.contains(coords[0, 0], coords[0, 1])])
+        else:
+            outside = ~fence.contains_many(coords[:, 0], coords[:, 1])
+
+        states = np.concatenate(([previous], outside))
+        events = []
+        for i in np.flatnonzero(states[1:] != states[:-1]).tolist():
+            latitude, longitude, _, _, recorded_at = points[i]
+            events.append({
+                "type": "exit" if outside[i] else "enter",
+                "latitude": latitude,
+                "longitude": longitude,
+                "timestamp": datetime.utcfromtimestamp(recorded_at).isoformat()
+            })
+        return events, bool(outside[-1])
+
+    async def _claim_events(self, db, booking_id: int, fence, points: List[Point]) -> List[Dict]:
+        """Detect events from the shared fence state and advance it; empty if another worker already did"""
+        session_key = f"vehicle_{booking_id}"
+        for _ in range(STATE_RETRIES):
+            state = await self.store.get_state(session_key, STATE_NAME)
+            if state is None:
+                batch, previous = points, await self._recorded_outside(db, booking_id)
+            else:
+                # Points another worker already checked are not checked again
+                batch = [point for point in points if point[4] > state["last_seen"]]
+                if not batch:
+                    return []
+                previous = state["outside"]
+
+            events, outside = self.detect(fence, batch, previous)
+            checked = {"outside": outside, "last_seen": batch[-1][4]}
+            if await self.store.compare_and_set_state(session_key, STATE_NAME, state, checked):
+                return events
+
+        logger.warning(f"Geofence state for booking {booking_id} kept changing; batch not checked")
+        return []
+
+    async def process(self, db, points_by_booking: Dict[int, List[Point]]) -> Dict[int, List[Dict]]:
+        """Check every booking's points and persist any alerts; returns events per booking"""
+        fences = await self._load_fences(db, points_by_booking.keys())
+
+        events_by_booking = {}
+        for booking_id, points in points_by_booking.items():
+            fence = fences.get(booking_id)
+            if fence is None or not points:
+                continue
+            events = await self._claim_events(db, booking_id, fence, points)
+            if events:
+                events_by_booking[booking_id] = events
+
+        if events_by_booking:
+            await self._record(db, events_by_booking)
+
+        return events_by_booking
+
+    async def _record(self, db, events_by_booking: Dict[int, List[Dict]]):
+        # Locked so concurrent batches append to, rather than overwrite, each other's alerts
+        bookings = (await db.scalars(
+            select(RentalBooking)
+            .where(RentalBooking.id.in_(events_by_booking.keys()))
+            .order_by(RentalBooking.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )).all()
+
+        for booking in bookings:
+            events = events_by_booking[booking.id]
+            booking.geo_fence_violations = (booking.geo_fence_violations or 0) + sum(
+                1 for event in events if event["type"] == "exit"
+            )
+            booking.geo_fence_alerts = ((booking.geo_fence_alerts or []) + events)[-self.max_alerts:]
+
+        await db.commit()
+
+    async def forget(self, booking_id: int):
+        """Drop the fence state of a booking whose tracking stopped"""
+        session_key = f"vehicle_{booking_id}"
+        state = await self.store.get_state(session_key, STATE_NAME)
+        if state is not None:
+            await self.store.compare_and_set_state(session_key, STATE_NAME, state, None)
+
+
+# Singleton instance
+geofence_monitor = GeofenceMonitor(
+    cache_ttl=settings.GEOFENCE_CACHE_TTL,
+    max_alerts=settings.GEOFENCE_MAX_ALERTS
+)
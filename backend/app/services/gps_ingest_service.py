@@ -0,0 +1,163 @@
+"""Bulk ingestion of GPS points from rental vehicle trackers"""
+import json
+import math
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.rental import RentalBooking, RentalBookingStatus, RentalVehicle
+from app.services.location_buffer import POINT_STRUCT, Point
+
+# Bookings whose vehicle is out on the road
+TRACKED_BOOKING_STATUSES = (RentalBookingStatus.ACTIVE, RentalBookingStatus.OVERDUE)
+
+# Packed body: repeated [uint16 id length][device id][uint32 count][count x 40-byte point]
+_DEVICE_HEADER = struct.Struct("<H")
+_COUNT = struct.Struct("<I")
+
+
+class GpsBatchError(ValueError):
+    """Raised when a batch body cannot be decoded"""
+
+
+def parse_ndjson(body: bytes) -> Dict[str, List[Point]]:
+    """
+    Decode one JSON object per line:
+
+        {"device_id": "GPS-001", "lat": 5.6, "lng": -0.18, "heading": 90, "speed": 42, "ts": 1718000000.5}
+
+    heading, speed and ts are optional (ts defaults to receipt time).
+    """
+    received_at = time.time()
+    points: Dict[str, List[Point]] = {}
+
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            point = (
+                float(record["lat"]),
+                float(record["lng"]),
+                math.nan if record.get("heading") is None else float(record["heading"]),
+                math.nan if record.get("speed") is None else float(record["speed"]),
+                float(record.get("ts") or received_at)
+            )
+            points.setdefault(str(record["device_id"]), []).append(point)
+        except (ValueError, KeyError, TypeError) as e:
+            raise GpsBatchError(f"Invalid record on line {line_number}: {str(e)}")
+
+    return points
+
+
+def parse_packed(body: bytes) -> Dict[str, List[Point]]:
+    """
+    Decode the packed binary format
+
+    For each device: a little-endian uint16 id length, the UTF-8 device id,
+    a uint32 point count, then that many (lat, lng, heading, speed, ts)
+    float64 records. NaN marks a missing heading/speed.
+    """
+    points: Dict[str, List[Point]] = {}
+    view = memoryview(body)
+    offset = 0
+
+    try:
+        while offset < len(view):
+            (id_length,) = _DEVICE_HEADER.unpack_from(view, offset)
+            offset += _DEVICE_HEADER.size
+            device_id = bytes(view[offset:offset + id_length]).decode()
+            offset += id_length
+            (count,) = _COUNT.unpack_from(view, offset)
+            offset += _COUNT.size
+
+            end = offset + count * POINT_STRUCT.size
+            if end > len(view):
+                raise GpsBatchError(f"Truncated points for device {device_id}")
+
+            points.setdefault(device_id, []).extend(POINT_STRUCT.iter_unpack(view[offset:end]))
+            offset = end
+    except (struct.error, UnicodeDecodeError) as e:
+        raise GpsBatchError(f"Malformed packed body at byte {offset}: {str(e)}")
+
+    return points
+
+
+def is_valid_point(point: Point) -> bool:
+    latitude, longitude, _, _, recorded_at = point
+    return (
+        -90.0 <= latitude <= 90.0
+        and -180.0 <= longitude <= 180.0
+        and math.isfinite(recorded_at)
+    )
+
+
+class GpsIngestService:
+    """
+    Maps tracker devices to the rental booking they are serving
+
+    Device -> booking lookups are cached for cache_ttl seconds (including
+    devices with no active booking), and cache misses from one batch are
+    resolved with a single query.
+    """
+
+    def __init__(self, cache_ttl: int = 60):
+        self.cache_ttl = cache_ttl
+        self._bookings: Dict[str, Tuple[Optional[int], float]] = {}
+
+    def invalidate(self, device_id: Optional[str] = None):
+        """Drop cached booking lookups (all devices when device_id is None)"""
+        if device_id is None:
+            self._bookings.clear()
+        else:
+            self._bookings.pop(device_id, None)
+
+    async def invalidate_vehicle(self, db, vehicle_id: Optional[int]):
+        """Drop the cached lookup of a vehicle's tracker, after one of its bookings changes status"""
+        if vehicle_id is None:
+            return
+        device_id = await db.scalar(select(RentalVehicle.gps_device_id).where(RentalVehicle.id == vehicle_id))
+        if device_id:
+            self.invalidate(device_id)
+
+    async def resolve_bookings(self, db, device_ids: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Active rental booking id per device (None when the device is idle or unknown)"""
+        now = time.monotonic()
+        resolved: Dict[str, Optional[int]] = {}
+        missing = []
+
+        for device_id in device_ids:
+            cached = self._bookings.get(device_id)
+            if cached and cached[1] > now:
+                resolved[device_id] = cached[0]
+            else:
+                missing.append(device_id)
+
+        if missing:
+            rows = (await db.execute(
+                select(RentalVehicle.gps_device_id, RentalBooking.id)
+                .join(RentalBooking, RentalBooking.vehicle_id == RentalVehicle.id)
+                .where(
+                    RentalVehicle.gps_device_id.in_(missing),
+                    RentalVehicle.real_time_tracking_enabled == True,
+                    RentalBooking.status.in_(TRACKED_BOOKING_STATUSES)
+                )
+                .order_by(RentalBooking.id.asc())
+            )).all()
+
+            # Latest booking wins if a device somehow has more than one
+            found = {device_id: booking_id for device_id, booking_id in rows}
+            expires = now + self.cache_ttl
+            for device_id in missing:
+                booking_id = found.get(device_id)
+                self._bookings[device_id] = (booking_id, expires)
+                resolved[device_id] = booking_id
+
+        return resolved
+
+
+# Singleton instance
+gps_ingest_service = GpsIngestService(cache_ttl=settings.TRACKING_DEVICE_CACHE_TTL)
@@ -0,0 +1,145 @@
+"""Compact fixed-capacity storage for GPS location history"""
+import math
+import struct
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# latitude, longitude, heading, speed, recorded_at (epoch seconds)
+POINT_STRUCT = struct.Struct("<5d")
+
+Point = Tuple[float, float, float, float, float]
+
+
+def serialize_point(
+    latitude: float,
+    longitude: float,
+    heading: float,
+    speed: float,
+    recorded_at: float
+) -> Dict:
+    """API representation of a point; NaN marks a missing heading/speed"""
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "timestamp": datetime.utcfromtimestamp(recorded_at).isoformat(),
+        "heading": None if math.isnan(heading) else heading,
+        "speed": None if math.isnan(speed) else speed
+    }
+
+
+def pack_point(
+    latitude: float,
+    longitude: float,
+    heading: Optional[float],
+    speed: Optional[float],
+    recorded_at: float
+) -> bytes:
+    """Encode a point as 40 bytes (used by the Redis store)"""
+    return POINT_STRUCT.pack(
+        latitude,
+        longitude,
+        math.nan if heading is None else heading,
+        math.nan if speed is None else speed,
+        recorded_at
+    )
+
+
+def unpack_point(data: bytes) -> Point:
+    return POINT_STRUCT.unpack(data)
+
+
+class LocationRingBuffer:
+    """
+    Ring buffer of GPS points held in parallel float64 arrays
+
+    Appends are O(1) and never reallocate once the buffer is full; the
+    arrays grow up to `capacity` so idle sessions stay small. Reads copy
+    only the requested slice of each column, and timestamps are only
+    formatted when points are serialized.
+    """
+
+    __slots__ = ("capacity", "latitude", "longitude", "heading", "speed", "recorded_at", "_next")
+
+    COLUMNS = ("latitude", "longitude", "heading", "speed", "recorded_at")
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.latitude = array("d")
+        self.longitude = array("d")
+        self.heading = array("d")
+        self.speed = array("d")
+        self.recorded_at = array("d")
+        self._next = 0  # Slot the next point overwrites once full
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def append(
+        self,
+        latitude: float,
+        longitude: float,
+        heading: Optional[float],
+        speed: Optional[float],
+        recorded_at: float
+    ):
+        heading = math.nan if heading is None else heading
+        speed = math.nan if speed is None else speed
+
+        if len(self.latitude) < self.capacity:
+            self.latitude.append(latitude)
+            self.longitude.append(longitude)
+            self.heading.append(heading)
+            self.speed.append(speed)
+            self.recorded_at.append(recorded_at)
+            return
+
+        i = self._next
+        self.latitude[i] = latitude
+        self.longitude[i] = longitude
+        self.heading[i] = heading
+        self.speed[i] = speed
+        self.recorded_at[i] = recorded_at
+        self._next = (i + 1) % self.capacity
+
+    def clear(self):
+        for column in self.COLUMNS:
+            del getattr(self, column)[:]
+        self._next = 0
+
+    def _ranges(self, limit: int) -> List[Tuple[int, int]]:
+        """Index ranges (oldest first) covering the newest `limit` points"""
+        size = len(self.latitude)
+        limit = min(max(limit, 0), size)
+        if limit == 0:
+            return []
+
+        if size < self.capacity or self._next == 0:
+            return [(size - limit, size)]
+
+        # Full ring: oldest point sits at _next
+        end = self._next
+        start = end - limit
+        if start >= 0:
+            return [(start, end)]
+        return [(size + start, size), (0, end)]
+
+    def latest(self) -> Optional[Point]:
+        size = len(self.latitude)
+        if size == 0:
+            return None
+
+        i = (self._next - 1) % size if size == self.capacity else size - 1
+        return (self.latitude[i], self.longitude[i], self.heading[i], self.speed[i], self.recorded_at[i])
+
+    def points(self, limit: int) -> List[Point]:
+        """Newest `limit` points as raw tuples, oldest first"""
+        # Slices copy, so no buffer stays exported to block a later append() or clear()
+        points = []
+        for start, end in self._ranges(limit):
+            points.extend(zip(*(getattr(self, column)[start:end] for column in self.COLUMNS)))
+        return points
+
+    def to_dicts(self, limit: int) -> List[Dict]:
+        """Serialize the newest `limit` points in chronological order"""
+        return [serialize_point(*point) for point in self.points(limit)]
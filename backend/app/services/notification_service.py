@@ -4,12 +4,16 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 from datetime import datetime
 
+from app.core.pagination import paginate
 from app.models.notification import Notification
 from app.models.user import User
 from app.services.email_service import email_service
 from app.services.sms_service import sms_service
 from app.services.firebase_service import firebase_service
 
+# Newest first; id breaks ties between notifications created together
+NOTIFICATION_SORT_KEYS = (Notification.created_at, Notification.id)
+
 logger = logging.getLogger(__name__)
 
 
@@ -292,17 +296,16 @@ class NotificationService:
         user_id: int,
         unread_only: bool = False,
         skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> List[Notification]:
-        """Get user notifications"""
+        """Get user notifications, after `cursor` when given (otherwise skipping `skip`)"""
         query = db.query(Notification).filter(Notification.user_id == user_id)
 
         if unread_only:
             query = query.filter(Notification.is_read == False)
 
-        notifications = query.order_by(
-            Notification.created_at.desc()
-        ).offset(skip).limit(limit).all()
+        notifications = paginate(query, NOTIFICATION_SORT_KEYS, skip, limit, cursor).all()
 
         return notifications
 
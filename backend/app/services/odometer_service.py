@@ -0,0 +1,264 @@
+"""Distance accounting for rental vehicles and fleet subscriptions from GPS pings"""
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.models.rental import RentalBooking, RentalVehicle, FleetSubscription
+from app.services.eta_service import haversine_km, EARTH_RADIUS_KM
+from app.services.location_buffer import Point
+from app.services.tracking_service import tracking_service
+from app.services.tracking_store import TrackingStore
+
+logger = logging.getLogger(__name__)
+
+# Fixes the next batch is measured from, (latitude, longitude, recorded_at)
+# each: the stay point, then the fix that left it if the move is unconfirmed
+Anchor = Tuple[Tuple[float, float, float], ...]
+
+# Tracking store state holding {"anchor": [...], "last_seen": recorded_at}
+STATE_NAME = "odometer"
+
+# Attempts to advance a booking's anchor before the batch is given up
+STATE_RETRIES = 5
+
+
+def trip_distance_km(
+    points: np.ndarray,
+    anchor: Optional[Anchor],
+    stay_radius_m: float,
+    max_speed_kmh: float,
+    stationary_speed_kmh: float = 1.0
+) -> Tuple[float, Optional[Anchor]]:
+    """
+    Distance covered by a chronological (n, 4) array of lat/lng/time/speed rows
+
+    - Spikes: a point reached and left faster than max_speed_kmh is dropped
+    - Stationary: a point whose tracker reports a speed below
+      stationary_speed_kmh is dropped (NaN speed means not reported)
+    - Stay points: distance is measured from an anchor that only moves to a
+      fix stay_radius_m or more away from it, once the next fix is out of
+      the radius too, and the move counts from the anchor. GPS noise around
+      a parked vehicle stays inside the radius or strays out for a single
+      fix, so it never adds up; a slow crawl still counts once it leaves.
+
+    Returns the distance and the anchor for the next batch.
+    """
+    carried = len(anchor) if anchor else 0
+    if carried:
+        points = np.vstack([np.array([(*row, np.nan) for row in anchor], dtype=np.float64), points])
+    if len(points) < 2:
+        return 0.0, (tuple(points[-1, :3]),) if len(points) else anchor
+
+    lats, lngs, times, speeds = points[:, 0], points[:, 1], points[:, 2], points[:, 3]
+
+    # Implied speed into and out of every point
+    step_km = haversine_km(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+    hours = np.maximum(np.diff(times), 1.0) / 3600
+    too_fast = step_km / hours > max_speed_kmh
+    drop = np.zeros(len(points), dtype=bool)
+    drop[1:-1] = too_fast[:-1] & too_fast[1:]
+    drop[-1] = too_fast[-1]
+    drop |= speeds < stationary_speed_kmh  # NaN compares False
+    drop[:max(carried, 1)] = False  # Already accepted, or the first fix of a new trip
+
+    fixes = points[~drop, :3].tolist()
+
+    # Stay points: one pass over the kept fixes, each compared with the anchor
+    metres_per_degree = math.radians(1.0) * EARTH_RADIUS_KM * 1000
+    stay = fixes[0]
+    candidate = None  # A fix outside the radius awaiting confirmation, and its distance
+    distance_m = 0.0
+
+    def moved_from_stay(fix):
+        # Equirectangular is exact enough at stay-radius scale
+        return metres_per_degree * math.hypot(fix[0] - stay[0], (fix[1] - stay[1]) * math.cos(math.radians(stay[0])))
+
+    for fix in fixes[1:]:
+        moved_m = moved_from_stay(fix)
+        if moved_m < stay_radius_m:
+            candidate = None
+            continue
+        if candidate is not None:
+            # A second fix out of the radius confirms the move to the first
+            stay, leg_m = candidate
+            distance_m += leg_m
+            moved_m = moved_from_stay(fix)
+        candidate = (fix, moved_m) if moved_m >= stay_radius_m else None
+
+    next_anchor = (tuple(stay),) + ((tuple(candidate[0]),) if candidate else ())
+    return distance_m / 1000, next_anchor
+
+
+class OdometerService:
+    """
+    Accumulates driven distance per rental booking and flushes it to the
+    vehicle odometer and the vehicle's active fleet subscriptions
+
+    Each batch of pings is filtered with one vectorized haversine pass and
+    measured against a stay-point anchor (see trip_distance_km). The anchor
+    and the time of the last measured ping live in the shared tracking
+    store beside the session and are advanced with a compare-and-set, so
+    whichever worker receives a batch measures it from where the previous
+    batch ended, and a batch whose anchor moved underneath it is measured
+    again from the new one. Pings no newer than the last measured one are
+    skipped rather than counted twice.
+
+    Measured distance is added to an in-memory per-booking total that is
+    written every flush_interval seconds in one transaction:
+    RentalVehicle.tracked_distance_km and odometer_reading, and
+    FleetSubscription.total_distance_km for active subscriptions listing the
+    vehicle in assigned_vehicles. A batch is measured by exactly one worker
+    and each worker flushes only what it measured.
+
+    A gap longer than max_gap_seconds is not bridged, so a tracker that was
+    off does not count the straight line to where it reappears.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 30.0,
+        stay_radius_m: float = 30.0,
+        max_speed_kmh: float = 200.0,
+        stationary_speed_kmh: float = 1.0,
+        max_gap_seconds: float = 600.0,
+        store: Optional[TrackingStore] = None
+    ):
+        self.store = store or tracking_service.store
+        self.flush_interval = flush_interval
+        self.stay_radius_m = stay_radius_m
+        self.max_speed_kmh = max_speed_kmh
+        self.stationary_speed_kmh = stationary_speed_kmh
+        self.max_gap_seconds = max_gap_seconds
+        self._pending: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # Don't lose the last interval's distance on shutdown
+        try:
+            async for db in get_async_db():
+                await self.flush(db)
+        except Exception as e:
+            logger.error(f"Final odometer flush failed: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                async for db in get_async_db():
+                    await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Odometer flush failed: {str(e)}")
+
+    # ==================== ACCUMULATION ====================
+
+    async def record(self, points_by_booking: Dict[int, List[Point]]):
+        """Measure chronological vehicle pings per rental booking"""
+        for booking_id, points in points_by_booking.items():
+            if not points:
+                continue
+            rows = np.array([(point[0], point[1], point[4], point[3]) for point in points], dtype=np.float64)
+            session_key = f"vehicle_{booking_id}"
+
+            for _ in range(STATE_RETRIES):
+                state = await self.store.get_state(session_key, STATE_NAME)
+                batch, anchor = rows, None
+                if state is not None:
+                    batch = rows[rows[:, 2] > state["last_seen"]]
+                    if not len(batch):
+                        break
+                    if batch[0, 2] - state["last_seen"] <= self.max_gap_seconds:
+                        anchor = tuple(tuple(fix) for fix in state["anchor"])
+
+                distance, next_anchor = trip_distance_km(
+                    batch, anchor, self.stay_radius_m, self.max_speed_kmh, self.stationary_speed_kmh
+                )
+                measured = {"anchor": [list(fix) for fix in next_anchor], "last_seen": float(batch[-1, 2])}
+                if await self.store.compare_and_set_state(session_key, STATE_NAME, state, measured):
+                    if distance:
+                        self._pending[booking_id] = self._pending.get(booking_id, 0.0) + distance
+                    break
+            else:
+                logger.warning(f"Odometer anchor for booking {booking_id} kept changing; batch not measured")
+
+    def pending_km(self, booking_ids) -> float:
+        """Distance measured by this worker but not flushed yet"""
+        return sum(self._pending.get(booking_id, 0.0) for booking_id in booking_ids)
+
+    # ==================== FLUSH ====================
+
+    async def flush(self, db) -> int:
+        """Write pending distance; returns the number of vehicles updated"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            by_vehicle: Dict[int, float] = {}
+            for booking_id, vehicle_id in (await db.execute(
+                select(RentalBooking.id, RentalBooking.vehicle_id).where(RentalBooking.id.in_(pending.keys()))
+            )).all():
+                if vehicle_id is not None:
+                    by_vehicle[vehicle_id] = by_vehicle.get(vehicle_id, 0.0) + pending[booking_id]
+
+            vehicles = (await db.scalars(
+                select(RentalVehicle).where(RentalVehicle.id.in_(by_vehicle.keys())).with_for_update()
+            )).all()
+            for vehicle in vehicles:
+                before = vehicle.tracked_distance_km or 0.0
+                vehicle.tracked_distance_km = before + by_vehicle[vehicle.id]
+                # Whole kilometres crossed; fractions carry over in tracked_distance_km
+                vehicle.odometer_reading = (vehicle.odometer_reading or 0) + (
+                    int(vehicle.tracked_distance_km) - int(before)
+                )
+
+            subscriptions = (await db.scalars(
+                select(FleetSubscription).where(FleetSubscription.is_active == True).with_for_update()
+            )).all()
+            for subscription in subscriptions:
+                added = sum(by_vehicle.get(vehicle_id, 0.0) for vehicle_id in subscription.assigned_vehicles or [])
+                if added:
+                    subscription.total_distance_km = (subscription.total_distance_km or 0.0) + added
+
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Put the distance back for the next flush
+            for booking_id, distance in pending.items():
+                self._pending[booking_id] = self._pending.get(booking_id, 0.0) + distance
+            raise
+
+        return len(vehicles)
+
+    async def forget(self, booking_id: int):
+        """Drop the anchor of a finished booking"""
+        session_key = f"vehicle_{booking_id}"
+        state = await self.store.get_state(session_key, STATE_NAME)
+        if state is not None:
+            await self.store.compare_and_set_state(session_key, STATE_NAME, state, None)
+
+
+# Singleton instance
+odometer_service = OdometerService(
+    flush_interval=settings.ODOMETER_FLUSH_INTERVAL,
+    stay_radius_m=settings.ODOMETER_STAY_RADIUS_M,
+    max_speed_kmh=settings.ODOMETER_MAX_SPEED_KMH,
+    stationary_speed_kmh=settings.ODOMETER_STATIONARY_SPEED_KMH,
+    max_gap_seconds=settings.ODOMETER_MAX_GAP_SECONDS
+)
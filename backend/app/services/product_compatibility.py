@@ -0,0 +1,136 @@
+"""Vehicle compatibility index for store products"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, delete, and_, or_
+
+from app.models.store import Product, ProductCompatibility
+
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+_YEAR_RANGE = re.compile(r"^\s*(\d{4})\s*(?:-|to)\s*(\d{4})\s*$")
+
+# (make, model, year) of a vehicle to find parts for; model and year may be None
+VehicleKey = Tuple[str, Optional[str], Optional[int]]
+
+
+def normalize(value) -> Optional[str]:
+    """Lowercase with punctuation folded to single spaces (Mercedes-Benz -> mercedes benz)"""
+    if value is None:
+        return None
+    folded = _SEPARATORS.sub(" ", str(value).lower()).strip()
+    return folded or None
+
+
+def parse_years(values: Optional[Iterable]) -> List[int]:
+    """Sorted distinct years from ints, "2015" or "2010-2015" style entries"""
+    years = set()
+    for value in values or []:
+        if isinstance(value, int):
+            years.add(value)
+            continue
+        text = str(value)
+        match = _YEAR_RANGE.match(text)
+        if match:
+            start, end = sorted((int(match.group(1)), int(match.group(2))))
+            years.update(range(start, end + 1))
+        elif text.strip().isdigit():
+            years.add(int(text))
+    return sorted(years)
+
+
+def year_ranges(years: Sequence[int]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Collapse sorted years into contiguous (from, to) ranges; no years means any year"""
+    if not years:
+        return [(None, None)]
+    ranges = []
+    start = previous = years[0]
+    for year in years[1:]:
+        if year != previous + 1:
+            ranges.append((start, previous))
+            start = year
+        previous = year
+    ranges.append((start, previous))
+    return ranges
+
+
+def compatibility_rows(product) -> List[Dict]:
+    """ProductCompatibility rows for a product's compatible_makes/models/years"""
+    makes = sorted({make for make in map(normalize, product.compatible_makes or []) if make})
+    models = sorted({model for model in map(normalize, product.compatible_models or []) if model})
+    if not makes and not models:
+        return []  # No fitment declared: the product isn't matched by vehicle
+
+    return [
+        {"product_id": product.id, "make": make, "model": model, "year_from": year_from, "year_to": year_to}
+        for make in makes or [None]
+        for model in models or [None]
+        for year_from, year_to in year_ranges(parse_years(product.compatible_years))
+    ]
+
+
+def vehicle_condition(make: str, model: Optional[str] = None, year: Optional[int] = None):
+    """Index rows that fit one vehicle; a NULL make, model or year range on the row is a wildcard"""
+    conditions = [or_(ProductCompatibility.make == normalize(make), ProductCompatibility.make.is_(None))]
+    if model:
+        conditions.append(or_(ProductCompatibility.model == normalize(model), ProductCompatibility.model.is_(None)))
+    if year is not None:
+        conditions.append(or_(
+            ProductCompatibility.year_from.is_(None),
+            and_(ProductCompatibility.year_from <= year, ProductCompatibility.year_to >= year)
+        ))
+    return and_(*conditions)
+
+
+class ProductCompatibilityIndex:
+    """
+    Keeps ProductCompatibility in step with Product.compatible_* arrays
+
+    sync() rewrites one product's rows inside the caller's transaction, so
+    the index commits (or rolls back) together with the product write.
+    Lookups go through the (make, model, year_from) index instead of
+    scanning JSON arrays.
+    """
+
+    async def sync(self, db, product: Product):
+        """Replace a product's rows; the product must have been flushed (needs an id)"""
+        await db.execute(delete(ProductCompatibility).where(ProductCompatibility.product_id == product.id))
+        rows = compatibility_rows(product)
+        if rows:
+            db.add_all(ProductCompatibility(**row) for row in rows)
+        await db.flush()
+
+    async def rebuild(self, db, batch_size: int = 500) -> int:
+        """Re-derive the rows of every product (for backfills); returns rows written"""
+        written = 0
+        last_id = 0
+        while True:
+            products = (await db.execute(
+                select(Product.id, Product.compatible_makes, Product.compatible_models, Product.compatible_years)
+                .where(Product.id > last_id)
+                .order_by(Product.id)
+                .limit(batch_size)
+            )).all()
+            if not products:
+                break
+
+            last_id = products[-1].id
+            await db.execute(delete(ProductCompatibility).where(
+                ProductCompatibility.product_id.in_([product.id for product in products])
+            ))
+            rows = [row for product in products for row in compatibility_rows(product)]
+            db.add_all(ProductCompatibility(**row) for row in rows)
+            await db.commit()
+            written += len(rows)
+
+        return written
+
+    def fits(self, vehicles: Sequence[VehicleKey]):
+        """Filter on Product matching products that fit any of the vehicles"""
+        return Product.id.in_(
+            select(ProductCompatibility.product_id)
+            .where(or_(*(vehicle_condition(make, model, year) for make, model, year in vehicles)))
+        )
+
+
+# Singleton instance
+product_compatibility = ProductCompatibilityIndex()
@@ -0,0 +1,180 @@
+"""Facet counts for the store product catalog"""
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, func, case, and_, literal
+
+from app.core.config import settings
+from app.models.store import Product
+
+FACETS = ("category", "brand", "price", "condition")
+
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+
+class ProductFacetService:
+    """
+    Category, brand, price-bucket and condition counts for a filter set
+
+    One grouped query counts the matching products per
+    (category, brand, price bucket, condition, inside the price range)
+    cell, with the facet selections themselves left out of the WHERE
+    clause. Each facet is then summed from those cells with every other
+    selection applied but its own, so the counts show what picking another
+    value would return. The number of cells is bounded by the facet
+    cardinalities, not by the catalog size.
+
+    Results are memoized per normalized filter key in a bounded LRU; product
+    writes in this worker clear it and the TTL bounds staleness from other
+    workers.
+    """
+
+    def __init__(self, price_edges: Sequence[float] = (), cache_size: int = 1000, cache_ttl: int = 60):
+        self.price_edges = sorted(price_edges)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._results: "OrderedDict[Tuple, Tuple[Dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== KEYS ====================
+
+    @staticmethod
+    def cache_key(base_key: Tuple, category: Optional[str], brand: Optional[str], condition: Optional[str],
+                  min_price: Optional[float], max_price: Optional[float]) -> Tuple:
+        """Normalized key: case and surrounding whitespace don't change the counts"""
+        def norm(value):
+            return value.strip().lower() if value and value.strip() else None
+        return (
+            base_key, norm(category), norm(brand), norm(condition),
+            float(min_price) if min_price is not None else None,
+            float(max_price) if max_price is not None else None,
+        )
+
+    def buckets(self) -> List[Tuple[Optional[float], Optional[float]]]:
+        """(min, max) of each price bucket; the first and last are open-ended"""
+        bounds = [None] + list(self.price_edges) + [None]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    # ==================== COUNTS ====================
+
+    async def facets(
+        self,
+        db,
+        conditions: List,
+        base_key: Tuple,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        condition: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Dict:
+        """
+        Facet counts for products matching `conditions` (the non-facet filters,
+        identified by base_key) and the facet selections
+        """
+        key = self.cache_key(base_key, category, brand, condition, min_price, max_price)
+        now = time.monotonic()
+
+        cached = self._results.get(key)
+        if cached and cached[1] > now:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        cells = await self._cells(db, conditions, min_price, max_price)
+        result = self.count(cells, category, brand, condition)
+
+        self._results[key] = (result, now + self.cache_ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result
+
+    async def _cells(self, db, conditions: List, min_price: Optional[float], max_price: Optional[float]) -> List:
+        bucket = case(
+            *[(Product.price < edge, index) for index, edge in enumerate(self.price_edges)],
+            else_=len(self.price_edges)
+        ) if self.price_edges else literal(0)
+
+        range_conditions = []
+        if min_price is not None:
+            range_conditions.append(Product.price >= min_price)
+        if max_price is not None:
+            range_conditions.append(Product.price <= max_price)
+        in_range = case((and_(*range_conditions), 1), else_=0) if range_conditions else literal(1)
+
+        query = (
+            select(
+                Product.category,
+                func.lower(func.coalesce(Product.brand, "")).label("brand_key"),
+                func.min(Product.brand),
+                bucket.label("bucket"),
+                func.lower(Product.condition).label("condition_key"),
+                func.min(Product.condition),
+                in_range.label("in_range"),
+                func.count(Product.id)
+            )
+            .where(*conditions)
+            .group_by(Product.category, "brand_key", "bucket", "condition_key", "in_range")
+        )
+        return (await db.execute(query)).all()
+
+    def count(self, cells: Sequence, category: Optional[str], brand: Optional[str], condition: Optional[str]) -> Dict:
+        """Per-facet counts from the grouped cells, each facet ignoring its own selection"""
+        category = category.strip().lower() if category else None
+        brand = brand.strip().lower() if brand else None
+        condition = condition.strip().lower() if condition else None
+
+        counts: Dict[str, Dict] = {facet: {} for facet in FACETS}
+        labels: Dict[str, Dict] = {"brand": {}, "condition": {}}
+        total = 0
+
+        for cell_category, brand_key, brand_label, bucket, condition_key, condition_label, in_range, count in cells:
+            category_key = str(_enum_value(cell_category)).lower()
+            matches = {
+                "category": category is None or category_key == category,
+                # Same substring match as the listing's brand filter
+                "brand": brand is None or brand in brand_key,
+                "price": bool(in_range),
+                "condition": condition is None or condition_key == condition,
+            }
+            if all(matches.values()):
+                total += count
+
+            values = {"category": category_key, "brand": brand_key, "price": bucket, "condition": condition_key}
+            for facet in FACETS:
+                if all(matched for other, matched in matches.items() if other != facet):
+                    counts[facet][values[facet]] = counts[facet].get(values[facet], 0) + count
+            labels["brand"].setdefault(brand_key, brand_label)
+            labels["condition"].setdefault(condition_key, condition_label)
+
+        def ranked(facet):
+            return sorted(counts[facet].items(), key=lambda item: (-item[1], str(item[0])))
+
+        buckets = self.buckets()
+        return {
+            "total": total,
+            "category": [{"value": value, "count": count} for value, count in ranked("category")],
+            "brand": [{"value": labels["brand"][value], "count": count} for value, count in ranked("brand") if value],
+            "price": [
+                {"min": buckets[index][0], "max": buckets[index][1], "count": counts["price"].get(index, 0)}
+                for index in range(len(buckets))
+            ],
+            "condition": [{"value": labels["condition"][value], "count": count} for value, count in ranked("condition")],
+        }
+
+    def invalidate(self):
+        self._results.clear()
+
+
+# Singleton instance
+product_facets = ProductFacetService(
+    price_edges=[float(edge) for edge in settings.PRODUCT_FACET_PRICE_BUCKETS.split(",") if edge.strip()],
+    cache_size=settings.PRODUCT_FACET_CACHE_SIZE,
+    cache_ttl=settings.PRODUCT_FACET_CACHE_TTL
+)
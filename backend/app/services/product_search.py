@@ -0,0 +1,337 @@
+"""Ranked full-text search over store products"""
+import asyncio
+import heapq
+import math
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.store import Product
+
+# Indexed fields and how much a term occurrence in each counts
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "part_number": 3.0,
+    "brand": 2.0,
+    "search_tags": 2.0,
+    "description": 1.0,
+}
+
+STOPWORDS = frozenset({"a", "an", "and", "for", "in", "is", "of", "on", "or", "the", "to", "with"})
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Score multipliers for inexact term matches
+PREFIX_FACTOR = 0.8
+TYPO_FACTOR = 0.6
+
+MAX_EXPANSIONS = 50  # vocabulary terms a prefix or typo expands to
+MIN_PREFIX_LENGTH = 2
+MIN_TYPO_LENGTH = 4
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Re-scan a little behind the watermark so rows committed late by a
+# concurrent transaction (updated_at is set at flush) are not missed.
+# Re-indexing a product is idempotent.
+HIGH_WATER_OVERLAP = timedelta(minutes=1)
+
+
+def _normalize(term: str) -> str:
+    """Fold simple plurals so "pads" finds "pad" (and vice versa)"""
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss") and not term.isdigit():
+        return term[:-1]
+    return term
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-folded alphanumeric terms without stopwords"""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return [_normalize(token) for token in _TOKEN.findall(folded) if token not in STOPWORDS]
+
+
+def part_number_terms(part_number: Optional[str]) -> List[str]:
+    """Pieces of a part number plus its compact form, so "BP-1234" matches "bp1234" too"""
+    tokens = tokenize(part_number)
+    compact = "".join(tokens)
+    return tokens + [compact] if len(tokens) > 1 else tokens
+
+
+def _deletes(term: str) -> Set[str]:
+    """All strings one deletion away from term (symmetric-delete typo matching)"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def product_fields(product) -> Dict[str, object]:
+    return {
+        "name": product.name,
+        "description": product.description,
+        "brand": product.brand,
+        "part_number": product.part_number,
+        "search_tags": product.search_tags,
+    }
+
+
+class InvertedIndex:
+    """
+    Term -> {product_id: weighted term frequency} postings with BM25 ranking
+
+    Products can be upserted and removed one at a time. Besides exact terms,
+    the last query term matches as a prefix (via a sorted vocabulary) and
+    terms of MIN_TYPO_LENGTH or more tolerate one typo (insert, delete,
+    substitute or swap) through a deletion-neighbourhood map.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.documents: Dict[int, Dict[str, float]] = {}
+        self.lengths: Dict[int, float] = {}
+        self.total_length = 0.0
+        self.vocabulary: List[str] = []
+        self.neighbours: Dict[str, Set[str]] = {}
+        self._bulk = False
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    # ==================== WRITES ====================
+
+    @staticmethod
+    def term_weights(fields: Dict[str, object]) -> Dict[str, float]:
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = fields.get(field)
+            if field == "part_number":
+                terms = part_number_terms(value)
+            elif isinstance(value, (list, tuple)):
+                terms = [term for item in value for term in tokenize(str(item))]
+            else:
+                terms = tokenize(value)
+            for term in terms:
+                weights[term] = weights.get(term, 0.0) + weight
+        return weights
+
+    def upsert(self, product_id: int, fields: Dict[str, object]):
+        self.remove(product_id)
+
+        weights = self.term_weights(fields)
+        if not weights:
+            return
+
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._add_term(term)
+            postings[product_id] = weight
+
+        self.documents[product_id] = weights
+        length = sum(weights.values())
+        self.lengths[product_id] = length
+        self.total_length += length
+
+    def remove(self, product_id: int):
+        weights = self.documents.pop(product_id, None)
+        if weights is None:
+            return
+
+        for term in weights:
+            postings = self.postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[term]
+                self._drop_term(term)
+
+        self.total_length -= self.lengths.pop(product_id)
+
+    def bulk_load(self, rows: Iterable[Tuple[int, Dict[str, object]]]):
+        """Upsert many products, sorting the vocabulary once at the end"""
+        self._bulk = True
+        try:
+            for product_id, fields in rows:
+                self.upsert(product_id, fields)
+        finally:
+            self._bulk = False
+            self.vocabulary = sorted(self.postings)
+
+    def _add_term(self, term: str):
+        if not self._bulk:
+            insort(self.vocabulary, term)
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in _deletes(term):
+                self.neighbours.setdefault(variant, set()).add(term)
+
+    def _drop_term(self, term: str):
+        position = bisect_left(self.vocabulary, term)
+        if position < len(self.vocabulary) and self.vocabulary[position] == term:
+            del self.vocabulary[position]
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in _deletes(term):
+                terms = self.neighbours.get(variant)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.neighbours[variant]
+
+    # ==================== QUERIES ====================
+
+    def _prefixed(self, prefix: str) -> List[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff", lo=start)
+        if end - start <= MAX_EXPANSIONS:
+            return self.vocabulary[start:end]
+        # Too many completions: keep the most common ones
+        return heapq.nlargest(MAX_EXPANSIONS, self.vocabulary[start:end], key=lambda term: len(self.postings[term]))
+
+    def _misspelt(self, token: str) -> Set[str]:
+        candidates = set(self.neighbours.get(token, ()))   # token is missing a character
+        for variant in _deletes(token):
+            if variant in self.postings:                   # token has an extra character
+                candidates.add(variant)
+            candidates.update(self.neighbours.get(variant, ()))  # substitution or swap
+        candidates.discard(token)
+        return set(heapq.nlargest(MAX_EXPANSIONS, candidates, key=lambda term: len(self.postings[term])))
+
+    def expand(self, token: str, prefix: bool) -> Dict[str, float]:
+        """Vocabulary terms a query token matches, with their score factor"""
+        matches: Dict[str, float] = {}
+        if token in self.postings:
+            matches[token] = 1.0
+
+        if prefix and len(token) >= MIN_PREFIX_LENGTH:
+            for term in self._prefixed(token):
+                matches.setdefault(term, PREFIX_FACTOR)
+
+        if not matches and len(token) >= MIN_TYPO_LENGTH:
+            for term in self._misspelt(token):
+                matches[term] = TYPO_FACTOR
+
+        return matches
+
+    def search(self, query: str, limit: int = 100) -> List[Tuple[int, float]]:
+        """
+        (product_id, score) of products matching every query term, best first
+
+        The last term also matches as a prefix, since it may still be being
+        typed. Each term contributes the BM25 score of its best matching
+        expansion.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.documents:
+            return []
+
+        count = len(self.documents)
+        average_length = self.total_length / count
+        per_token: List[Dict[int, float]] = []
+
+        for i, token in enumerate(tokens):
+            scores: Dict[int, float] = {}
+            for term, factor in self.expand(token, prefix=i == len(tokens) - 1).items():
+                postings = self.postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for product_id, frequency in postings.items():
+                    norm = K1 * (1 - B + B * self.lengths[product_id] / average_length)
+                    score = factor * idf * frequency * (K1 + 1) / (frequency + norm)
+                    if score > scores.get(product_id, 0.0):
+                        scores[product_id] = score
+            if not scores:
+                return []
+            per_token.append(scores)
+
+        # Intersect starting from the most selective term
+        per_token.sort(key=len)
+        totals = per_token[0]
+        for scores in per_token[1:]:
+            totals = {product_id: total + scores[product_id] for product_id, total in totals.items() if product_id in scores}
+            if not totals:
+                return []
+
+        # Ties go to the lower id so the order is stable across requests
+        return heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], -item[0]))
+
+
+class ProductSearchService:
+    """
+    Keeps active products in an InvertedIndex
+
+    The first search loads the whole catalog (built off the event loop and
+    swapped in). After that, every refresh_seconds only products whose
+    updated_at moved past the last seen value are re-indexed, so changes
+    made through other workers show up without rebuilding (re-scanning
+    HIGH_WATER_OVERLAP behind it for late commits). Product writes in this
+    worker are applied immediately through sync().
+    """
+
+    def __init__(self, refresh_seconds: int = 10, max_results: int = 1000):
+        self.index = InvertedIndex()
+        self.refresh_seconds = refresh_seconds
+        self.max_results = max_results
+        self._watermark: Optional[datetime] = None
+        self._loaded_monotonic: float = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_monotonic and time.monotonic() - self._loaded_monotonic < self.refresh_seconds
+
+    async def ensure_fresh(self, db):
+        """Load or catch up the index when it is older than refresh_seconds"""
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+
+            columns = (Product.id, Product.is_active, Product.updated_at, Product.name, Product.description,
+                       Product.brand, Product.part_number, Product.search_tags)
+
+            if self._watermark is None:
+                rows = (await db.execute(select(*columns).where(Product.is_active == True))).all()
+                index = InvertedIndex()
+                await run_in_threadpool(index.bulk_load, ((row.id, product_fields(row)) for row in rows))
+                self.index = index
+            else:
+                since = max(self._watermark, datetime.min + HIGH_WATER_OVERLAP) - HIGH_WATER_OVERLAP
+                rows = (await db.execute(select(*columns).where(Product.updated_at >= since))).all()
+                for row in rows:
+                    if row.is_active:
+                        self.index.upsert(row.id, product_fields(row))
+                    else:
+                        self.index.remove(row.id)
+
+            if rows:
+                latest = max(row.updated_at for row in rows)
+                self._watermark = max(self._watermark, latest) if self._watermark else latest
+            elif self._watermark is None:
+                self._watermark = datetime.min
+            self._loaded_monotonic = time.monotonic()
+
+    def sync(self, product: Product):
+        """Reflect a product write in this worker's index"""
+        if product.is_active:
+            self.index.upsert(product.id, product_fields(product))
+        else:
+            self.index.remove(product.id)
+
+    def remove(self, product_id: int):
+        self.index.remove(product_id)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        return self.index.search(query, limit or self.max_results)
+
+
+# Singleton instance
+product_search = ProductSearchService(
+    refresh_seconds=settings.PRODUCT_SEARCH_REFRESH,
+    max_results=settings.PRODUCT_SEARCH_MAX_RESULTS
+)
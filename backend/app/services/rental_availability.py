@@ -0,0 +1,392 @@
+"""Interval index of rental vehicle bookings"""
+import asyncio
+import math
+import time
+import calendar as calendar_module
+from bisect import bisect_left, bisect_right
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.core import database
+from app.models.rental import RentalBooking, RentalBookingStatus
+
+# Bookings that hold the vehicle; a new booking reserves it while pending
+BLOCKING_STATUSES = (
+    RentalBookingStatus.PENDING,
+    RentalBookingStatus.CONFIRMED,
+    RentalBookingStatus.ACTIVE,
+    RentalBookingStatus.OVERDUE,
+)
+
+# First key of the two-key advisory lock, so vehicle locks don't collide with other uses
+VEHICLE_LOCK_NAMESPACE = 0x52454E54  # "RENT"
+
+# In-process vehicle locks, shared by vehicle_id modulo this so their number stays fixed
+VEHICLE_LOCK_STRIPES = 64
+
+SECONDS_PER_DAY = 86400
+
+Interval = Tuple[float, float]
+
+
+class BookingConflictError(Exception):
+    """Raised when a vehicle is already held for an overlapping period"""
+
+    def __init__(self, vehicle_id: int, booking_ids: List[int]):
+        self.vehicle_id = vehicle_id
+        self.booking_ids = booking_ids
+        super().__init__(f"Vehicle {vehicle_id} is already booked for this period")
+
+
+def to_timestamp(value: Union[str, date, datetime]) -> float:
+    """
+    Epoch seconds for a booking time
+
+    Accepts the ISO strings stored on RentalBooking as well as date and
+    datetime values. Naive values are taken as UTC; a bare date is its midnight.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, dt_time.min)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def utc_naive(value: datetime) -> datetime:
+    """Aware datetimes converted to UTC with the offset dropped; naive ones are taken as UTC already"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def to_iso(value: datetime) -> str:
+    """
+    A booking time as stored on RentalBooking
+
+    pickup/return times are ISO strings compared as text, which only orders
+    them correctly when every value is naive UTC; use this for writes and
+    query bounds alike.
+    """
+    return utc_naive(value).isoformat()
+
+
+def day_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Midnight of start_date and of the day after end_date (end_date inclusive)"""
+    return datetime.combine(start_date, dt_time.min), datetime.combine(end_date + timedelta(days=1), dt_time.min)
+
+
+def date_window(start_date: date, end_date: date) -> Interval:
+    """Half-open interval covering the whole days start_date..end_date (inclusive)"""
+    start, end = day_bounds(start_date, end_date)
+    return to_timestamp(start), to_timestamp(end)
+
+
+def bitmap_runs(mask: int, days: int) -> List[int]:
+    """
+    Run-length encode a day bitmask as alternating run lengths
+
+    The first run is free days (possibly 0), then booked, then free, ...
+    e.g. 9 free, 3 booked, 19 free -> [9, 3, 19]
+    """
+    runs = []
+    state, length = 0, 0
+    for day in range(days):
+        booked = (mask >> day) & 1
+        if booked != state:
+            runs.append(length)
+            state, length = booked, 0
+        length += 1
+    runs.append(length)
+    return runs
+
+
+def booking_interval(booking: RentalBooking) -> Optional[Interval]:
+    try:
+        start = to_timestamp(booking.pickup_datetime)
+        end = to_timestamp(booking.return_datetime)
+    except (TypeError, ValueError):
+        return None
+    return (start, end) if end > start else None
+
+
+class VehicleCalendar:
+    """
+    One vehicle's bookings as sorted arrays
+
+    Intervals are half-open [start, end) and kept sorted by start, with a
+    running maximum of end times. A booking overlaps [start, end) when it
+    starts before `end` and finishes after `start`, so a binary search on
+    the starts plus the running maximum answers is_free() in O(log n)
+    without touching individual bookings.
+    """
+
+    __slots__ = ("starts", "ends", "booking_ids", "max_ends")
+
+    def __init__(self):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.booking_ids: List[int] = []
+        self.max_ends: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def insert(self, booking_id: int, start: float, end: float):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.booking_ids.insert(i, booking_id)
+        self.max_ends.insert(i, end)
+        self._refresh_max_ends(i)
+
+    def remove(self, booking_id: int) -> bool:
+        try:
+            i = self.booking_ids.index(booking_id)
+        except ValueError:
+            return False
+        del self.starts[i], self.ends[i], self.booking_ids[i], self.max_ends[i]
+        self._refresh_max_ends(i)
+        return True
+
+    def _refresh_max_ends(self, i: int):
+        running = self.max_ends[i - 1] if i > 0 else float("-inf")
+        for j in range(i, len(self.ends)):
+            running = max(running, self.ends[j])
+            self.max_ends[j] = running
+
+    def is_free(self, start: float, end: float) -> bool:
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.max_ends[i - 1] <= start
+
+    def booked_days(self, first_day: float, days: int) -> int:
+        """
+        Bitmask of the `days` days from first_day (a midnight timestamp)
+        touched by any booking; bit 0 is the first day
+        """
+        mask = 0
+        for _, start, end in self.overlapping(first_day, first_day + days * SECONDS_PER_DAY):
+            first = max(0, int((start - first_day) // SECONDS_PER_DAY))
+            last = min(days - 1, math.ceil((end - first_day) / SECONDS_PER_DAY) - 1)
+            if last >= first:
+                mask |= ((1 << (last - first + 1)) - 1) << first
+        return mask
+
+    def overlapping(self, start: float, end: float) -> List[Tuple[int, float, float]]:
+        """(booking_id, start, end) of bookings overlapping [start, end), by start"""
+        hits = []
+        j = bisect_left(self.starts, end) - 1
+        while j >= 0 and self.max_ends[j] > start:
+            if self.ends[j] > start:
+                hits.append((self.booking_ids[j], self.starts[j], self.ends[j]))
+            j -= 1
+        hits.reverse()
+        return hits
+
+
+class RentalAvailabilityIndex:
+    """Per-vehicle calendars plus a booking -> vehicle map for updates"""
+
+    def __init__(self):
+        self.calendars: Dict[int, VehicleCalendar] = {}
+        self.vehicle_of: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.vehicle_of)
+
+    def upsert(self, booking_id: int, vehicle_id: int, start: float, end: float):
+        self.remove(booking_id)
+        self.calendars.setdefault(vehicle_id, VehicleCalendar()).insert(booking_id, start, end)
+        self.vehicle_of[booking_id] = vehicle_id
+
+    def remove(self, booking_id: int):
+        vehicle_id = self.vehicle_of.pop(booking_id, None)
+        if vehicle_id is None:
+            return
+        calendar = self.calendars[vehicle_id]
+        calendar.remove(booking_id)
+        if not calendar:
+            del self.calendars[vehicle_id]
+
+    def is_free(self, vehicle_id: int, start: float, end: float, exclude_booking_id: Optional[int] = None) -> bool:
+        return not self.conflicts(vehicle_id, start, end, exclude_booking_id)
+
+    def conflicts(
+        self,
+        vehicle_id: int,
+        start: float,
+        end: float,
+        exclude_booking_id: Optional[int] = None
+    ) -> List[Tuple[int, float, float]]:
+        calendar = self.calendars.get(vehicle_id)
+        if calendar is None:
+            return []
+        if exclude_booking_id is None:
+            return [] if calendar.is_free(start, end) else calendar.overlapping(start, end)
+        return [hit for hit in calendar.overlapping(start, end) if hit[0] != exclude_booking_id]
+
+    def booked_days(self, vehicle_id: int, first_day: float, days: int) -> int:
+        calendar = self.calendars.get(vehicle_id)
+        return calendar.booked_days(first_day, days) if calendar is not None else 0
+
+    def busy_vehicles(self, start: float, end: float, vehicle_ids: Optional[Iterable[int]] = None) -> Set[int]:
+        """Vehicles with at least one booking overlapping [start, end)"""
+        if vehicle_ids is None:
+            items = self.calendars.items()
+        else:
+            items = ((vehicle_id, self.calendars.get(vehicle_id)) for vehicle_id in vehicle_ids)
+        return {
+            vehicle_id
+            for vehicle_id, calendar in items
+            if calendar is not None and not calendar.is_free(start, end)
+        }
+
+    def free_vehicles(self, vehicle_ids: Iterable[int], start: float, end: float) -> List[int]:
+        """The given vehicles that are free for the whole of [start, end), in input order"""
+        vehicle_ids = list(vehicle_ids)
+        busy = self.busy_vehicles(start, end, vehicle_ids)
+        return [vehicle_id for vehicle_id in vehicle_ids if vehicle_id not in busy]
+
+
+class RentalAvailabilityService:
+    """
+    Keeps holding rental bookings in a RentalAvailabilityIndex
+
+    Booking changes made through this worker are applied immediately via
+    sync(); the index is also rebuilt from the database every
+    refresh_seconds so changes made through other workers show up.
+
+    The index answers read-only availability questions. Writes go through
+    hold(), which re-checks against the database under a per-vehicle lock.
+    """
+
+    def __init__(self, refresh_seconds: int = 30):
+        self.index = RentalAvailabilityIndex()
+        self.refresh_seconds = refresh_seconds
+        self._loaded_monotonic: float = 0.0
+        self._lock = asyncio.Lock()
+        self._vehicle_locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(VEHICLE_LOCK_STRIPES)]
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_monotonic and time.monotonic() - self._loaded_monotonic < self.refresh_seconds
+
+    async def ensure_fresh(self, db):
+        """Rebuild from the database when the index is older than refresh_seconds"""
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                rows = (await db.execute(
+                    select(
+                        RentalBooking.id,
+                        RentalBooking.vehicle_id,
+                        RentalBooking.pickup_datetime,
+                        RentalBooking.return_datetime
+                    ).where(
+                        RentalBooking.status.in_(BLOCKING_STATUSES),
+                        RentalBooking.vehicle_id.isnot(None)
+                    )
+                )).all()
+                self._rebuild(rows)
+
+    def _rebuild(self, rows):
+        index = RentalAvailabilityIndex()
+        for booking_id, vehicle_id, pickup_datetime, return_datetime in rows:
+            try:
+                start, end = to_timestamp(pickup_datetime), to_timestamp(return_datetime)
+            except (TypeError, ValueError):
+                continue
+            if end > start:
+                index.upsert(booking_id, vehicle_id, start, end)
+        self.index = index
+        self._loaded_monotonic = time.monotonic()
+
+    def invalidate(self):
+        """Force a rebuild on the next ensure_fresh()"""
+        self._loaded_monotonic = 0.0
+
+    def sync(self, booking: RentalBooking):
+        """Reflect a booking's current status/vehicle/dates in the index"""
+        interval = booking_interval(booking)
+        if booking.status in BLOCKING_STATUSES and booking.vehicle_id is not None and interval:
+            self.index.upsert(booking.id, booking.vehicle_id, *interval)
+        else:
+            self.index.remove(booking.id)
+
+    def remove(self, booking_id: int):
+        self.index.remove(booking_id)
+
+    @asynccontextmanager
+    async def hold(
+        self,
+        db,
+        vehicle_id: int,
+        pickup_datetime: datetime,
+        return_datetime: datetime,
+        exclude_booking_id: Optional[int] = None
+    ):
+        """
+        Lock the vehicle, verify [pickup, return) is free, then run the block
+
+        On PostgreSQL this takes a transaction-scoped advisory lock on the
+        vehicle, so concurrent writers from any worker queue up behind each
+        other and each one sees the previous one's committed booking. The
+        caller must write and commit inside the block; the lock is released
+        by that commit (or the rollback on error). Other databases only get
+        the in-process lock.
+
+        Raises BookingConflictError when an overlapping booking holds the vehicle.
+        """
+        async with self._vehicle_locks[vehicle_id % VEHICLE_LOCK_STRIPES]:
+            if self._dialect() == "postgresql":
+                await db.execute(
+                    text("SELECT pg_advisory_xact_lock(:namespace, :vehicle_id)"),
+                    {"namespace": VEHICLE_LOCK_NAMESPACE, "vehicle_id": vehicle_id}
+                )
+
+            query = select(RentalBooking.id).where(
+                RentalBooking.vehicle_id == vehicle_id,
+                RentalBooking.status.in_(BLOCKING_STATUSES),
+                RentalBooking.pickup_datetime < to_iso(return_datetime),
+                RentalBooking.return_datetime > to_iso(pickup_datetime)
+            )
+            if exclude_booking_id is not None:
+                query = query.where(RentalBooking.id != exclude_booking_id)
+
+            conflicts = (await db.scalars(query)).all()
+            if conflicts:
+                await db.rollback()
+                raise BookingConflictError(vehicle_id, list(conflicts))
+
+            yield
+
+    @staticmethod
+    def _dialect() -> str:
+        bind = database.async_engine if database.async_engine is not None else database.engine
+        return bind.dialect.name
+
+    def is_free(self, vehicle_id: int, start: float, end: float, exclude_booking_id: Optional[int] = None) -> bool:
+        return self.index.is_free(vehicle_id, start, end, exclude_booking_id)
+
+    def conflicts(self, vehicle_id: int, start: float, end: float, exclude_booking_id: Optional[int] = None):
+        return self.index.conflicts(vehicle_id, start, end, exclude_booking_id)
+
+    def busy_vehicles(self, start: float, end: float, vehicle_ids: Optional[Iterable[int]] = None) -> Set[int]:
+        return self.index.busy_vehicles(start, end, vehicle_ids)
+
+    def month_calendar(self, vehicle_id: int, year: int, month: int) -> Tuple[int, int]:
+        """(days in month, bitmask of booked days) for one vehicle"""
+        days = calendar_module.monthrange(year, month)[1]
+        return days, self.index.booked_days(vehicle_id, to_timestamp(date(year, month, 1)), days)
+
+    def free_vehicles(self, vehicle_ids: Iterable[int], start: float, end: float) -> List[int]:
+        return self.index.free_vehicles(vehicle_ids, start, end)
+
+
+# Singleton instance
+rental_availability = RentalAvailabilityService(refresh_seconds=settings.RENTAL_INDEX_REFRESH)
@@ -0,0 +1,199 @@
+"""Tiered rental pricing and quote caching"""
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.rental import RentalVehicle
+
+HOURS_PER_DAY = 24
+
+# Day-based tiers: (breakdown key, length in days, RentalVehicle rate column)
+DAY_TIERS = (
+    ("months", 30, "monthly_rate"),
+    ("weeks", 7, "weekly_rate"),
+    ("days", 1, "daily_rate"),
+)
+
+# Deposit held on top of the rental price
+DEPOSIT_DAYS = 2
+
+
+# Quote fields stored on a RentalBooking under the same names
+BOOKING_QUOTE_FIELDS = ("duration_hours", "duration_days", "base_cost", "driver_cost", "delivery_cost", "total_cost")
+
+
+def booking_columns(quote: Dict) -> Dict:
+    """RentalBooking duration and cost columns for a quote"""
+    return {field: quote[field] for field in BOOKING_QUOTE_FIELDS}
+
+
+def rate_card(vehicle: RentalVehicle) -> Tuple:
+    """The vehicle's pricing columns; part of the cache key so rate changes miss the cache"""
+    return (
+        vehicle.hourly_rate,
+        vehicle.daily_rate,
+        vehicle.weekly_rate,
+        vehicle.monthly_rate,
+        vehicle.driver_fee_per_day,
+        vehicle.delivery_fee,
+    )
+
+
+class RentalPricingService:
+    """
+    Prices a rental window from a vehicle's hourly/daily/weekly/monthly rates
+
+    The base price is the cheapest mix of tiers covering the window: whole
+    days come from a small dynamic program over the day tiers (a week can
+    beat six daily rates, a month can beat three weeks), and the leftover
+    hours are either charged hourly or rounded up to another day, whichever
+    is cheaper. Driver fees are charged per started day, delivery once.
+
+    Quotes are memoized per (vehicle, rates, window, options) in a bounded
+    LRU with a TTL, so search pages quoting the same cars repeatedly only
+    compute each price once.
+    """
+
+    def __init__(self, cache_size: int = 10000, cache_ttl: int = 300):
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._quotes: "OrderedDict[Tuple, Tuple[Dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== PRICING ====================
+
+    @staticmethod
+    def cheapest_days(days: int, rates: Dict[str, Optional[float]]) -> Tuple[float, Dict[str, int]]:
+        """
+        Cheapest cost of covering `days` whole days with the day tiers
+
+        best[d] is the cheapest way to cover at least d days; a tier may
+        overshoot (a monthly rate for 26 days is fine if it is cheaper).
+        """
+        tiers = [
+            (key, length, rates[column])
+            for key, length, column in DAY_TIERS
+            if rates.get(column) is not None and rates[column] >= 0
+        ]
+
+        best = [0.0] + [math.inf] * days
+        choice: List[Optional[Tuple[str, int]]] = [None] * (days + 1)
+        for d in range(1, days + 1):
+            for key, length, rate in tiers:
+                cost = best[max(0, d - length)] + rate
+                if cost < best[d]:
+                    best[d] = cost
+                    choice[d] = (key, length)
+
+        breakdown = {key: 0 for key, _, _ in DAY_TIERS}
+        d = days
+        while d > 0:
+            key, length = choice[d]
+            breakdown[key] += 1
+            d = max(0, d - length)
+
+        return best[days], breakdown
+
+    def price(
+        self,
+        vehicle: RentalVehicle,
+        pickup_datetime: datetime,
+        return_datetime: datetime,
+        with_driver: bool = False,
+        delivery_requested: bool = False
+    ) -> Dict:
+        """Quote without the cache"""
+        hours = max(1, math.ceil((return_datetime - pickup_datetime).total_seconds() / 3600))
+        whole_days, extra_hours = divmod(hours, HOURS_PER_DAY)
+        billable_days = whole_days + (1 if extra_hours else 0)
+
+        rates = {
+            "hourly_rate": vehicle.hourly_rate,
+            "daily_rate": vehicle.daily_rate,
+            "weekly_rate": vehicle.weekly_rate,
+            "monthly_rate": vehicle.monthly_rate,
+        }
+
+        # Leftover hours rounded up to a full day...
+        base_cost, breakdown = self.cheapest_days(billable_days, rates)
+        breakdown["hours"] = 0
+
+        # ...or charged by the hour on top of the whole days
+        if extra_hours and vehicle.hourly_rate is not None:
+            day_cost, day_breakdown = self.cheapest_days(whole_days, rates)
+            hourly_cost = day_cost + extra_hours * vehicle.hourly_rate
+            if hourly_cost < base_cost:
+                base_cost, breakdown = hourly_cost, day_breakdown
+                breakdown["hours"] = extra_hours
+
+        driver_cost = (vehicle.driver_fee_per_day or 0.0) * billable_days if with_driver else 0.0
+        delivery_cost = (vehicle.delivery_fee or 0.0) if delivery_requested else 0.0
+        base_cost = round(base_cost, 2)
+
+        return {
+            "vehicle_id": vehicle.id,
+            "pickup_datetime": pickup_datetime,
+            "return_datetime": return_datetime,
+            "duration_hours": hours,
+            "duration_days": billable_days,
+            "breakdown": breakdown,
+            "base_cost": base_cost,
+            "driver_cost": round(driver_cost, 2),
+            "delivery_cost": round(delivery_cost, 2),
+            "total_cost": round(base_cost + driver_cost + delivery_cost, 2),
+            "security_deposit": round(vehicle.daily_rate * DEPOSIT_DAYS, 2),
+        }
+
+    # ==================== CACHED QUOTES ====================
+
+    def quote(
+        self,
+        vehicle: RentalVehicle,
+        pickup_datetime: datetime,
+        return_datetime: datetime,
+        with_driver: bool = False,
+        delivery_requested: bool = False
+    ) -> Dict:
+        key = (vehicle.id, rate_card(vehicle), pickup_datetime, return_datetime, with_driver, delivery_requested)
+        now = time.monotonic()
+
+        cached = self._quotes.get(key)
+        if cached and cached[1] > now:
+            self._quotes.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        result = self.price(vehicle, pickup_datetime, return_datetime, with_driver, delivery_requested)
+        self._quotes[key] = (result, now + self.cache_ttl)
+        self._quotes.move_to_end(key)
+        while len(self._quotes) > self.cache_size:
+            self._quotes.popitem(last=False)
+        return result
+
+    def quote_many(
+        self,
+        vehicles: List[RentalVehicle],
+        pickup_datetime: datetime,
+        return_datetime: datetime,
+        with_driver: bool = False,
+        delivery_requested: bool = False
+    ) -> List[Dict]:
+        return [
+            self.quote(vehicle, pickup_datetime, return_datetime, with_driver, delivery_requested)
+            for vehicle in vehicles
+        ]
+
+    def clear(self):
+        self._quotes.clear()
+
+
+# Singleton instance
+rental_pricing = RentalPricingService(
+    cache_size=settings.RENTAL_QUOTE_CACHE_SIZE,
+    cache_ttl=settings.RENTAL_QUOTE_CACHE_TTL
+)
@@ -0,0 +1,180 @@
+"""Background sweeps over rental bookings: overdue detection and late penalties"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.models.notification import Notification, NotificationType
+from app.models.rental import RentalBooking, RentalBookingStatus, RentalVehicle
+from app.services.rental_availability import rental_availability, utc_naive, to_iso
+from app.services.gps_ingest_service import gps_ingest_service
+from app.services.rental_pricing import rental_pricing
+
+logger = logging.getLogger(__name__)
+
+
+class RentalOverdueScheduler:
+    """
+    Moves ACTIVE bookings past their return time to OVERDUE
+
+    Every interval_seconds the scheduler walks the ACTIVE bookings whose
+    return_datetime (plus a grace period) has passed, in id order and
+    batch_size rows at a time, marks them OVERDUE, prices the late
+    penalty and queues an in-app notification for the customer in the
+    same transaction. It then refreshes the penalty of bookings that are
+    still OVERDUE, since it grows with lateness.
+
+    Each batch is selected FOR UPDATE SKIP LOCKED, so several workers can
+    run the scheduler at once without touching the same rows. Re-running
+    a sweep is harmless: only ACTIVE rows are transitioned (and notified),
+    and penalties are recomputed from scratch rather than accumulated.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 60.0,
+        grace_minutes: int = 60,
+        late_fee_multiplier: float = 1.5,
+        batch_size: int = 500
+    ):
+        self.interval_seconds = interval_seconds
+        self.grace = timedelta(minutes=grace_minutes)
+        self.late_fee_multiplier = late_fee_multiplier
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async for db in get_async_db():
+                    result = await self.sweep(db)
+                    if result["marked_overdue"]:
+                        logger.info(f"Marked {result['marked_overdue']} rental booking(s) overdue")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Rental overdue sweep failed: {str(e)}")
+
+            await asyncio.sleep(self.interval_seconds)
+
+    # ==================== SWEEPS ====================
+
+    def penalty_for(self, booking: RentalBooking, vehicle: Optional[RentalVehicle], now: datetime) -> float:
+        """
+        Late penalty for returning at `now`
+
+        The late window (after the grace period) is priced like a rental
+        of the same vehicle, cheapest tiers first, times late_fee_multiplier.
+        """
+        if vehicle is None:
+            return 0.0
+        try:
+            due = utc_naive(datetime.fromisoformat(booking.return_datetime))
+        except (TypeError, ValueError):
+            return 0.0
+        if now <= due + self.grace:
+            return 0.0
+
+        late = rental_pricing.price(vehicle, due, now)
+        return round(late["base_cost"] * self.late_fee_multiplier, 2)
+
+    async def sweep(self, db, now: Optional[datetime] = None) -> Dict:
+        """Run both passes once; returns counts"""
+        now = utc_naive(now) if now else datetime.utcnow()
+        marked = await self._mark_overdue(db, now)
+        repriced = await self._refresh_penalties(db, now)
+        return {"marked_overdue": marked, "penalties_updated": repriced}
+
+    async def _batches(self, db, status: RentalBookingStatus, due_before: Optional[str] = None):
+        """Yield locked (booking, vehicle) batches in id order; the caller commits each batch"""
+        last_id = 0
+        while True:
+            query = (
+                select(RentalBooking, RentalVehicle)
+                .outerjoin(RentalVehicle, RentalVehicle.id == RentalBooking.vehicle_id)
+                .where(RentalBooking.status == status, RentalBooking.id > last_id)
+                .order_by(RentalBooking.id)
+                .limit(self.batch_size)
+                .with_for_update(of=RentalBooking, skip_locked=True)
+            )
+            if due_before is not None:
+                query = query.where(RentalBooking.return_datetime < due_before)
+
+            rows = (await db.execute(query)).all()
+            if not rows:
+                return
+
+            yield rows
+            last_id = rows[-1][0].id
+
+            if len(rows) < self.batch_size:
+                return
+
+    async def _mark_overdue(self, db, now: datetime) -> int:
+        marked = 0
+        due_before = to_iso(now - self.grace)
+
+        async for rows in self._batches(db, RentalBookingStatus.ACTIVE, due_before):
+            notifications: List[Notification] = []
+            for booking, vehicle in rows:
+                booking.status = RentalBookingStatus.OVERDUE
+                booking.late_return_penalty = self.penalty_for(booking, vehicle, now)
+                notifications.append(Notification(
+                    user_id=booking.customer_id,
+                    type=NotificationType.RENTAL_OVERDUE,
+                    title="Rental overdue",
+                    message=(
+                        f"Booking {booking.booking_reference} was due back at {booking.return_datetime}. "
+                        f"Late charges apply until the vehicle is returned."
+                    ),
+                    data={"booking_id": booking.id, "vehicle_id": booking.vehicle_id},
+                    priority="high"
+                ))
+
+            db.add_all(notifications)
+            await db.commit()
+
+            for booking, vehicle in rows:
+                rental_availability.sync(booking)
+                if vehicle is not None and vehicle.gps_device_id:
+                    gps_ingest_service.invalidate(vehicle.gps_device_id)
+            marked += len(rows)
+
+        return marked
+
+    async def _refresh_penalties(self, db, now: datetime) -> int:
+        updated = 0
+
+        async for rows in self._batches(db, RentalBookingStatus.OVERDUE):
+            for booking, vehicle in rows:
+                penalty = self.penalty_for(booking, vehicle, now)
+                if penalty != booking.late_return_penalty:
+                    booking.late_return_penalty = penalty
+                    updated += 1
+            await db.commit()
+
+        return updated
+
+
+# Singleton instance
+rental_overdue_scheduler = RentalOverdueScheduler(
+    interval_seconds=settings.RENTAL_OVERDUE_INTERVAL,
+    grace_minutes=settings.RENTAL_OVERDUE_GRACE_MINUTES,
+    late_fee_multiplier=settings.RENTAL_LATE_FEE_MULTIPLIER,
+    batch_size=settings.RENTAL_OVERDUE_BATCH_SIZE
+)
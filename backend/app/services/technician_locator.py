@@ -0,0 +1,204 @@
+"""Spatial index of available technicians"""
+import asyncio
+import math
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.maintenance import Technician
+from app.services.eta_service import haversine_km
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def location_of(technician: Technician) -> Optional[Tuple[float, float]]:
+    """(lat, lng) from Technician.current_location, or None when unset/invalid"""
+    location = technician.current_location or {}
+    try:
+        return float(location["lat"]), float(location["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class GeoGridIndex:
+    """
+    Uniform lat/lng grid of point items
+
+    Each item lives in one cell, so updates are O(1). Queries only look at
+    the cells overlapping the search area and measure exact haversine
+    distances on those candidates.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.01):
+        self.cell_size_deg = cell_size_deg
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.positions: Dict[int, Tuple[float, float, Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_size_deg)), int(math.floor(lng / self.cell_size_deg))
+
+    def upsert(self, item_id: int, lat: float, lng: float):
+        cell = self._cell(lat, lng)
+        previous = self.positions.get(item_id)
+        if previous and previous[2] != cell:
+            self._discard(item_id, previous[2])
+
+        self.cells.setdefault(cell, set()).add(item_id)
+        self.positions[item_id] = (lat, lng, cell)
+
+    def remove(self, item_id: int):
+        previous = self.positions.pop(item_id, None)
+        if previous:
+            self._discard(item_id, previous[2])
+
+    def _discard(self, item_id: int, cell: Tuple[int, int]):
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(item_id)
+            if not members:
+                del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.positions.clear()
+
+    def _candidates(self, center: Tuple[int, int], lat_cells: int, lng_cells: int) -> List[int]:
+        ci, cj = center
+        candidates = []
+
+        # Scan whichever is smaller: the cell window or the occupied cells
+        if (2 * lat_cells + 1) * (2 * lng_cells + 1) <= len(self.cells):
+            for i in range(ci - lat_cells, ci + lat_cells + 1):
+                for j in range(cj - lng_cells, cj + lng_cells + 1):
+                    members = self.cells.get((i, j))
+                    if members:
+                        candidates.extend(members)
+        else:
+            for (i, j), members in self.cells.items():
+                if abs(i - ci) <= lat_cells and abs(j - cj) <= lng_cells:
+                    candidates.extend(members)
+
+        return candidates
+
+    def _measure(self, lat: float, lng: float, candidates: List[int]) -> List[Tuple[int, float]]:
+        if not candidates:
+            return []
+        coords = np.array([self.positions[item_id][:2] for item_id in candidates], dtype=np.float64)
+        distances = haversine_km(lat, lng, coords[:, 0], coords[:, 1])
+        return list(zip(candidates, distances.tolist()))
+
+    def _cell_span(self, lat: float, radius_km: float) -> Tuple[int, int]:
+        lat_deg = radius_km / KM_PER_DEGREE_LAT
+        lng_deg = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(min(abs(lat) + lat_deg, 89.9))), 1e-6))
+        return int(math.ceil(lat_deg / self.cell_size_deg)), int(math.ceil(lng_deg / self.cell_size_deg))
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """(item_id, distance_km) within radius_km, nearest first"""
+        lat_cells, lng_cells = self._cell_span(lat, radius_km)
+        hits = [
+            (item_id, distance)
+            for item_id, distance in self._measure(lat, lng, self._candidates(self._cell(lat, lng), lat_cells, lng_cells))
+            if distance <= radius_km
+        ]
+        hits.sort(key=lambda hit: hit[1])
+        return hits
+
+    def nearest(self, lat: float, lng: float, k: int, max_radius_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        The k closest items as (item_id, distance_km), nearest first
+
+        Searches a growing radius, doubling until k items are found within
+        it (or max_radius_km / the whole index is covered).
+        """
+        if k <= 0 or not self.positions:
+            return []
+
+        radius_km = self.cell_size_deg * KM_PER_DEGREE_LAT
+        while True:
+            if max_radius_km is not None:
+                radius_km = min(radius_km, max_radius_km)
+
+            hits = self.within_radius(lat, lng, radius_km)
+            exhausted = len(hits) == len(self.positions)
+            at_limit = max_radius_km is not None and radius_km >= max_radius_km
+
+            if len(hits) >= k or exhausted or at_limit:
+                return hits[:k]
+
+            radius_km *= 2
+            if radius_km > math.pi * 6371.0:
+                return self.within_radius(lat, lng, radius_km)[:k]
+
+
+class TechnicianLocator:
+    """
+    Keeps available, verified technicians in a GeoGridIndex
+
+    Location pings and availability changes update the index immediately.
+    The index is also rebuilt from the technicians table every refresh_seconds,
+    so each worker picks up changes made through other workers.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.01, refresh_seconds: int = 30):
+        self.index = GeoGridIndex(cell_size_deg)
+        self.refresh_seconds = refresh_seconds
+        self._loaded_monotonic: float = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_monotonic and time.monotonic() - self._loaded_monotonic < self.refresh_seconds
+
+    async def ensure_fresh(self, db):
+        """Rebuild from the database when the index is older than refresh_seconds"""
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                rows = (await db.execute(
+                    select(Technician.id, Technician.current_location).where(
+                        Technician.is_available == True,
+                        Technician.is_verified == True,
+                        Technician.current_location.isnot(None)
+                    )
+                )).all()
+                self._rebuild(rows)
+
+    def _rebuild(self, rows):
+        index = GeoGridIndex(self.index.cell_size_deg)
+        for technician_id, current_location in rows:
+            try:
+                index.upsert(technician_id, float(current_location["lat"]), float(current_location["lng"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        self.index = index
+        self._loaded_monotonic = time.monotonic()
+
+    def sync(self, technician: Technician):
+        """Reflect a technician's current availability/location in the index"""
+        location = location_of(technician)
+        if technician.is_available and technician.is_verified and location:
+            self.index.upsert(technician.id, *location)
+        else:
+            self.index.remove(technician.id)
+
+    def remove(self, technician_id: int):
+        self.index.remove(technician_id)
+
+    def nearest(self, lat: float, lng: float, k: int = 10, max_radius_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        return self.index.nearest(lat, lng, k, max_radius_km)
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        return self.index.within_radius(lat, lng, radius_km)
+
+
+# Singleton instance
+technician_locator = TechnicianLocator(
+    cell_size_deg=settings.TECHNICIAN_INDEX_CELL_DEG,
+    refresh_seconds=settings.TECHNICIAN_INDEX_REFRESH
+)
@@ -0,0 +1,193 @@
+"""Fan-out of tracking updates to WebSocket clients across workers"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TrackingSubscriber:
+    """
+    One WebSocket plus its outbound queue
+
+    The queue is bounded: when a client falls behind, the oldest pending
+    update is dropped so the newest position always gets through.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    def offer(self, payload: str):
+        """Queue an encoded message without ever blocking the publisher"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(payload)
+
+
+class TrackingBroadcaster:
+    """
+    Delivers booking updates to every connected tracker
+
+    With a Redis client, publish() sends each update once to a shared
+    channel and every worker's listener hands it to its own sockets.
+    Without one, updates are delivered in-process (single worker).
+    Each socket is drained by its own writer task, so a slow client only
+    delays itself, and sockets that fail or time out are evicted.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        channel: str = "zip:tracking:updates",
+        queue_size: int = 32,
+        send_timeout: float = 5.0
+    ):
+        self.redis = redis_client
+        self.channel = channel
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.subscribers: Dict[int, Set[TrackingSubscriber]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        """Start the channel listener (no-op in-process or when already running)"""
+        if self.redis is None or (self._listener and not self._listener.done()):
+            return
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop the listener and close every local socket"""
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+        for booking_id in list(self.subscribers):
+            for subscriber in list(self.subscribers.get(booking_id, ())):
+                await self._close(booking_id, subscriber)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    booking_id, payload = data.split("|", 1)
+                    self.deliver_local(int(booking_id), payload)
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.error(f"Tracking channel listener failed, resubscribing: {str(e)}")
+                await pubsub.close()
+                await asyncio.sleep(1)
+
+    # ==================== CONNECTIONS ====================
+
+    async def connect(self, booking_id: int, websocket: WebSocket) -> TrackingSubscriber:
+        """Accept a socket and start its writer task"""
+        await websocket.accept()
+        await self.start()
+
+        subscriber = TrackingSubscriber(websocket, self.queue_size)
+        subscriber.writer = asyncio.create_task(self._write(booking_id, subscriber))
+        self.subscribers.setdefault(booking_id, set()).add(subscriber)
+        return subscriber
+
+    def disconnect(self, booking_id: int, subscriber: TrackingSubscriber):
+        """Forget a socket and stop its writer"""
+        subscribers = self.subscribers.get(booking_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[booking_id]
+
+        if subscriber.writer and subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+
+    async def _close(self, booking_id: int, subscriber: TrackingSubscriber):
+        self.disconnect(booking_id, subscriber)
+        try:
+            await subscriber.websocket.close()
+        except Exception:
+            pass  # Already gone
+
+    async def _write(self, booking_id: int, subscriber: TrackingSubscriber):
+        try:
+            while True:
+                payload = await subscriber.queue.get()
+                await asyncio.wait_for(subscriber.websocket.send_text(payload), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Dead or stalled client
+            await self._close(booking_id, subscriber)
+
+    def connection_count(self, booking_id: Optional[int] = None) -> int:
+        """Sockets connected to this worker, for one booking or overall"""
+        if booking_id is not None:
+            return len(self.subscribers.get(booking_id, ()))
+        return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+    # ==================== DELIVERY ====================
+
+    def send(self, subscriber: TrackingSubscriber, message: dict):
+        """Queue a message for a single socket"""
+        subscriber.offer(json.dumps(message, default=str))
+
+    async def publish(self, booking_id: int, message: dict):
+        """Send an update to every tracker of a booking, on every worker"""
+        payload = json.dumps(message, default=str)
+
+        if self.redis is None:
+            self.deliver_local(booking_id, payload)
+            return
+
+        await self.start()
+        await self.redis.publish(self.channel, f"{booking_id}|{payload}")
+
+    def deliver_local(self, booking_id: int, payload: str):
+        """Queue an already-encoded update for this worker's sockets"""
+        for subscriber in list(self.subscribers.get(booking_id, ())):
+            subscriber.offer(payload)
+
+
+def create_tracking_broadcaster() -> TrackingBroadcaster:
+    """Build the broadcaster matching TRACKING_BACKEND"""
+    redis_client = None
+
+    if settings.TRACKING_BACKEND.lower() == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("REDIS_URL must be set when TRACKING_BACKEND=redis")
+
+        import redis.asyncio
+
+        redis_client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+
+    return TrackingBroadcaster(
+        redis_client=redis_client,
+        queue_size=settings.TRACKING_WS_QUEUE_SIZE,
+        send_timeout=settings.TRACKING_WS_SEND_TIMEOUT
+    )
+
+
+# Singleton instance
+tracking_broadcaster = create_tracking_broadcaster()
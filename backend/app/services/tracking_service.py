@@ -1,19 +1,23 @@
 """Real-time tracking service for technicians and vehicles"""
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
-import json
+import time
+
+from app.services.eta_service import eta_service
+from app.services.location_buffer import Point, serialize_point
+from app.services.tracking_store import TrackingStore, create_tracking_store
+from app.services.trip_archive import trip_archive
 
 
 class TrackingService:
     """Service for managing real-time location tracking"""
 
-    def __init__(self):
-        # In-memory storage for active tracking sessions
-        # In production, use Redis for distributed systems
-        self.active_sessions: Dict[str, Dict] = {}
-        self.location_history: Dict[str, list] = {}
+    def __init__(self, store: Optional[TrackingStore] = None):
+        # Sessions and history live in the configured store so every worker
+        # sees the same state (see TRACKING_BACKEND)
+        self.store = store or create_tracking_store()
 
-    def start_tracking(self, booking_id: int, tracker_type: str = "technician") -> Dict:
+    async def start_tracking(self, booking_id: int, tracker_type: str = "technician") -> Dict:
         """
         Start tracking session for a booking
 
@@ -26,22 +30,20 @@ class TrackingService:
         """
         session_key = f"{tracker_type}_{booking_id}"
 
-        self.active_sessions[session_key] = {
+        await self.store.save_session(session_key, {
             "booking_id": booking_id,
             "tracker_type": tracker_type,
             "started_at": datetime.utcnow().isoformat(),
             "current_location": None,
             "eta_minutes": None
-        }
-
-        self.location_history[session_key] = []
+        })
 
         return {
             "session_key": session_key,
             "status": "tracking_started"
         }
 
-    def update_location(
+    async def update_location(
         self,
         booking_id: int,
         latitude: float,
@@ -66,43 +68,70 @@ class TrackingService:
         """
         session_key = f"{tracker_type}_{booking_id}"
 
-        if session_key not in self.active_sessions:
+        if not await self.store.session_exists(session_key):
             # Auto-start tracking if not exists
-            self.start_tracking(booking_id, tracker_type)
-
-        location_data = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "timestamp": datetime.utcnow().isoformat(),
-            "heading": heading,
-            "speed": speed
-        }
+            await self.start_tracking(booking_id, tracker_type)
 
-        # Update current location
-        self.active_sessions[session_key]["current_location"] = location_data
+        recorded_at = time.time()
 
-        # Add to history
-        if session_key not in self.location_history:
-            self.location_history[session_key] = []
+        # Append to the bounded history; the newest point is the current location
+        await self.store.append_location(session_key, latitude, longitude, heading, speed, recorded_at)
 
-        self.location_history[session_key].append(location_data)
+        point = (
+            latitude,
+            longitude,
+            float("nan") if heading is None else heading,
+            float("nan") if speed is None else speed,
+            recorded_at
+        )
+        # The history evicts old points, so the archive takes its copy here
+        trip_archive.record({booking_id: [point]}, tracker_type)
 
-        # Keep only last 100 locations
-        if len(self.location_history[session_key]) > 100:
-            self.location_history[session_key] = self.location_history[session_key][-100:]
+        return serialize_point(*point)
+
+    async def record_points(self, points_by_booking: Dict[int, List[Point]], tracker_type: str = "vehicle") -> Dict[int, List[Dict]]:
+        """
+        Store batches of points for many bookings in one backend write
+
+        Points are (latitude, longitude, heading, speed, recorded_at) tuples
+        in chronological order; NaN marks a missing heading/speed. Sessions
+        are auto-started like update_location. Returns the serialized points
+        per booking, for broadcasting.
+        """
+        session_keys = {booking_id: f"{tracker_type}_{booking_id}" for booking_id in points_by_booking}
 
-        return location_data
+        existing = await self.store.existing_sessions(session_keys.values())
+        for booking_id, session_key in session_keys.items():
+            if session_key not in existing:
+                await self.start_tracking(booking_id, tracker_type)
 
-    def get_current_location(self, booking_id: int, tracker_type: str = "technician") -> Optional[Dict]:
+        await self.store.append_locations({
+            session_keys[booking_id]: points
+            for booking_id, points in points_by_booking.items()
+        })
+        trip_archive.record(points_by_booking, tracker_type)
+
+        return {
+            booking_id: [serialize_point(*point) for point in points]
+            for booking_id, points in points_by_booking.items()
+        }
+
+    async def get_current_location(self, booking_id: int, tracker_type: str = "technician") -> Optional[Dict]:
         """Get current location for a booking"""
         session_key = f"{tracker_type}_{booking_id}"
 
-        if session_key in self.active_sessions:
-            return self.active_sessions[session_key].get("current_location")
+        session = await self.store.get_session(session_key)
+        if session:
+            return session.get("current_location")
 
         return None
 
-    def get_location_history(
+    async def get_session(self, booking_id: int, tracker_type: str = "technician") -> Dict:
+        """Get session info (started_at, eta_minutes, ...) or an empty dict"""
+        session_key = f"{tracker_type}_{booking_id}"
+        return await self.store.get_session(session_key) or {}
+
+    async def get_location_history(
         self,
         booking_id: int,
         tracker_type: str = "technician",
@@ -111,10 +140,21 @@ class TrackingService:
         """Get location history for a booking"""
         session_key = f"{tracker_type}_{booking_id}"
 
-        if session_key in self.location_history:
-            return self.location_history[session_key][-limit:]
+        return await self.store.get_history(session_key, limit)
+
+    async def get_history_points(
+        self,
+        booking_id: int,
+        tracker_type: str = "technician",
+        limit: int = 100
+    ) -> List[Point]:
+        """Raw (lat, lng, heading, speed, recorded_at) history tuples, oldest first"""
+        session_key = f"{tracker_type}_{booking_id}"
+        return await self.store.get_points(session_key, limit)
 
-        return []
+    async def estimate_speed(self, booking_id: int, tracker_type: str = "technician") -> float:
+        """Speed in km/h smoothed over the recorded trail"""
+        return eta_service.estimate_speed_kmh(await self.get_history_points(booking_id, tracker_type))
 
     def calculate_eta(
         self,
@@ -125,64 +165,39 @@ class TrackingService:
         average_speed_kmh: float = 40.0
     ) -> Dict:
         """
-        Calculate ETA (simple haversine distance calculation)
+        Calculate ETA (haversine distance at the given average speed)
 
         For production, integrate with Google Maps Distance Matrix API
         """
-        from math import radians, sin, cos, sqrt, atan2
-
-        # Haversine formula
-        R = 6371  # Earth radius in km
-
-        lat1, lon1 = radians(current_lat), radians(current_lng)
-        lat2, lon2 = radians(destination_lat), radians(destination_lng)
-
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
+        return eta_service.calculate_eta(
+            current_lat, current_lng, destination_lat, destination_lng, average_speed_kmh
+        )
 
-        distance_km = R * c
-
-        # Calculate ETA
-        if average_speed_kmh > 0:
-            eta_hours = distance_km / average_speed_kmh
-            eta_minutes = int(eta_hours * 60)
-        else:
-            eta_minutes = None
-
-        return {
-            "distance_km": round(distance_km, 2),
-            "eta_minutes": eta_minutes,
-            "calculated_at": datetime.utcnow().isoformat()
-        }
-
-    def update_eta(self, booking_id: int, eta_minutes: int, tracker_type: str = "technician"):
+    async def update_eta(self, booking_id: int, eta_minutes: int, tracker_type: str = "technician"):
         """Update ETA for a booking"""
         session_key = f"{tracker_type}_{booking_id}"
 
-        if session_key in self.active_sessions:
-            self.active_sessions[session_key]["eta_minutes"] = eta_minutes
-            self.active_sessions[session_key]["eta_updated_at"] = datetime.utcnow().isoformat()
+        await self.store.update_session(session_key, {
+            "eta_minutes": eta_minutes,
+            "eta_updated_at": datetime.utcnow().isoformat()
+        })
 
-    def stop_tracking(self, booking_id: int, tracker_type: str = "technician"):
+    async def stop_tracking(self, booking_id: int, tracker_type: str = "technician"):
         """Stop tracking session"""
         session_key = f"{tracker_type}_{booking_id}"
 
-        if session_key in self.active_sessions:
-            del self.active_sessions[session_key]
+        await self.store.delete_session(session_key)
 
         # Keep history for analytics (could move to database)
 
-    def get_active_sessions(self) -> Dict:
+    async def get_active_sessions(self) -> Dict:
         """Get all active tracking sessions (for monitoring)"""
-        return self.active_sessions
+        return await self.store.list_sessions()
 
-    def is_tracking_active(self, booking_id: int, tracker_type: str = "technician") -> bool:
+    async def is_tracking_active(self, booking_id: int, tracker_type: str = "technician") -> bool:
         """Check if tracking is active for a booking"""
         session_key = f"{tracker_type}_{booking_id}"
-        return session_key in self.active_sessions
+        return await self.store.session_exists(session_key)
 
 
 # Singleton instance
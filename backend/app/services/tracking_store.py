@@ -0,0 +1,393 @@
+"""State backends for real-time tracking sessions"""
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.services.location_buffer import LocationRingBuffer, Point, pack_point, unpack_point, serialize_point
+
+logger = logging.getLogger(__name__)
+
+
+class TrackingStore(ABC):
+    """
+    Storage interface used by TrackingService
+
+    A session is a flat dict (booking_id, tracker_type, started_at,
+    eta_minutes, ...). Each session also owns a bounded, append-only
+    location history whose newest point is reported as current_location,
+    and named state values that consumers of the pings (the odometer's
+    measuring anchor) share between workers. Writes are O(1); history reads
+    return the newest `limit` points in chronological order. Every method
+    is a coroutine, so network-backed stores never block the event loop.
+    """
+
+    def __init__(self, history_limit: int = 100):
+        self.history_limit = history_limit
+
+    @abstractmethod
+    async def save_session(self, session_key: str, session: Dict[str, Any]) -> None:
+        """Create or replace a session and reset its history"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_session(self, session_key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_session(self, session_key: str, fields: Dict[str, Any]) -> None:
+        """Merge fields into an existing session"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_session(self, session_key: str) -> None:
+        """End a session; its history is kept for later reads"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def session_exists(self, session_key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_sessions(self) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def append_location(
+        self,
+        session_key: str,
+        latitude: float,
+        longitude: float,
+        heading: Optional[float],
+        speed: Optional[float],
+        recorded_at: float
+    ) -> None:
+        """Push a point (recorded_at in epoch seconds) onto the session's history"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_history(self, session_key: str, limit: int = 50) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_points(self, session_key: str, limit: int = 50) -> List[Point]:
+        """Newest `limit` points as raw (lat, lng, heading, speed, recorded_at) tuples"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_state(self, session_key: str, name: str) -> Optional[Any]:
+        """JSON value stored under name for the session, None if unset"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def compare_and_set_state(
+        self,
+        session_key: str,
+        name: str,
+        expected: Optional[Any],
+        value: Optional[Any]
+    ) -> bool:
+        """
+        Replace the value under name only if it still equals expected, as
+        one atomic step across workers; a value of None deletes it.
+        Returns False when another writer got there first.
+        """
+        raise NotImplementedError
+
+    async def existing_sessions(self, session_keys: Iterable[str]) -> Set[str]:
+        """Subset of session_keys that are active"""
+        return {key for key in session_keys if await self.session_exists(key)}
+
+    async def append_locations(self, points_by_session: Dict[str, List[Point]]) -> None:
+        """Append many points (chronological per session) in one write"""
+        for session_key, points in points_by_session.items():
+            for point in points:
+                await self.append_location(session_key, *point)
+
+
+class InMemoryTrackingStore(TrackingStore):
+    """Process-local store; only correct with a single worker"""
+
+    def __init__(self, history_limit: int = 100):
+        super().__init__(history_limit)
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.history: Dict[str, LocationRingBuffer] = {}
+        self.state: Dict[str, Dict[str, str]] = {}
+
+    def _with_location(self, session_key: str, session: Dict[str, Any]) -> Dict[str, Any]:
+        buffer = self.history.get(session_key)
+        latest = buffer.latest() if buffer is not None else None
+        return {**session, "current_location": serialize_point(*latest) if latest else None}
+
+    async def save_session(self, session_key: str, session: Dict[str, Any]) -> None:
+        self.sessions[session_key] = {k: v for k, v in session.items() if k != "current_location"}
+        self.history[session_key] = LocationRingBuffer(self.history_limit)
+        self.state.pop(session_key, None)
+
+    async def get_session(self, session_key: str) -> Optional[Dict[str, Any]]:
+        session = self.sessions.get(session_key)
+        return self._with_location(session_key, session) if session is not None else None
+
+    async def update_session(self, session_key: str, fields: Dict[str, Any]) -> None:
+        if session_key in self.sessions:
+            self.sessions[session_key].update(fields)
+
+    async def delete_session(self, session_key: str) -> None:
+        self.sessions.pop(session_key, None)
+
+    async def session_exists(self, session_key: str) -> bool:
+        return session_key in self.sessions
+
+    async def list_sessions(self) -> Dict[str, Dict[str, Any]]:
+        return {key: self._with_location(key, session) for key, session in self.sessions.items()}
+
+    async def append_location(
+        self,
+        session_key: str,
+        latitude: float,
+        longitude: float,
+        heading: Optional[float],
+        speed: Optional[float],
+        recorded_at: float
+    ) -> None:
+        buffer = self.history.get(session_key)
+        if buffer is None:
+            buffer = self.history[session_key] = LocationRingBuffer(self.history_limit)
+        buffer.append(latitude, longitude, heading, speed, recorded_at)
+
+    async def get_history(self, session_key: str, limit: int = 50) -> List[Dict[str, Any]]:
+        buffer = self.history.get(session_key)
+        if buffer is None:
+            return []
+        return buffer.to_dicts(limit)
+
+    async def get_points(self, session_key: str, limit: int = 50) -> List[Point]:
+        buffer = self.history.get(session_key)
+        if buffer is None:
+            return []
+        return buffer.points(limit)
+
+    async def get_state(self, session_key: str, name: str) -> Optional[Any]:
+        raw = self.state.get(session_key, {}).get(name)
+        return json.loads(raw) if raw is not None else None
+
+    async def compare_and_set_state(
+        self,
+        session_key: str,
+        name: str,
+        expected: Optional[Any],
+        value: Optional[Any]
+    ) -> bool:
+        # get_state never yields to the event loop, so the read and write are atomic
+        if await self.get_state(session_key, name) != expected:
+            return False
+        values = self.state.setdefault(session_key, {})
+        if value is None:
+            values.pop(name, None)
+        else:
+            values[name] = json.dumps(value)
+        return True
+
+    def get_history_buffer(self, session_key: str) -> Optional[LocationRingBuffer]:
+        """Raw ring buffer, for callers that work on the numeric columns directly"""
+        return self.history.get(session_key)
+
+
+class RedisTrackingStore(TrackingStore):
+    """
+    Store shared by every worker through a Redis-protocol server
+
+    Sessions are hashes with JSON-encoded fields, history is a list of
+    packed 40-byte points capped with RPUSH + LTRIM, state is a hash of
+    JSON values updated under WATCH/MULTI, and a set indexes the active
+    sessions. Calls go through an asyncio client (redis.asyncio or
+    fakeredis.FakeAsyncRedis for local runs) so no round trip blocks the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        client,
+        history_limit: int = 100,
+        history_ttl: int = 86400,
+        prefix: str = "zip:tracking"
+    ):
+        super().__init__(history_limit)
+        self.client = client
+        self.history_ttl = history_ttl
+        self.prefix = prefix
+        self.index_key = f"{prefix}:sessions"
+
+    def _session_key(self, session_key: str) -> str:
+        return f"{self.prefix}:session:{session_key}"
+
+    def _history_key(self, session_key: str) -> str:
+        return f"{self.prefix}:history:{session_key}"
+
+    def _state_key(self, session_key: str) -> str:
+        return f"{self.prefix}:state:{session_key}"
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+        return {name: json.dumps(value) for name, value in fields.items()}
+
+    @staticmethod
+    def _decode(raw: Dict) -> Dict[str, Any]:
+        return {
+            (name.decode() if isinstance(name, bytes) else name): json.loads(value)
+            for name, value in raw.items()
+        }
+
+    async def save_session(self, session_key: str, session: Dict[str, Any]) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._session_key(session_key), self._history_key(session_key), self._state_key(session_key))
+        pipe.hset(
+            self._session_key(session_key),
+            mapping=self._encode({k: v for k, v in session.items() if k != "current_location"})
+        )
+        pipe.sadd(self.index_key, session_key)
+        await pipe.execute()
+
+    def _with_location(self, raw: Dict, latest: Optional[bytes]) -> Dict[str, Any]:
+        session = self._decode(raw)
+        session["current_location"] = serialize_point(*unpack_point(latest)) if latest else None
+        return session
+
+    async def get_session(self, session_key: str) -> Optional[Dict[str, Any]]:
+        pipe = self.client.pipeline()
+        pipe.hgetall(self._session_key(session_key))
+        pipe.lindex(self._history_key(session_key), -1)
+        raw, latest = await pipe.execute()
+        return self._with_location(raw, latest) if raw else None
+
+    async def update_session(self, session_key: str, fields: Dict[str, Any]) -> None:
+        if await self.session_exists(session_key):
+            await self.client.hset(self._session_key(session_key), mapping=self._encode(fields))
+
+    async def delete_session(self, session_key: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._session_key(session_key))
+        pipe.srem(self.index_key, session_key)
+        await pipe.execute()
+
+    async def session_exists(self, session_key: str) -> bool:
+        return bool(await self.client.exists(self._session_key(session_key)))
+
+    async def list_sessions(self) -> Dict[str, Dict[str, Any]]:
+        keys = [
+            key.decode() if isinstance(key, bytes) else key
+            for key in await self.client.smembers(self.index_key)
+        ]
+        if not keys:
+            return {}
+
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.hgetall(self._session_key(key))
+            pipe.lindex(self._history_key(key), -1)
+        results = await pipe.execute()
+
+        sessions = {}
+        for key, raw, latest in zip(keys, results[::2], results[1::2]):
+            if raw:
+                sessions[key] = self._with_location(raw, latest)
+        return sessions
+
+    async def append_location(
+        self,
+        session_key: str,
+        latitude: float,
+        longitude: float,
+        heading: Optional[float],
+        speed: Optional[float],
+        recorded_at: float
+    ) -> None:
+        history_key = self._history_key(session_key)
+
+        pipe = self.client.pipeline()
+        pipe.rpush(history_key, pack_point(latitude, longitude, heading, speed, recorded_at))
+        pipe.ltrim(history_key, -self.history_limit, -1)
+        pipe.expire(history_key, self.history_ttl)
+        await pipe.execute()
+
+    async def get_history(self, session_key: str, limit: int = 50) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        return [serialize_point(*point) for point in await self.get_points(session_key, limit)]
+
+    async def get_points(self, session_key: str, limit: int = 50) -> List[Point]:
+        if limit <= 0:
+            return []
+        return [unpack_point(item) for item in await self.client.lrange(self._history_key(session_key), -limit, -1)]
+
+    async def get_state(self, session_key: str, name: str) -> Optional[Any]:
+        raw = await self.client.hget(self._state_key(session_key), name)
+        return json.loads(raw) if raw is not None else None
+
+    async def compare_and_set_state(
+        self,
+        session_key: str,
+        name: str,
+        expected: Optional[Any],
+        value: Optional[Any]
+    ) -> bool:
+        from redis.exceptions import WatchError
+
+        state_key = self._state_key(session_key)
+        async with self.client.pipeline() as pipe:
+            try:
+                await pipe.watch(state_key)
+                raw = await pipe.hget(state_key, name)
+                if (json.loads(raw) if raw is not None else None) != expected:
+                    return False
+                pipe.multi()
+                if value is None:
+                    pipe.hdel(state_key, name)
+                else:
+                    pipe.hset(state_key, name, json.dumps(value))
+                    pipe.expire(state_key, self.history_ttl)
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def existing_sessions(self, session_keys: Iterable[str]) -> Set[str]:
+        session_keys = list(session_keys)
+        pipe = self.client.pipeline()
+        for key in session_keys:
+            pipe.exists(self._session_key(key))
+        return {key for key, exists in zip(session_keys, await pipe.execute()) if exists}
+
+    async def append_locations(self, points_by_session: Dict[str, List[Point]]) -> None:
+        pipe = self.client.pipeline()
+        for session_key, points in points_by_session.items():
+            if not points:
+                continue
+            history_key = self._history_key(session_key)
+            pipe.rpush(history_key, *(pack_point(*point) for point in points[-self.history_limit:]))
+            pipe.ltrim(history_key, -self.history_limit, -1)
+            pipe.expire(history_key, self.history_ttl)
+        await pipe.execute()
+
+
+def create_tracking_store() -> TrackingStore:
+    """Build the store selected by TRACKING_BACKEND"""
+    backend = settings.TRACKING_BACKEND.lower()
+
+    if backend == "memory":
+        return InMemoryTrackingStore(history_limit=settings.TRACKING_HISTORY_LIMIT)
+
+    if backend == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("REDIS_URL must be set when TRACKING_BACKEND=redis")
+
+        import redis.asyncio
+
+        return RedisTrackingStore(
+            redis.asyncio.Redis.from_url(settings.REDIS_URL),
+            history_limit=settings.TRACKING_HISTORY_LIMIT,
+            history_ttl=settings.TRACKING_HISTORY_TTL
+        )
+
+    raise ValueError(f"Unknown TRACKING_BACKEND: {settings.TRACKING_BACKEND}")
@@ -0,0 +1,328 @@
+"""Persisting tracking sessions as simplified, encoded trips"""
+import asyncio
+import logging
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.models.tracking import TrackingTrip
+from app.services.eta_service import haversine_km, EARTH_RADIUS_KM
+from app.services.location_buffer import Point
+
+logger = logging.getLogger(__name__)
+
+POLYLINE_PRECISION = 1e5
+EPOCH = datetime(1970, 1, 1)
+
+# (latitude, longitude, recorded_at) of a stored vertex
+Vertex = Tuple[float, float, float]
+
+# (booking_id, tracker_type) of a tracking session
+SessionKey = Tuple[int, str]
+
+
+# ==================== ENCODING ====================
+
+def encode_values(values: Sequence[int]) -> str:
+    """Signed integers in the Google encoded polyline format (5-bit chunks, ASCII 63+)"""
+    chunks = []
+    for value in values:
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def decode_values(encoded: str) -> List[int]:
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    return values
+
+
+def _deltas(values: Sequence[int]) -> List[int]:
+    return [value - previous for previous, value in zip([0] + list(values[:-1]), values)]
+
+
+def _running_sum(deltas: Sequence[int]) -> List[int]:
+    return np.cumsum(deltas, dtype=np.int64).tolist() if deltas else []
+
+
+def encode_trip(vertices: Sequence[Vertex]) -> Tuple[str, str]:
+    """(polyline, timestamps) for a list of vertices"""
+    lats = [round(lat * POLYLINE_PRECISION) for lat, _, _ in vertices]
+    lngs = [round(lng * POLYLINE_PRECISION) for _, lng, _ in vertices]
+    times = [round(recorded_at) for _, _, recorded_at in vertices]
+
+    interleaved = [value for pair in zip(_deltas(lats), _deltas(lngs)) for value in pair]
+    return encode_values(interleaved), encode_values(_deltas(times))
+
+
+def decode_trip(polyline: str, timestamps: str) -> List[Vertex]:
+    values = decode_values(polyline)
+    lats = _running_sum(values[0::2])
+    lngs = _running_sum(values[1::2])
+    times = _running_sum(decode_values(timestamps))
+    return [
+        (lat / POLYLINE_PRECISION, lng / POLYLINE_PRECISION, float(recorded_at))
+        for lat, lng, recorded_at in zip(lats, lngs, times)
+    ]
+
+
+# ==================== SIMPLIFICATION ====================
+
+def douglas_peucker(lats: np.ndarray, lngs: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """
+    Indices of the points kept by Douglas-Peucker simplification
+
+    Points are projected to local metres (equirectangular around the mean
+    latitude, accurate at trip scale), then split recursively, with an
+    explicit stack, at the point farthest from the current chord until
+    every dropped point is within tolerance_m of it.
+    """
+    count = len(lats)
+    if count < 3:
+        return np.arange(count)
+
+    scale = np.radians(1.0) * EARTH_RADIUS_KM * 1000
+    y = lats * scale
+    x = lngs * scale * np.cos(np.radians(lats.mean()))
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        chord = np.hypot(dx, dy)
+        if chord == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / chord
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return np.flatnonzero(keep)
+
+
+# ==================== ARCHIVE ====================
+
+def _booking_column(tracker_type: str):
+    return TrackingTrip.service_booking_id if tracker_type == "technician" else TrackingTrip.rental_booking_id
+
+
+def _epoch_seconds(value: datetime) -> float:
+    return (value - EPOCH).total_seconds()
+
+
+def _path_km(vertices: Sequence[Vertex]) -> float:
+    if len(vertices) < 2:
+        return 0.0
+    lats = np.array([vertex[0] for vertex in vertices])
+    lngs = np.array([vertex[1] for vertex in vertices])
+    return float(haversine_km(lats[:-1], lngs[:-1], lats[1:], lngs[1:]).sum())
+
+
+class TripArchiveService:
+    """
+    Moves tracking history into TrackingTrip rows
+
+    Live history only holds the last TRACKING_HISTORY_LIMIT points per
+    session and evicts older ones, so points are captured on ingest instead:
+    tracking_service hands every stored point to record(), which buffers it
+    per session in memory. Every interval_seconds the buffers are folded
+    into each session's open trip, simplified with Douglas-Peucker
+    (tolerance_m) and stored as an encoded polyline. Stopping a session
+    archives the remainder and closes the trip. Distance and duration are
+    totalled over the raw points before simplification.
+
+    Each worker archives the points it ingested; a stretch that reaches the
+    trip after a later one (from another worker) is merged in time order.
+    """
+
+    def __init__(self, tolerance_m: float = 10.0, interval_seconds: float = 120.0):
+        self.tolerance_m = tolerance_m
+        self.interval_seconds = interval_seconds
+        self._pending: Dict[SessionKey, List[Point]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # Don't lose the points buffered since the last pass on shutdown
+        try:
+            async for db in get_async_db():
+                await self.flush(db)
+        except Exception as e:
+            logger.error(f"Final trip archiving failed: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                async for db in get_async_db():
+                    await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Trip archiving failed: {str(e)}")
+
+    # ==================== INGEST ====================
+
+    def record(self, points_by_booking: Dict[int, List[Point]], tracker_type: str):
+        """Buffer chronological points of each booking until the next pass"""
+        for booking_id, points in points_by_booking.items():
+            if points:
+                self._pending.setdefault((booking_id, tracker_type), []).extend(points)
+
+    # ==================== WRITES ====================
+
+    async def flush(self, db) -> int:
+        """Archive every session with buffered points; returns the number of sessions archived"""
+        archived = 0
+        for booking_id, tracker_type in list(self._pending):
+            await self.archive(db, booking_id, tracker_type)
+            archived += 1
+        return archived
+
+    async def archive(self, db, booking_id: int, tracker_type: str, complete: bool = False) -> Optional[TrackingTrip]:
+        """Fold buffered points into the booking's open trip; close it when complete"""
+        points = sorted(self._pending.pop((booking_id, tracker_type), []), key=lambda point: point[4])
+
+        try:
+            column = _booking_column(tracker_type)
+            trip = await db.scalar(
+                select(TrackingTrip)
+                .where(column == booking_id, TrackingTrip.tracker_type == tracker_type)
+                .order_by(TrackingTrip.id.desc())
+                .limit(1)
+                .with_for_update()
+            )
+
+            # Points from before a closed trip ended belong to it, not to a new trip
+            late = bool(
+                trip is not None and trip.is_complete and points and trip.ended_at
+                and points[0][4] <= _epoch_seconds(trip.ended_at)
+            )
+            if trip is None or (trip.is_complete and not late):
+                if not points:
+                    return trip
+                trip = TrackingTrip(tracker_type=tracker_type)
+                setattr(trip, column.key, booking_id)
+                db.add(trip)
+
+            if points:
+                self._extend(trip, points)
+            trip.is_complete = complete or bool(trip.is_complete)
+
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Put the points back for the next pass
+            self._pending[(booking_id, tracker_type)] = points + self._pending.get((booking_id, tracker_type), [])
+            raise
+
+        return trip
+
+    def _extend(self, trip: TrackingTrip, points: List[Point]):
+        vertices = decode_trip(trip.polyline, trip.timestamps) if trip.polyline else []
+        new = [(lat, lng, recorded_at) for lat, lng, _, _, recorded_at in points]
+
+        # Re-simplify from the last stored vertex before the new points, so
+        # the trip stays continuous across passes; stored vertices after it
+        # (a later stretch archived first) are merged in time order
+        split = bisect_right([vertex[2] for vertex in vertices], new[0][2])
+        anchor = vertices[split - 1:split]
+        tail = vertices[split:]
+        run = anchor + sorted(tail + new, key=lambda vertex: vertex[2])
+
+        lats = np.array([vertex[0] for vertex in run])
+        lngs = np.array([vertex[1] for vertex in run])
+        kept = douglas_peucker(lats, lngs, self.tolerance_m)
+        vertices = vertices[:max(split - 1, 0)] + [run[i] for i in kept.tolist()]
+
+        trip.polyline, trip.timestamps = encode_trip(vertices)
+        trip.point_count = len(vertices)
+        trip.raw_point_count = (trip.raw_point_count or 0) + len(points)
+        trip.distance_km = round((trip.distance_km or 0.0) + _path_km(run) - _path_km(anchor + tail), 3)
+
+        started_at = datetime.utcfromtimestamp(new[0][2])
+        ended_at = datetime.utcfromtimestamp(new[-1][2])
+        trip.started_at = min(trip.started_at, started_at) if trip.started_at else started_at
+        trip.ended_at = max(trip.ended_at, ended_at) if trip.ended_at else ended_at
+        trip.duration_seconds = int((trip.ended_at - trip.started_at).total_seconds())
+
+    # ==================== READS ====================
+
+    async def get_trips(self, db, booking_id: int, tracker_type: str) -> List[TrackingTrip]:
+        return (await db.scalars(
+            select(TrackingTrip)
+            .where(_booking_column(tracker_type) == booking_id, TrackingTrip.tracker_type == tracker_type)
+            .order_by(TrackingTrip.id)
+        )).all()
+
+    @staticmethod
+    def summary(trip: TrackingTrip) -> Dict:
+        return {
+            "trip_id": trip.id,
+            "polyline": trip.polyline,
+            "point_count": trip.point_count,
+            "raw_point_count": trip.raw_point_count,
+            "distance_km": trip.distance_km,
+            "duration_seconds": trip.duration_seconds,
+            "started_at": trip.started_at.isoformat() if trip.started_at else None,
+            "ended_at": trip.ended_at.isoformat() if trip.ended_at else None,
+            "is_complete": trip.is_complete
+        }
+
+    @staticmethod
+    def history(trips: Sequence[TrackingTrip], limit: int = 50) -> List[Dict]:
+        """Last `limit` vertices over the trips, oldest first, shaped like live history"""
+        vertices = [vertex for trip in trips for vertex in decode_trip(trip.polyline, trip.timestamps)]
+        return [
+            {
+                "latitude": lat,
+                "longitude": lng,
+                "timestamp": datetime.utcfromtimestamp(recorded_at).isoformat(),
+                "heading": None,
+                "speed": None
+            }
+            for lat, lng, recorded_at in vertices[-limit:]
+        ]
+
+
+# Singleton instance
+trip_archive = TripArchiveService(
+    tolerance_m=settings.TRIP_SIMPLIFY_TOLERANCE_M,
+    interval_seconds=settings.TRIP_ARCHIVE_INTERVAL
+)
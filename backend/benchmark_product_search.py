@@ -0,0 +1,117 @@
+"""
+Benchmark the product search index on a synthetic catalog
+
+Compares ranked index lookups against a substring scan of name and
+description (what the ILIKE '%term%' filter did), and measures building
+the index and re-indexing single products.
+
+    python benchmark_product_search.py [products]
+"""
+import sys
+import os
+import time
+import random
+import statistics
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.product_search import InvertedIndex
+
+BRANDS = ["Bosch", "Denso", "NGK", "Brembo", "Monroe", "Castrol", "Mobil", "ACDelco", "Valeo", "Mann",
+          "Hella", "Gates", "KYB", "Michelin", "Bridgestone", "Continental", "Philips", "Osram", "TRW", "Febi"]
+PARTS = ["brake pad", "brake disc", "oil filter", "air filter", "spark plug", "shock absorber", "timing belt",
+         "alternator", "starter motor", "radiator", "headlight bulb", "wiper blade", "fuel pump", "water pump",
+         "clutch kit", "engine oil", "tyre", "battery", "ignition coil", "control arm", "wheel bearing",
+         "exhaust muffler", "cabin filter", "brake fluid", "coolant", "serpentine belt", "oxygen sensor"]
+MAKES = ["Toyota", "Honda", "Nissan", "Hyundai", "Kia", "Ford", "Mercedes", "BMW", "Volkswagen", "Mazda"]
+MODELS = ["Corolla", "Camry", "Civic", "Accord", "Sentra", "Elantra", "Sportage", "Focus", "Golf", "CX-5", "RAV4"]
+QUALIFIERS = ["front", "rear", "premium", "heavy duty", "ceramic", "synthetic", "OEM", "performance", "LED", "halogen"]
+FILLER = ("Genuine quality replacement part designed for reliable everyday driving. Tested for fit and "
+          "durability under tropical conditions. Easy installation with standard tools.").split()
+
+QUERIES = {
+    "exact": ["brake pad", "oil filter corolla", "bosch spark plug", "michelin tyre", "timing belt"],
+    "prefix": ["bra", "alter", "shock abs", "castrol syn", "headl"],
+    "typo": ["brkae pad", "altenator", "sparkplug", "radiater", "suspention"],
+    "part number": ["BP-10234", "bp10234", "OF 2211"],
+}
+
+
+def synthetic_catalog(count):
+    random.seed(7)
+    catalog = []
+    for product_id in range(1, count + 1):
+        brand = random.choice(BRANDS)
+        part = random.choice(PARTS)
+        make, model = random.choice(MAKES), random.choice(MODELS)
+        qualifier = random.choice(QUALIFIERS)
+        prefix = "".join(word[0] for word in part.split()).upper()
+        catalog.append((product_id, {
+            "name": f"{brand} {qualifier} {part} for {make} {model}",
+            "description": " ".join(random.sample(FILLER, 12)) + f" Fits {make} {model} {random.randint(2005, 2024)}.",
+            "brand": brand,
+            "part_number": f"{prefix}-{product_id % 50000 + 10000}",
+            "search_tags": [part, make.lower(), qualifier.lower()],
+        }))
+    return catalog
+
+
+def substring_scan(catalog, query):
+    """The old filter: the whole query as a substring of name or description"""
+    term = query.lower()
+    return [
+        product_id for product_id, fields in catalog
+        if term in fields["name"].lower() or term in fields["description"].lower()
+    ]
+
+
+def latencies(fn, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"Generating {count:,} synthetic products...")
+    catalog = synthetic_catalog(count)
+
+    index = InvertedIndex()
+    started = time.perf_counter()
+    index.bulk_load(catalog)
+    build_seconds = time.perf_counter() - started
+    print(f"Built index in {build_seconds:.2f}s: {len(index.postings):,} terms, "
+          f"{sum(len(postings) for postings in index.postings.values()):,} postings\n")
+
+    print(f"{'queries':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'avg hits':>12}")
+    for name, queries in QUERIES.items():
+        samples = latencies(lambda query: index.search(query, 1000), queries, repeat=20)
+        hits = statistics.mean(len(index.search(query, 1000)) for query in queries)
+        print(f"{name:<14}{percentile(samples, 0.5):>10.2f}{percentile(samples, 0.95):>10.2f}"
+              f"{percentile(samples, 0.99):>10.2f}{hits:>12,.0f}")
+
+    scan = latencies(lambda query: substring_scan(catalog, query), QUERIES["exact"], repeat=2)
+    print(f"{'substring scan':<14}{percentile(scan, 0.5):>10.2f}{percentile(scan, 0.95):>10.2f}"
+          f"{percentile(scan, 0.99):>10.2f}{'':>12}")
+
+    # Incremental maintenance: re-index products as vendors edit them
+    edits = random.sample(catalog, 1000)
+    started = time.perf_counter()
+    for product_id, fields in edits:
+        index.upsert(product_id, dict(fields, name=fields["name"] + " v2"))
+    per_upsert = (time.perf_counter() - started) / len(edits) * 1e6
+    print(f"\nRe-indexing one product: {per_upsert:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure one drive through several OdometerService workers sharing a store
+
+Each worker keeps its own unflushed total, but the measuring anchor lives
+in the tracking store, so a drive whose batches are spread over workers
+(round robin, concurrently, or delivered twice by a retrying tracker) must
+measure the same distance as a single worker. Runs against the memory
+store and the Redis store (fakeredis unless --redis-url is given).
+
+    python check_odometer_workers.py
+    python check_odometer_workers.py --workers 4 --redis-url redis://localhost:6379/15
+"""
+import sys
+import os
+import argparse
+import asyncio
+import uuid
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.odometer_service import OdometerService
+from app.services.tracking_store import InMemoryTrackingStore, RedisTrackingStore
+
+BOOKING_ID = 1
+TOLERANCE_KM = 1e-9
+
+
+def drive(batches=3, fixes_per_batch=6):
+    """Straight run north at 36 km/h with a fix every 10 s, ~1.6 km for the defaults"""
+    points = [
+        (5.6 + i * 0.0009, -0.18, 0.0, 36.0, 1_700_000_000.0 + i * 10)
+        for i in range(batches * fixes_per_batch)
+    ]
+    return [points[i:i + fixes_per_batch] for i in range(0, len(points), fixes_per_batch)]
+
+
+async def measured_km(store, workers, batches, deliver):
+    services = [OdometerService(store=store) for _ in range(workers)]
+    await store.save_session(f"vehicle_{BOOKING_ID}", {"booking_id": BOOKING_ID, "tracker_type": "vehicle"})
+    await deliver(services, batches)
+    return sum(service.pending_km([BOOKING_ID]) for service in services)
+
+
+async def round_robin(services, batches):
+    for i, batch in enumerate(batches):
+        await services[i % len(services)].record({BOOKING_ID: batch})
+
+
+async def concurrent(services, batches):
+    # Every batch lands on two workers at once, like a tracker retrying a timed out upload
+    for i, batch in enumerate(batches):
+        first, second = services[i % len(services)], services[(i + 1) % len(services)]
+        await asyncio.gather(first.record({BOOKING_ID: batch}), second.record({BOOKING_ID: batch}))
+
+
+def redis_client(url):
+    if url:
+        import redis.asyncio
+        return redis.asyncio.Redis.from_url(url)
+
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is not installed; pip install fakeredis or pass --redis-url")
+    return fakeredis.FakeAsyncRedis()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Check odometer totals across workers")
+    parser.add_argument("--workers", type=int, default=2, help="Workers sharing the store")
+    parser.add_argument("--redis-url", help="Real Redis server to use instead of fakeredis")
+    args = parser.parse_args()
+
+    batches = drive()
+    expected = await measured_km(InMemoryTrackingStore(), 1, batches, round_robin)
+    print(f"[*] Single worker: {expected:.3f} km")
+
+    client = redis_client(args.redis_url)
+    prefix = f"zip:odometer-check:{uuid.uuid4().hex[:8]}"
+    failures = 0
+    try:
+        for store_name, make_store in (
+            ("memory", InMemoryTrackingStore),
+            ("redis", lambda: RedisTrackingStore(client, prefix=prefix)),
+        ):
+            for deliver in (round_robin, concurrent):
+                total = await measured_km(make_store(), args.workers, batches, deliver)
+                ok = abs(total - expected) <= TOLERANCE_KM
+                failures += not ok
+                print(f"[{'+' if ok else '-'}] {store_name}, {args.workers} workers, {deliver.__name__}: {total:.3f} km")
+    finally:
+        keys = [key async for key in client.scan_iter(match=f"{prefix}:*")]
+        if keys:
+            await client.delete(*keys)
+        await client.aclose()
+
+    if failures:
+        print(f"[-] {failures} run(s) measured a different distance")
+        sys.exit(1)
+    print("[+] Every run measured the single worker distance")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
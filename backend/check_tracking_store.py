@@ -0,0 +1,140 @@
+"""
+Run the same tracking session scenario against the memory and Redis stores
+
+Both TrackingStore backends must behave the same; this drives them
+through one scenario (sessions, single and batched appends past the
+history limit, updates, deletes, compare-and-set state) and reports any result that differs.
+Without --redis-url the Redis store runs on fakeredis (pip install fakeredis).
+
+    python check_tracking_store.py
+    python check_tracking_store.py --redis-url redis://localhost:6379/15
+"""
+import sys
+import os
+import argparse
+import asyncio
+import math
+import uuid
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.tracking_store import InMemoryTrackingStore, RedisTrackingStore
+
+HISTORY_LIMIT = 20
+
+
+def redis_client(url):
+    if url:
+        import redis.asyncio
+        return redis.asyncio.Redis.from_url(url)
+
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is not installed; pip install fakeredis or pass --redis-url")
+    return fakeredis.FakeAsyncRedis()
+
+
+def normalized(value):
+    """NaN never equals itself; compare it as None"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (list, tuple)):
+        return [normalized(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalized(item) for key, item in value.items()}
+    if isinstance(value, set):
+        return sorted(value)
+    return value
+
+
+async def scenario(store):
+    """(step, result) pairs; every step awaits the store like TrackingService does"""
+    results = []
+
+    async def step(name, coroutine):
+        results.append((name, normalized(await coroutine)))
+
+    await store.save_session("vehicle_1", {"booking_id": 1, "tracker_type": "vehicle", "eta_minutes": None})
+    await store.save_session("technician_2", {"booking_id": 2, "tracker_type": "technician", "eta_minutes": 12})
+    await step("exists", store.session_exists("vehicle_1"))
+    await step("missing", store.session_exists("vehicle_9"))
+    await step("empty session", store.get_session("vehicle_1"))
+
+    for i in range(HISTORY_LIMIT + 5):
+        await store.append_location("vehicle_1", 5.6 + i * 1e-4, -0.18, 90.0, 30.0 + i, 1_700_000_000.0 + i)
+    await store.append_location("technician_2", 5.61, -0.19, None, float("nan"), 1_700_000_100.0)
+    await step("session", store.get_session("vehicle_1"))
+    await step("points", store.get_points("vehicle_1", 10))
+    await step("capped history", store.get_history("vehicle_1", 100))
+    await step("no limit", store.get_history("vehicle_1", 0))
+
+    await store.append_locations({
+        "vehicle_1": [(5.7, -0.2, 0.0, 10.0, 1_700_000_200.0 + i) for i in range(HISTORY_LIMIT * 2)],
+        "vehicle_3": [(5.8, -0.21, float("nan"), float("nan"), 1_700_000_300.0)],
+    })
+    await step("batched history", store.get_points("vehicle_1", HISTORY_LIMIT))
+    await step("history without session", store.get_points("vehicle_3"))
+    await step("existing", store.existing_sessions(["vehicle_1", "technician_2", "vehicle_3"]))
+
+    await store.update_session("technician_2", {"eta_minutes": 7})
+    await store.update_session("vehicle_9", {"eta_minutes": 1})
+    await step("updated", store.get_session("technician_2"))
+    await step("not created by update", store.get_session("vehicle_9"))
+    await step("listed", store.list_sessions())
+
+    anchor = {"anchor": [[5.7, -0.2, 1_700_000_200.0]], "last_seen": 1_700_000_239.0}
+    await step("state unset", store.get_state("vehicle_1", "odometer"))
+    await step("set from unset", store.compare_and_set_state("vehicle_1", "odometer", None, anchor))
+    await step("stale set", store.compare_and_set_state("vehicle_1", "odometer", None, {"last_seen": 0}))
+    await step("state", store.get_state("vehicle_1", "odometer"))
+    await step("set from current", store.compare_and_set_state("vehicle_1", "odometer", anchor, {**anchor, "last_seen": 1.5}))
+    await step("state replaced", store.get_state("vehicle_1", "odometer"))
+    await step("other name", store.get_state("vehicle_1", "geofence"))
+    await step("stale delete", store.compare_and_set_state("vehicle_1", "odometer", anchor, None))
+    await step("delete", store.compare_and_set_state("vehicle_1", "odometer", {**anchor, "last_seen": 1.5}, None))
+    await step("state deleted", store.get_state("vehicle_1", "odometer"))
+    await store.compare_and_set_state("vehicle_1", "odometer", None, anchor)
+    await store.save_session("vehicle_1", {"booking_id": 1, "tracker_type": "vehicle", "eta_minutes": None})
+    await step("state reset by new session", store.get_state("vehicle_1", "odometer"))
+
+    await store.delete_session("technician_2")
+    await step("deleted", store.get_session("technician_2"))
+    await step("history kept", store.get_points("technician_2"))
+    await step("listed after delete", store.list_sessions())
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare the memory and Redis tracking stores")
+    parser.add_argument("--redis-url", help="Real Redis server to use instead of fakeredis")
+    args = parser.parse_args()
+
+    client = redis_client(args.redis_url)
+    prefix = f"zip:tracking-check:{uuid.uuid4().hex[:8]}"
+    redis_store = RedisTrackingStore(client, history_limit=HISTORY_LIMIT, prefix=prefix)
+
+    try:
+        expected = await scenario(InMemoryTrackingStore(history_limit=HISTORY_LIMIT))
+        actual = await scenario(redis_store)
+    finally:
+        keys = [key async for key in client.scan_iter(match=f"{prefix}:*")]
+        if keys:
+            await client.delete(*keys)
+        await client.aclose()
+
+    mismatches = 0
+    for (name, memory_result), (_, redis_result) in zip(expected, actual):
+        if memory_result != redis_result:
+            mismatches += 1
+            print(f"[-] {name}:\n    memory: {memory_result}\n    redis:  {redis_result}")
+
+    if mismatches:
+        print(f"[-] {mismatches} of {len(expected)} step(s) differ")
+        sys.exit(1)
+    print(f"[+] All {len(expected)} steps match ({'redis' if args.redis_url else 'fakeredis'})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
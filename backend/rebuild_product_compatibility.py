@@ -0,0 +1,37 @@
+"""
+Rebuild the product vehicle-compatibility index from Product.compatible_* arrays
+
+Product writes keep the index in sync; run this once to backfill products
+created before the index existed, or after editing the arrays directly.
+
+    python rebuild_product_compatibility.py
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import get_async_db
+from app.services.product_compatibility import product_compatibility
+
+
+async def main():
+    print("Rebuilding product compatibility index...")
+    started = time.perf_counter()
+
+    async for db in get_async_db():
+        try:
+            rows = await product_compatibility.rebuild(db)
+        except Exception as e:
+            print(f"\n[-] Error: {e}")
+            await db.rollback()
+            raise
+
+    print(f"[+] Wrote {rows} compatibility row(s) in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
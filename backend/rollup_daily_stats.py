@@ -0,0 +1,51 @@
+"""
+Roll source tables up into DailyStats
+
+    python rollup_daily_stats.py                                  # only days touched since last run
+    python rollup_daily_stats.py --from 2024-01-01 --to 2024-01-31  # backfill a range
+"""
+import sys
+import os
+import argparse
+from datetime import date
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.daily_stats_service import daily_stats_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental DailyStats rollup")
+    parser.add_argument("--from", dest="start_date", type=date.fromisoformat, help="Backfill start (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_date", type=date.fromisoformat, help="Backfill end (YYYY-MM-DD, inclusive)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        if args.start_date or args.end_date:
+            start_date = args.start_date or args.end_date
+            end_date = args.end_date or args.start_date
+            print(f"Backfilling DailyStats {start_date} -> {end_date}...")
+            result = daily_stats_service.backfill(db, start_date, end_date)
+            print(f"[+] Rebuilt {result['days_recomputed']} day(s) in {result['duration_ms']}ms")
+        else:
+            print("Rolling up days touched since the last run...")
+            result = daily_stats_service.run_incremental(db)
+            days = result["days_recomputed"]
+            print(f"[+] Recomputed {len(days)} day(s) in {result['duration_ms']}ms")
+            for day in days:
+                print(f"    {day}")
+
+    except Exception as e:
+        print(f"\n[-] Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
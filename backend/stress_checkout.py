@@ -0,0 +1,291 @@
+"""
+Concurrency stress test for checkout stock reservation
+
+Gives many customers carts over a handful of low-stock products, checks
+them all out from several processes at once, then compares what was
+ordered with what was in stock. With --submits each cart is checked out
+that many times concurrently, and no customer may end up with two orders.
+
+    python stress_checkout.py                              # guarded bulk UPDATE (checkout_service)
+    python stress_checkout.py --unguarded                  # old read-check-decrement loop, for comparison
+    python stress_checkout.py --submits 3                  # double submits against the cart lock
+    python stress_checkout.py --processes 8 --customers 400 --products 5 --stock 40
+
+Needs the PostgreSQL database from DATABASE_URL; fixtures are removed afterwards.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from multiprocessing import Pool
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, delete, func
+
+from app.core import database
+from app.core.database import SessionLocal, get_async_db
+from app.core.security import get_password_hash
+from app.models.user import User, UserRole
+from app.models.store import Vendor, Product, ProductCategory, Cart, CartItem, Order, OrderItem, OrderStatus
+from app.services.checkout_service import checkout_service, CheckoutError
+
+EMAIL_DOMAIN = "stress-checkout.example.com"
+
+
+def create_fixtures(customer_count, product_count, stock, max_items):
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6]
+        password_hash = get_password_hash("Stress123!")
+
+        def user(name, role):
+            return User(
+                email=f"{name}-{tag}@{EMAIL_DOMAIN}",
+                phone=f"+233{random.randint(100000000, 999999999)}",
+                password_hash=password_hash,
+                full_name="Stress Test",
+                role=role
+            )
+
+        owner = user("vendor", UserRole.VENDOR)
+        db.add(owner)
+        db.flush()
+
+        vendor = Vendor(
+            user_id=owner.id,
+            business_name=f"Stress Parts {tag}",
+            business_address={},
+            business_phone="+233200000000",
+            business_email=owner.email,
+            commission_rate=0.12,
+            is_verified=True
+        )
+        db.add(vendor)
+        db.flush()
+
+        products = [
+            Product(
+                vendor_id=vendor.id,
+                name=f"Stress part {i}",
+                description="Checkout stress test fixture",
+                category=ProductCategory.OTHER,
+                condition="new",
+                images=[],
+                price=10.0 + i,
+                stock_quantity=stock
+            )
+            for i in range(product_count)
+        ]
+        customers = [user(f"customer{i}", UserRole.CUSTOMER) for i in range(customer_count)]
+        db.add_all(products + customers)
+        db.flush()
+
+        product_ids = [product.id for product in products]
+        for customer in customers:
+            cart = Cart(user_id=customer.id)
+            db.add(cart)
+            db.flush()
+            for product_id in random.sample(product_ids, random.randint(1, min(max_items, len(product_ids)))):
+                db.add(CartItem(cart_id=cart.id, product_id=product_id, quantity=random.randint(1, 3)))
+
+        db.commit()
+        return owner.id, vendor.id, product_ids, [customer.id for customer in customers]
+    finally:
+        db.close()
+
+
+async def unguarded_checkout(db, customer_id):
+    """The old path: one Product read per item, stock checked in Python, decremented blindly"""
+    items = (await db.scalars(
+        select(CartItem).join(Cart, Cart.id == CartItem.cart_id).where(Cart.user_id == customer_id)
+    )).all()
+    if not items:
+        return False
+
+    products = {}
+    for item in items:
+        product = await db.get(Product, item.product_id)
+        if product.stock_quantity < item.quantity:
+            return False
+        products[item.product_id] = product
+
+    # Let the other checkouts read the same stock before this one writes
+    await asyncio.sleep(0)
+
+    subtotal = sum(products[item.product_id].price * item.quantity for item in items)
+    order = Order(
+        customer_id=customer_id,
+        order_number=f"ORD{uuid.uuid4().hex[:8].upper()}",
+        status=OrderStatus.PENDING,
+        delivery_option="standard",
+        delivery_address={},
+        subtotal=subtotal,
+        total_amount=subtotal,
+        platform_commission=0.0,
+        vendor_payout=subtotal
+    )
+    db.add(order)
+    await db.flush()
+
+    for item in items:
+        product = products[item.product_id]
+        db.add(OrderItem(
+            order_id=order.id,
+            product_id=product.id,
+            product_name=product.name,
+            product_price=product.price,
+            quantity=item.quantity,
+            subtotal=product.price * item.quantity
+        ))
+        product.stock_quantity -= item.quantity
+        product.total_sold += item.quantity
+        await db.delete(item)
+
+    await db.commit()
+    return True
+
+
+async def attempt(customer_id, guarded):
+    """One checkout in its own session; True when the order was placed"""
+    async for db in get_async_db():
+        if guarded:
+            try:
+                await checkout_service.place_order(db, customer_id, delivery_address={"type": "stress"})
+                return True
+            except CheckoutError:
+                return False
+        return await unguarded_checkout(db, customer_id)
+
+
+def run_worker(args):
+    """Process entry point: check out this worker's share of customers concurrently"""
+    customer_ids, concurrency, guarded, submits = args
+    customer_ids = [customer_id for customer_id in customer_ids for _ in range(submits)]
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(customer_id):
+            async with semaphore:
+                return await attempt(customer_id, guarded)
+
+        try:
+            return await asyncio.gather(*(limited(customer_id) for customer_id in customer_ids))
+        finally:
+            # Close pooled connections while this process's event loop is still running
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    results = asyncio.run(run())
+    return sum(results), len(results) - sum(results)
+
+
+def stock_report(product_ids, initial_stock):
+    """(product_id, stock left, quantity ordered) per product, and how many were oversold"""
+    db = SessionLocal()
+    try:
+        ordered = dict(db.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.product_id.in_(product_ids))
+            .group_by(OrderItem.product_id)
+        ).all())
+        left = dict(db.execute(select(Product.id, Product.stock_quantity).where(Product.id.in_(product_ids))).all())
+    finally:
+        db.close()
+
+    rows = [(product_id, left[product_id], int(ordered.get(product_id) or 0)) for product_id in product_ids]
+    oversold = sum(1 for _, stock, quantity in rows if stock < 0 or quantity > initial_stock)
+    drift = sum(1 for _, stock, quantity in rows if stock != initial_stock - quantity)
+    return rows, oversold, drift
+
+
+def count_repeat_orders(customer_ids):
+    """Customers with more than one order placed from their single cart"""
+    db = SessionLocal()
+    try:
+        per_customer = (
+            select(Order.customer_id)
+            .where(Order.customer_id.in_(customer_ids))
+            .group_by(Order.customer_id)
+            .having(func.count(Order.id) > 1)
+        )
+        return db.scalar(select(func.count()).select_from(per_customer.subquery()))
+    finally:
+        db.close()
+
+
+def cleanup(owner_id, vendor_id, product_ids, customer_ids):
+    db = SessionLocal()
+    try:
+        order_ids = select(Order.id).where(Order.customer_id.in_(customer_ids))
+        db.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+        db.execute(delete(Order).where(Order.customer_id.in_(customer_ids)))
+        cart_ids = select(Cart.id).where(Cart.user_id.in_(customer_ids))
+        db.execute(delete(CartItem).where(CartItem.cart_id.in_(cart_ids)))
+        db.execute(delete(Cart).where(Cart.user_id.in_(customer_ids)))
+        db.execute(delete(Product).where(Product.id.in_(product_ids)))
+        db.execute(delete(Vendor).where(Vendor.id == vendor_id))
+        db.execute(delete(User).where(User.id.in_(customer_ids + [owner_id])))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkout overselling stress test")
+    parser.add_argument("--processes", type=int, default=4, help="Worker processes (separate connection pools)")
+    parser.add_argument("--customers", type=int, default=200, help="Customers checking out, one cart each")
+    parser.add_argument("--concurrency", type=int, default=20, help="In-flight checkouts per process")
+    parser.add_argument("--products", type=int, default=5, help="Products the carts draw from")
+    parser.add_argument("--stock", type=int, default=50, help="Starting stock per product")
+    parser.add_argument("--max-items", type=int, default=3, help="Most distinct products in one cart")
+    parser.add_argument("--submits", type=int, default=1, help="Concurrent checkouts of each cart")
+    parser.add_argument("--unguarded", action="store_true", help="Use the old read-check-decrement loop")
+    parser.add_argument("--keep", action="store_true", help="Leave the fixtures in the database")
+    args = parser.parse_args()
+
+    owner_id, vendor_id, product_ids, customer_ids = create_fixtures(
+        args.customers, args.products, args.stock, args.max_items
+    )
+    mode = "unguarded" if args.unguarded else "guarded bulk UPDATE"
+    print(f"{args.customers} checkouts (x{args.submits}) over {args.products} product(s) with {args.stock} in stock "
+          f"from {args.processes} process(es), {mode}...")
+
+    try:
+        shares = [customer_ids[i::args.processes] for i in range(args.processes)]
+        started = time.perf_counter()
+        with Pool(args.processes) as pool:
+            results = pool.map(run_worker, [
+                (share, args.concurrency, not args.unguarded, args.submits) for share in shares
+            ])
+        elapsed = time.perf_counter() - started
+
+        placed = sum(ok for ok, _ in results)
+        rejected = sum(failed for _, failed in results)
+        rows, oversold, drift = stock_report(product_ids, args.stock)
+        repeats = count_repeat_orders(customer_ids)
+
+        print(f"[+] {placed} placed, {rejected} rejected (stock or empty cart) in {elapsed:.1f}s "
+              f"({(placed + rejected) / elapsed:.0f} checkouts/s)")
+        for product_id, stock, quantity in rows:
+            print(f"    product {product_id}: {quantity} ordered, {stock} left")
+        if oversold or drift:
+            print(f"[-] {oversold} product(s) oversold, {drift} with stock not matching orders")
+        else:
+            print("[+] No overselling; stock matches the orders placed")
+        if repeats:
+            print(f"[-] {repeats} customer(s) got more than one order from one cart")
+    finally:
+        if not args.keep:
+            cleanup(owner_id, vendor_id, product_ids, customer_ids)
+
+    sys.exit(1 if oversold or drift or repeats else 0)
+
+
+if __name__ == "__main__":
+    main()
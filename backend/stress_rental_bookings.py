@@ -0,0 +1,271 @@
+"""
+Concurrency stress test for rental booking conflict prevention
+
+Fires many overlapping booking attempts at a handful of vehicles from
+several processes at once, then checks the database for double bookings.
+Guarded attempts go through the create_rental_booking endpoint itself, and
+every booking they store must carry the costs its quote gives.
+
+    python stress_rental_bookings.py                       # booking endpoint (advisory locks)
+    python stress_rental_bookings.py --no-lock             # old SELECT-then-INSERT, for comparison
+    python stress_rental_bookings.py --processes 8 --attempts 400 --vehicles 3
+
+Needs the PostgreSQL database from DATABASE_URL; fixtures are removed afterwards.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import aliased
+
+from app.core import database
+from app.core.database import SessionLocal, get_async_db
+from app.core.security import get_password_hash
+from app.models.user import User, UserRole
+from app.models.rental import RentalVehicle, RentalBooking
+from app.schemas.rental import RentalBookingCreate
+from app.api.v1.endpoints.rentals import create_rental_booking
+from app.services.rental_availability import BLOCKING_STATUSES, day_bounds, to_iso
+from app.services.rental_pricing import rental_pricing, BOOKING_QUOTE_FIELDS
+
+PLATE_PREFIX = "STRESS-"
+HORIZON_DAYS = 14
+
+
+def create_fixtures(vehicle_count):
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6].upper()
+        customer = User(
+            email=f"stress-{tag.lower()}@example.com",
+            phone=f"+233{random.randint(100000000, 999999999)}",
+            password_hash=get_password_hash("Stress123!"),
+            full_name="Stress Test",
+            role=UserRole.CUSTOMER
+        )
+        db.add(customer)
+
+        vehicles = [
+            RentalVehicle(
+                make="Stress",
+                model="Test",
+                year=2024,
+                license_plate=f"{PLATE_PREFIX}{tag}-{i}",
+                transmission="Automatic",
+                fuel_type="Petrol",
+                daily_rate=100.0,
+                driver_fee_per_day=40.0,
+                delivery_fee=15.0
+            )
+            for i in range(vehicle_count)
+        ]
+        db.add_all(vehicles)
+        db.commit()
+        return customer.id, [vehicle.id for vehicle in vehicles]
+    finally:
+        db.close()
+
+
+def new_booking(customer_id, vehicle_id, pickup, dropoff):
+    """Row for the unguarded path, which bypasses the endpoint"""
+    hours = int((dropoff - pickup).total_seconds() // 3600)
+    return RentalBooking(
+        customer_id=customer_id,
+        vehicle_id=vehicle_id,
+        booking_reference=f"STR{uuid.uuid4().hex[:12].upper()}",
+        pickup_datetime=to_iso(pickup),
+        return_datetime=to_iso(dropoff),
+        duration_hours=hours,
+        duration_days=max(1, hours // 24),
+        pickup_location={"type": "office"},
+        return_location={"type": "office"},
+        drivers_license={},
+        ghana_card={},
+        proof_of_address={},
+        base_cost=100.0,
+        total_cost=100.0
+    )
+
+
+async def attempt(customer_id, vehicle_id, start_date, end_date, with_driver, delivery_requested, use_lock):
+    """One booking attempt in its own session; True when the booking was stored"""
+    async for db in get_async_db():
+        if use_lock:
+            booking_in = RentalBookingCreate(
+                vehicle_id=vehicle_id,
+                start_date=start_date,
+                end_date=end_date,
+                pickup_location={"type": "office"},
+                dropoff_location={"type": "office"},
+                driver_license_number="STRESS",
+                with_driver=with_driver,
+                delivery_requested=delivery_requested
+            )
+            try:
+                await create_rental_booking(booking_in, current_user=await db.get(User, customer_id), db=db)
+                return True
+            except HTTPException as e:
+                if e.status_code != 409:
+                    raise
+                return False
+
+        # Unguarded: check, yield to the other requests, then insert
+        pickup, dropoff = day_bounds(start_date, end_date)
+        overlapping = await db.scalar(select(RentalBooking.id).where(
+            RentalBooking.vehicle_id == vehicle_id,
+            RentalBooking.status.in_(BLOCKING_STATUSES),
+            RentalBooking.pickup_datetime < to_iso(dropoff),
+            RentalBooking.return_datetime > to_iso(pickup)
+        ).limit(1))
+        await asyncio.sleep(0)
+        if overlapping:
+            return False
+        db.add(new_booking(customer_id, vehicle_id, pickup, dropoff))
+        await db.commit()
+        return True
+
+
+def run_worker(args):
+    """Process entry point: run this worker's share of attempts concurrently"""
+    customer_id, vehicle_ids, attempts, concurrency, use_lock, seed = args
+    rng = random.Random(seed)
+    base = date(2030, 1, 1)
+
+    plans = []
+    for _ in range(attempts):
+        start_date = base + timedelta(days=rng.randrange(0, HORIZON_DAYS))
+        end_date = start_date + timedelta(days=rng.randrange(1, 4))
+        plans.append((rng.choice(vehicle_ids), start_date, end_date, rng.random() < 0.5, rng.random() < 0.5))
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(plan):
+            async with semaphore:
+                return await attempt(customer_id, *plan, use_lock)
+
+        try:
+            return await asyncio.gather(*(limited(plan) for plan in plans))
+        finally:
+            # Close pooled connections while this process's event loop is still running
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    results = asyncio.run(run())
+    return sum(results), len(results) - sum(results)
+
+
+def count_double_bookings(vehicle_ids):
+    db = SessionLocal()
+    try:
+        other = aliased(RentalBooking)
+        return db.scalar(
+            select(func.count())
+            .select_from(RentalBooking)
+            .join(other, (other.vehicle_id == RentalBooking.vehicle_id) & (other.id > RentalBooking.id))
+            .where(
+                RentalBooking.vehicle_id.in_(vehicle_ids),
+                RentalBooking.status.in_(BLOCKING_STATUSES),
+                other.status.in_(BLOCKING_STATUSES),
+                other.pickup_datetime < RentalBooking.return_datetime,
+                other.return_datetime > RentalBooking.pickup_datetime
+            )
+        )
+    finally:
+        db.close()
+
+
+def count_misquoted(vehicle_ids):
+    """Bookings whose stored durations or costs differ from a fresh quote of their window"""
+    db = SessionLocal()
+    try:
+        vehicles = {vehicle.id: vehicle for vehicle in db.scalars(
+            select(RentalVehicle).where(RentalVehicle.id.in_(vehicle_ids))
+        )}
+        bookings = db.scalars(select(RentalBooking).where(RentalBooking.vehicle_id.in_(vehicle_ids))).all()
+    finally:
+        db.close()
+
+    misquoted = 0
+    for booking in bookings:
+        quote = rental_pricing.price(
+            vehicles[booking.vehicle_id],
+            datetime.fromisoformat(booking.pickup_datetime),
+            datetime.fromisoformat(booking.return_datetime),
+            with_driver=booking.with_driver,
+            delivery_requested=booking.delivery_requested
+        )
+        if any(getattr(booking, field) != quote[field] for field in BOOKING_QUOTE_FIELDS):
+            misquoted += 1
+    return misquoted
+
+
+def cleanup(customer_id, vehicle_ids):
+    db = SessionLocal()
+    try:
+        db.execute(delete(RentalBooking).where(RentalBooking.vehicle_id.in_(vehicle_ids)))
+        db.execute(delete(RentalVehicle).where(RentalVehicle.id.in_(vehicle_ids)))
+        db.execute(delete(User).where(User.id == customer_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rental booking double-booking stress test")
+    parser.add_argument("--processes", type=int, default=4, help="Worker processes (separate connection pools)")
+    parser.add_argument("--attempts", type=int, default=250, help="Booking attempts per process")
+    parser.add_argument("--concurrency", type=int, default=20, help="In-flight attempts per process")
+    parser.add_argument("--vehicles", type=int, default=3, help="Vehicles to fight over")
+    parser.add_argument("--no-lock", action="store_true", help="Use the unguarded SELECT-then-INSERT path")
+    parser.add_argument("--keep", action="store_true", help="Leave the fixtures in the database")
+    args = parser.parse_args()
+
+    customer_id, vehicle_ids = create_fixtures(args.vehicles)
+    mode = "unguarded" if args.no_lock else "booking endpoint, advisory-locked"
+    print(f"{args.processes} x {args.attempts} attempts on {args.vehicles} vehicle(s), {mode}...")
+
+    try:
+        started = time.perf_counter()
+        with Pool(args.processes) as pool:
+            results = pool.map(run_worker, [
+                (customer_id, vehicle_ids, args.attempts, args.concurrency, not args.no_lock, seed)
+                for seed in range(args.processes)
+            ])
+        elapsed = time.perf_counter() - started
+
+        booked = sum(ok for ok, _ in results)
+        rejected = sum(conflicts for _, conflicts in results)
+        doubles = count_double_bookings(vehicle_ids)
+        misquoted = 0 if args.no_lock else count_misquoted(vehicle_ids)
+
+        print(f"[+] {booked} booked, {rejected} rejected as conflicts in {elapsed:.1f}s "
+              f"({(booked + rejected) / elapsed:.0f} attempts/s)")
+        if doubles:
+            print(f"[-] {doubles} overlapping booking pair(s) found")
+        else:
+            print("[+] No double bookings")
+        if misquoted:
+            print(f"[-] {misquoted} booking(s) stored with costs that differ from their quote")
+        elif not args.no_lock:
+            print("[+] Every booking matches its quote")
+    finally:
+        if not args.keep:
+            cleanup(customer_id, vehicle_ids)
+
+    sys.exit(1 if doubles or misquoted else 0)
+
+
+if __name__ == "__main__":
+    main()